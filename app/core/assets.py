@@ -0,0 +1,103 @@
+import hashlib
+import os
+import wave
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy
+
+"""
+    Банк звуковых ресурсов
+
+    Статические звуки (сигналы таймера, бипы), на которые ссылаются опции расширений,
+    декодируются один раз при старте и держатся в памяти как PCM int16 (n,) или (n, каналы)
+    Повторное воспроизведение не читает и не декодирует файл заново
+
+    Буферы только для чтения: движок воспроизведения может закэшировать их подготовленную форму
+    При mmap_dir PCM сохраняется в файл рядом и отображается в память (numpy.memmap) -
+    страницы подгружаются ОС по требованию и разделяются между процессами
+"""
+class AssetBank:
+    def __init__(self, mmap_dir: Optional[Path] = None):
+        self.mmap_dir = mmap_dir
+        # нормализованный путь -> (PCM, частота)
+        self._assets: Dict[str, Tuple[numpy.ndarray, int]] = {}
+
+    """
+        Находит в опциях расширений ссылки на существующие WAV-файлы и загружает их
+        Возвращает количество загруженных ресурсов
+    """
+    def scan_options(self, manifests: Dict[str, dict]) -> int:
+        count = 0
+        for name, manifest in manifests.items():
+            for value in self._iter_strings(manifest.get("options") or {}):
+                if not value.lower().endswith(".wav") or not os.path.isfile(value):
+                    continue
+                if self.get(value) is not None:
+                    continue
+                try:
+                    self.load(value)
+                    count += 1
+                except Exception as e:
+                    print(f"[Ресурсы] {name}: не удалось загрузить {value}: {e}")
+        return count
+
+    """
+        Декодирует WAV (PCM 16 бит) в память
+    """
+    def load(self, path: str) -> Tuple[numpy.ndarray, int]:
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError("поддерживается только PCM 16 бит")
+            channels = wf.getnchannels()
+            samplerate = wf.getframerate()
+            frames = wf.readframes(wf.getnframes())
+
+        shape = (len(frames) // (2 * channels),) if channels == 1 else (len(frames) // (2 * channels), channels)
+
+        if self.mmap_dir is not None:
+            data = self._to_memmap(path, frames, shape)
+        else:
+            data = numpy.frombuffer(frames, dtype="<i2").reshape(shape)
+
+        data.flags.writeable = False
+        self._assets[self._key(path)] = (data, samplerate)
+        return data, samplerate
+
+    """
+        Возвращает (PCM, частота) для пути или None, если ресурс не загружен
+    """
+    def get(self, path: str) -> Optional[Tuple[numpy.ndarray, int]]:
+        return self._assets.get(self._key(path))
+
+    def paths(self):
+        return list(self._assets.keys())
+
+    def __len__(self):
+        return len(self._assets)
+
+    def _to_memmap(self, path: str, frames: bytes, shape) -> numpy.ndarray:
+        st = os.stat(path)
+        digest = hashlib.sha1(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()
+        pcm_path = Path(self.mmap_dir) / f"{digest}.pcm"
+        if not pcm_path.exists():
+            pcm_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = pcm_path.with_suffix(".tmp")
+            tmp_path.write_bytes(frames)
+            os.replace(tmp_path, pcm_path)
+        return numpy.memmap(pcm_path, dtype="<i2", mode="r", shape=shape)
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normpath(path)
+
+    @classmethod
+    def _iter_strings(cls, value) -> Iterable[str]:
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, dict):
+            for v in value.values():
+                yield from cls._iter_strings(v)
+        elif isinstance(value, (list, tuple)):
+            for v in value:
+                yield from cls._iter_strings(v)
@@ -0,0 +1,373 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import wave
+from typing import Callable, Optional, Tuple
+
+import numpy
+
+try:
+    from vosk import KaldiRecognizer
+except Exception:
+    pass
+
+from app.core.log import new_request_id
+from app.core.trace import tracer
+from app.utils.pcm_ring import PcmRing
+from app.utils.vad_gate import VadGate, describe as describe_vad
+
+"""
+    Конвейер одного звукового входа (микрофон, файл): кольцевой буфер -> шлюз активности голоса -> Vosk
+
+    InputPipeline не знает, откуда звук: источник (колбэк sounddevice или WavInput) пишет в write(),
+    цикл распознавания читает блоки (read_block) и обрабатывает их (process)
+    Готовая фраза возвращается как (текст, досрочно) - выполнение команды остаётся вызывающему
+    Несколько входов используют одну модель Vosk, у каждого свои буфер, шлюз и распознаватели
+"""
+
+logger = logging.getLogger(__name__)
+
+# Размер блока захвата (кадров) и сколько секунд звука держит кольцевой буфер
+BLOCK_SIZE = 8000
+RING_SECONDS = 10
+
+# Режим низкой задержки: блок захвата в мс (20-50), а также досрочный запуск законченной команды без аргументов
+# (ключ манифеста early_commands), если частичный результат с обращением к ассистенту не менялся EARLY_STABLE_MS
+LOW_LATENCY_BLOCK_MS = 30
+EARLY_STABLE_MS = 300
+
+# Шлюз активности голоса перед Vosk: агрессивность webrtcvad (0..3), кадр VAD, порог энергии (RMS int16),
+# предзапись перед речью и «хвост» тишины после неё
+VAD_AGGRESSIVENESS = 2
+VAD_FRAME_MS = 30
+VAD_ENERGY_THRESHOLD = 300
+VAD_PREROLL_MS = 300
+VAD_HANGOVER_MS = 600
+
+# Распознаватель:
+#   open - открытый словарь модели
+#   grammar - только слова команд, имён и числительных (core.vosk_grammar()); аргументы вне грамматики
+#             (имя в «запомни голос ...», путь к файлу, вопрос к «лама ...») теряются - слова становятся [unk] и выбрасываются
+#   dual - грамматика для поиска команд, фраза с командой из free_text_commands («лама ...», «забудь голос ...»)
+#          перераспознаётся открытым словарём
+RECOGNIZERS = ("open", "grammar", "dual")
+# Сколько секунд звука фразы хранится для перераспознавания в режиме dual
+DUAL_UTTERANCE_SECONDS = 30
+
+# Пока ассистент отвечает на фразу этого входа, порог энергии его шлюза выше: собственный голос из динамика реже считается речью
+ECHO_ENERGY_FACTOR = 3
+
+def _strip_unk(text: str) -> str:
+    return " ".join(w for w in text.split() if w != "[unk]") if "[unk]" in text else text
+
+class InputPipeline:
+    def __init__(
+            self,
+            core,
+            model,
+            samplerate: int,
+            name: Optional[str] = None,
+            use_vad: bool = True,
+            block_ms: Optional[int] = None,
+            early_commands: bool = False,
+            recognizer: str = "open",
+    ):
+        self.core = core
+        self.model = model
+        self.samplerate = samplerate
+        # Имя входа - оно же имя сеанса ядра (None - единственный вход, общий сеанс)
+        self.name = name
+        self.block_size = int(samplerate * block_ms / 1000) if block_ms else BLOCK_SIZE
+        self.block_bytes = self.block_size * 2
+        self.low_latency = bool(block_ms)
+        self.early_commands = early_commands
+        self.recognizer = recognizer
+
+        # Ассистент выполняет команду этого входа (отвечает в его комнате) - фразы входа считаются эхом
+        self.busy = threading.Event()
+        # Приём звука приостановлен (режим blocking: на время выполнения команды)
+        self.paused = threading.Event()
+        # Вход уже обрабатывается в пуле потоков
+        self.scheduled = False
+
+        # int16 моно - 2 байта на кадр
+        self.ring = PcmRing(samplerate * 2 * RING_SECONDS)
+        self._overruns = 0
+
+        self.gate = None
+        if use_vad:
+            self.gate = VadGate(samplerate, VAD_AGGRESSIVENESS, VAD_FRAME_MS, VAD_ENERGY_THRESHOLD, VAD_PREROLL_MS, VAD_HANGOVER_MS)
+
+        self.rec_open = KaldiRecognizer(model, samplerate)
+        self.grammar = None
+        if recognizer == "open":
+            self.rec = self.rec_open
+        else:
+            self.grammar = core.vosk_grammar()
+            self.rec = KaldiRecognizer(model, samplerate, self.grammar)
+
+        # Звук текущей фразы для перераспознавания открытым словарём (dual)
+        self.utterance = bytearray()
+        self.utterance_cap = samplerate * 2 * DUAL_UTTERANCE_SECONDS
+
+        # Частичный результат: текст, с какого момента он не меняется, было ли в нём обращение
+        self.last_partial = ""
+        self.partial_since = 0.0
+        self.partial_woke = False
+
+        # Сколько звука обработано (позиция во входе)
+        self.processed_bytes = 0
+        # Начало и конец обработки блока, на котором закончилась последняя фраза (perf_counter_ns)
+        self.asr_span: Optional[Tuple[int, int]] = None
+
+    @property
+    def label(self) -> str:
+        return self.name or "микрофон"
+
+    def describe(self) -> str:
+        parts = [f"{self.samplerate} Гц", f"блок {self.block_size * 1000 // self.samplerate} мс", f"VAD: {describe_vad(self.gate)}"]
+        if self.grammar is not None:
+            parts.append(f"грамматика ({self.recognizer}): {len(json.loads(self.grammar))} слов")
+        if self.low_latency:
+            parts.append("досрочный запуск команд" if self.early_commands else "частичные результаты")
+        return f"[{self.label}] " + ", ".join(parts)
+
+    """
+        Сторона источника: блок PCM int16 моно
+    """
+    def write(self, data):
+        if not self.paused.is_set():
+            self.ring.write(data)
+
+    def ready(self) -> bool:
+        return self.ring.available() >= self.block_bytes
+
+    def read_block(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        return self.ring.read(self.block_bytes, min_bytes=self.block_bytes, timeout=timeout)
+
+    """
+        Обрабатывает один блок; возвращает (фраза, досрочно) или None
+    """
+    def process(self, data: bytes) -> Optional[Tuple[str, bool]]:
+        if self.ring.overruns != self._overruns:
+            logger.warning("[%s] Переполнение буфера входа: потеряно блоков %s (%s байт)", self.label, self.ring.overruns, self.ring.dropped_bytes)
+            self._overruns = self.ring.overruns
+
+        start_ns = time.perf_counter_ns()
+        gate = self.gate
+        rec = self.rec
+        self.processed_bytes += len(data)
+        cpu_start = time.thread_time()
+        if gate is not None:
+            gate.energy_threshold = VAD_ENERGY_THRESHOLD * (ECHO_ENERGY_FACTOR if self.busy.is_set() else 1)
+        speech = gate.process(data) if gate is not None else data
+
+        voice_input_str = ""
+        # Фраза закончена (итоговый результат Kaldi или досрочный запуск)
+        finished = False
+        early = False
+        if speech and self.recognizer == "dual":
+            self.utterance += speech
+            if len(self.utterance) > self.utterance_cap:
+                del self.utterance[:len(self.utterance) - self.utterance_cap]
+
+        if speech and rec.AcceptWaveform(speech):
+            voice_input_str = json.loads(rec.Result()).get("text", "")
+            finished = True
+        elif gate is not None and gate.speech_ended:
+            # Участок речи закончился, а Kaldi ещё не выдал фразу - забираем её сразу
+            voice_input_str = json.loads(rec.FinalResult()).get("text", "")
+            finished = True
+        elif self.low_latency and speech:
+            partial = json.loads(rec.PartialResult()).get("partial", "")
+            now = time.monotonic()
+            if partial != self.last_partial:
+                self.last_partial, self.partial_since = partial, now
+                if not self.partial_woke and partial and self.core.wake_matcher().find(partial) is not None:
+                    self.partial_woke = True
+                    logger.info("[%s] Обращение в частичном результате: %s", self.label, partial)
+            elif (self.early_commands and self.partial_woke and (now - self.partial_since) * 1000 >= EARLY_STABLE_MS
+                  and self.core.match_complete_command(partial, self.core.session_context(self.name)) is not None):
+                voice_input_str, early, finished = partial, True, True
+
+        if gate is not None:
+            gate.account(time.thread_time() - cpu_start, len(data) / 2 / self.samplerate, bool(speech))
+
+        if finished and self.grammar is not None:
+            if voice_input_str and self.recognizer == "dual" and self.core.needs_open_vocabulary(voice_input_str):
+                # Произвольный текст - перераспознаём всю фразу открытым словарём
+                self.rec_open.AcceptWaveform(bytes(self.utterance))
+                voice_input_str = json.loads(self.rec_open.FinalResult()).get("text", "")
+            voice_input_str = _strip_unk(voice_input_str)
+            self.utterance.clear()
+            self._refresh_grammar()
+
+        if finished:
+            self.last_partial, self.partial_woke = "", False
+
+        if not voice_input_str:
+            return None
+        if early:
+            # Фраза уже обработана - Kaldi начинает новую
+            rec.Reset()
+        self.asr_span = (start_ns, time.perf_counter_ns())
+        return voice_input_str, early
+
+    """
+        Начало трассы фразы (app/core/trace.py): ID, решение о выборке и интервал распознавания
+        Возвращает (trace_id, sampled, момент постановки в очередь) для потока команд или None, если трассировка выключена
+    """
+    def start_trace(self, voice_input_str: str, early: bool) -> Optional[Tuple[str, bool, int]]:
+        if not tracer.enabled:
+            return None
+        trace_id, sampled = new_request_id(), tracer.should_sample()
+        if sampled and self.asr_span is not None:
+            tracer.record("asr", self.asr_span[0], self.asr_span[1], trace_id, input=self.label, early=early, text=voice_input_str)
+        return trace_id, sampled, time.perf_counter_ns()
+
+    """
+        Грамматика устарела (подключились новые команды) - распознаватель получает новую
+    """
+    def _refresh_grammar(self):
+        current = self.core.vosk_grammar()
+        if current is self.grammar:
+            return
+        self.grammar = current
+        if hasattr(self.rec, "SetGrammar"):
+            self.rec.SetGrammar(current)
+        else:
+            self.rec = KaldiRecognizer(self.model, self.samplerate, current)
+
+    """
+        Обрабатывает все готовые блоки (для пула потоков), фразы передаются в on_phrase(вход, фраза, досрочно)
+    """
+    def drain(self, on_phrase: Callable[["InputPipeline", str, bool], None]):
+        while self.ready():
+            data = self.read_block(timeout=0)
+            if data is None:
+                break
+            phrase = self.process(data)
+            if phrase is not None:
+                on_phrase(self, phrase[0], phrase[1])
+
+    """
+        Забывает накопленный звук (после выполнения команды в режиме blocking)
+    """
+    def discard(self):
+        self.ring.discard()
+        if self.gate is not None:
+            self.gate.reset()
+
+    """
+        Остаток фразы при завершении
+    """
+    def final_text(self) -> str:
+        return _strip_unk(json.loads(self.rec.FinalResult()).get("text", ""))
+
+    @property
+    def position(self) -> float:
+        return self.processed_bytes / 2 / self.samplerate
+
+    def summary(self) -> str:
+        lines = []
+        if self.gate is not None:
+            lines.append(f"[{self.label}] Шлюз активности голоса: {self.gate.stats.summary()}")
+        if self.ring.overruns:
+            lines.append(f"[{self.label}] Переполнений буфера: {self.ring.overruns} ({self.ring.dropped_bytes} байт)")
+        return "\n".join(lines)
+
+"""
+    Виртуальный вход: WAV-файл (PCM int16) подаётся в конвейер блоками, как звук с микрофона
+    Файл с другим расширением или "-" (stdin) читается как сырой PCM s16le моно с частотой samplerate
+    realtime=True - в темпе реального времени, иначе - так быстро, как конвейер успевает читать
+    В конце добавляется секунда тишины, чтобы шлюз и Kaldi завершили последнюю фразу
+"""
+class WavInput:
+    def __init__(self, path: str, realtime: bool = True, block_frames: int = 1600, tail_seconds: float = 1.0, samplerate: Optional[int] = None):
+        self.path = path
+        self.realtime = realtime
+        self.block_frames = block_frames
+        self.tail_seconds = tail_seconds
+        self.raw = path == "-" or not path.lower().endswith(".wav")
+        if self.raw:
+            self.samplerate = samplerate or 16000
+            self.channels = 1
+            self.frames = None if path == "-" else os.path.getsize(path) // 2
+        else:
+            with wave.open(path, "rb") as wf:
+                if wf.getsampwidth() != 2:
+                    raise ValueError(f"{path}: нужен PCM 16 бит")
+                self.samplerate = wf.getframerate()
+                self.channels = wf.getnchannels()
+                self.frames = wf.getnframes()
+        self.done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def name(self) -> str:
+        if self.path == "-":
+            return "stdin"
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.frames is None else self.frames / self.samplerate
+
+    def _open(self):
+        if self.path == "-":
+            return open(sys.stdin.fileno(), "rb", closefd=False)
+        if self.raw:
+            return open(self.path, "rb")
+        return wave.open(self.path, "rb")
+
+    def _read(self, f) -> bytes:
+        if self.raw:
+            raw = f.read(self.block_frames * 2)
+            return raw[:len(raw) - len(raw) % 2]
+        return f.readframes(self.block_frames)
+
+    def start(self, pipeline: InputPipeline, stop_event: Optional[threading.Event] = None):
+        self._thread = threading.Thread(target=self._run, args=(pipeline, stop_event), name=f"wav-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _run(self, pipeline: InputPipeline, stop_event: Optional[threading.Event]):
+        block_bytes = self.block_frames * 2
+        started = time.monotonic()
+        sent = 0
+        try:
+            with self._open() as f:
+                while stop_event is None or not stop_event.is_set():
+                    raw = self._read(f)
+                    if not raw:
+                        break
+                    if self.channels > 1:
+                        raw = numpy.frombuffer(raw, dtype=numpy.int16)[::self.channels].tobytes()
+                    self._push(pipeline, raw, stop_event)
+                    sent += len(raw) // 2
+                    if self.realtime:
+                        delay = started + sent / self.samplerate - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+
+            silence = bytes(block_bytes)
+            for _ in range(int(self.tail_seconds * self.samplerate / self.block_frames)):
+                self._push(pipeline, silence, stop_event)
+                if self.realtime:
+                    time.sleep(self.block_frames / self.samplerate)
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            self.done.set()
+
+    @staticmethod
+    def _push(pipeline: InputPipeline, raw: bytes, stop_event: Optional[threading.Event]):
+        # Файл не теряет звук: ждём места в буфере, а не считаем переполнение
+        ring = pipeline.ring
+        while ring.capacity - ring.available() < len(raw):
+            if stop_event is not None and stop_event.is_set():
+                return
+            time.sleep(0.002)
+        pipeline.write(raw)
@@ -1,19 +1,29 @@
 import base64
+import contextlib
 import datetime
 import hashlib
+import io
+import json
 import logging
 import os
 import time
 import traceback
+import wave
+
+import numpy
 
 from collections.abc import Callable
-from threading import Timer
-from typing import Dict
+from threading import Event, Lock, Timer
+from typing import Dict, Optional
 from pathlib import Path
 from app.core.load import Load
-from app.utils.all_num_to_text import all_num_to_text
+from app.core.assets import AssetBank
+from app.core.wake import WakeNameMatcher
+from app.core.log import events, log_event, setup_logging
+from app.core.trace import tracer, traced
+from app.utils.all_num_to_text import all_num_to_text, load_language
+from app.utils.spoken_numbers_ru import number_words
 from app.lib.mpcapi.core import MpcAPI
-import app.lib.lingua_franca
 
 """
     Ядро ассистента
@@ -28,6 +38,17 @@ import app.lib.lingua_franca
 
 logger = logging.getLogger(__name__)
 
+# Поля ядра, которые у каждого сеанса входа свои (см. Core.session())
+SESSION_FIELDS = ("context", "context_timer", "context_timer_last_duration", "cur_callname", "input_cmd_full")
+
+"""
+    Имя обработчика команды для трассировки: func или (func, param)
+"""
+def _handler_name(funcparam) -> str:
+    func = funcparam[0] if isinstance(funcparam, tuple) else funcparam
+    module = getattr(func, "__module__", "") or ""
+    return f"{module}.{getattr(func, '__qualname__', repr(func))}"
+
 class Core(Load):
     def __init__(self):
         # Инициализируем базовый загрузчик расширений
@@ -55,6 +76,12 @@ class Core(Load):
 
         # Словарь всех доступных команд
         self.commands = {}
+        # Версия дерева команд - растёт при каждом подключении команд расширения (индексы и грамматика перестраиваются)
+        self.commands_version = 0
+        # Команды, после которых идёт произвольный текст («лама ...», «скажи ...») - ключ манифеста free_text_commands
+        self.free_text_commands = set()
+        # Команды без аргументов, которые можно запускать досрочно по частичному результату - ключ манифеста early_commands
+        self.early_commands = set()
 
         # Список расширений
         self.extensions = {}
@@ -62,7 +89,7 @@ class Core(Load):
         # Зарегистрированные TTS-расширения: id -> (init_fn, say_fn, save_to_wav_fn?)
         self.ttss = {}
 
-        # Зарегистрированные проигрыватели WAV: id -> (init_fn, play_fn)
+        # Зарегистрированные проигрыватели WAV: id -> (init_fn, play_fn, play_pcm_fn?)
         self.play_wavs = {}
 
         # Зарегистрированные нормализаторы текста: id -> (init_fn, normalize_fn)
@@ -77,6 +104,35 @@ class Core(Load):
         # Доп. команда, которую нужно подставить при обращении по конкретному имени
         self.voice_name_run_cmd = {}
 
+        # Фразы прерывания ответа после обращения («легион стоп»), см. is_stop_command()
+        self.voice_stop_phrases = ["стоп", "хватит", "замолчи"]
+
+        # Замеры обработки текущей фразы (режим replay): None - не собираются
+        # resolved - момент вызова обработчика команды (time.perf_counter()), tts - суммарное время озвучивания, с
+        self.phrase_timings: Optional[dict] = None
+
+        # Отмена текущей речи (stop_speech()): play_voice_assistant_speech и say_stream перестают озвучивать
+        self.speech_cancel = Event()
+
+        # Нечеткое узнавание имени (ошибки распознавания: «легеон», «лигион»)
+        # Допустимое число правок (0 - только точное совпадение) и минимальная длина имени для него
+        self.voice_names_fuzzy_distance = 1
+        self.voice_names_fuzzy_min_length = 5
+        # Обычные слова, похожие на имя, которые не считаются обращением
+        self.voice_names_fuzzy_exclude = ["регион"]
+
+        # Индекс имён (строится по настройкам выше, см. wake_matcher())
+        self._wake_matcher: Optional[WakeNameMatcher] = None
+        self._wake_matcher_key = None
+
+        # Индекс законченных команд для досрочного запуска по частичному результату (см. match_complete_command())
+        self._complete_commands: Optional[Dict[str, object]] = None
+        self._complete_commands_key = None
+
+        # Грамматика Vosk из команд, имён и числительных (см. vosk_grammar())
+        self._vosk_grammar: Optional[str] = None
+        self._vosk_grammar_key = None
+
         # Использовать ли кэш TTS (wav-файлы по хэшу фраз)
         self.use_tts_cache = False
 
@@ -91,12 +147,21 @@ class Core(Load):
         self.tts_engine_id_2 = ""
         self.play_wav_engine_id = "audioplayer"
 
-        # Политика логирования all, cmd
+        # Политика логирования ввода (события "input" в логгере событий):
+        # all - любая распознанная фраза, cmd - только обращения к ассистенту и ввод в контексте, none - ничего
         self.log_policy = "cmd"
 
         # Временная папка
         self.tmp_dir = "tmp"
 
+        # Банк звуковых ресурсов: WAV из опций расширений декодируются при старте и держатся в памяти
+        # Работает только с движком play_wav, который умеет воспроизводить PCM (play_pcm), иначе не загружается
+        self.use_asset_bank = True
+
+        # Отображать PCM ресурсов в память из файлов в runtime/cache/assets вместо обычных буферов
+        self.asset_bank_mmap = False
+        self.asset_bank_dir = "cache/assets"
+
         # Счётчик временных файлов
         self.tmp_cnt = 0
 
@@ -109,6 +174,9 @@ class Core(Load):
         # Сюда складывается результат для удалённого клиента
         self.remote_tts_result = None
 
+        # Колбэк для частичных результатов потоковой озвучки (say_stream): fn(remote_tts_result)
+        self.remote_tts_partial_handler = None
+
         # Текущий контекст диалога и таймер его очистки
         self.context = None
         self.context_timer = None
@@ -127,6 +195,13 @@ class Core(Load):
         # Полная входная команда (оригинал)
         self.input_cmd_full: str = ""
 
+        # Сеансы входов (несколько микрофонов/комнат в одном процессе, см. session()):
+        # имя активного сеанса (None - общий) и сохранённое состояние остальных
+        self._session = None
+        self._sessions: Dict[str, dict] = {}
+        # Переключение сеансов и чтение их состояния из других потоков (session_context())
+        self._session_lock = Lock()
+
         # Ссылка на экземпляр FastAPI
         self.fastapi_app = None
 
@@ -135,6 +210,15 @@ class Core(Load):
         self.log_console_level = "WARNING"
         self.log_file = True
         self.log_file_level = "WARNING"
+        # Формат файла лога: "text" или "json" (структурированные события с ID запроса)
+        self.log_file_format = "text"
+        # Уровень событий ядра (ввод, таймеры - INFO, результаты нечеткого поиска - DEBUG)
+        self.log_events_level = "INFO"
+
+        # Трассировка фраз (app/core/trace.py): доля трассируемых фраз (0 - выключено, 1 - все)
+        # и сколько последних интервалов держать в памяти
+        self.trace_sample_rate = 0.0
+        self.trace_buffer_size = 2048
 
         # Идентификатор движка нормализации (для русских TTS)
         # "none" - без нормализации
@@ -151,7 +235,7 @@ class Core(Load):
         self.reply_no_command_found_context: str = "Не поняла..."
 
         # Порог уверенности для нечеткого распознавания команд
-        self.fuzzy_threshold = 0.5,
+        self.fuzzy_threshold = 0.5
 
         self.runtime_path = Path(self.runtime_dir)
         self.tmp_path = self.runtime_path / self.tmp_dir
@@ -161,37 +245,26 @@ class Core(Load):
         for p in (self.runtime_path, self.tmp_path, self.tts_cache_engine_path):
             p.mkdir(parents=True, exist_ok=True)
 
+        self.asset_bank = AssetBank(self.runtime_path / self.asset_bank_dir if self.asset_bank_mmap else None)
+
         # Язык для чисел
-        app.lib.lingua_franca.load_language(self.lingua_franca_lang)
+        load_language(self.lingua_franca_lang)
 
         # Нормализация
         if self.normalization_engine == "default":
             self.normalization_engine = "prepare"
 
-        if self.log_console or self.log_file:
-            # Сбрасываем старые обработчики, чтобы избежать дублирования логов
-            root_logger = logging.getLogger()
-            for handler in root_logger.handlers[:]:
-                root_logger.removeHandler(handler)
-
-            # Общий уровень - минимальный из двух
-            root_logger.setLevel(min(self.log_console_level, self.log_file_level))
-
-            logger = logging.getLogger(__name__)
-
-            if self.log_console:
-                console_handler = logging.StreamHandler()
-                console_handler.setLevel(self.log_console_level)
-                console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-                root_logger.addHandler(console_handler)
-                logger.info("Вывод логов в консоль включён")
-
-            if self.log_file:
-                file_handler = logging.FileHandler(self.runtime_dir + "/legion.log")
-                file_handler.setLevel(self.log_file_level)
-                file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-                root_logger.addHandler(file_handler)
-                logger.info("Вывод логов в файл включён")
+        # Запись логов - в отдельном потоке (QueueHandler/QueueListener)
+        setup_logging(
+            log_console=self.log_console,
+            log_console_level=self.log_console_level,
+            log_file=self.log_file,
+            log_file_level=self.log_file_level,
+            log_file_path=self.runtime_dir + "/legion.log",
+            log_file_format=self.log_file_format,
+            log_events_level=self.log_events_level,
+        )
+        tracer.configure(self.trace_sample_rate, self.trace_buffer_size)
 
 
     """
@@ -199,8 +272,27 @@ class Core(Load):
     """
     def init_with_extensions(self):
         self.init_extensions(["resource_downloader"])
+        self.load_assets()
         self.setup_assistant_voice()
 
+    """
+        Банк ресурсов используется: включён и активный движок play_wav умеет play_pcm (третий элемент)
+    """
+    def asset_bank_active(self) -> bool:
+        engine = self.play_wavs.get(self.play_wav_engine_id)
+        return self.use_asset_bank and engine is not None and len(engine) > 2 and engine[2] is not None
+
+    """
+        Загружает в банк звуковые ресурсы, на которые ссылаются опции расширений
+        Без движка с play_pcm ресурсы не загружаются - ими некому было бы воспользоваться
+    """
+    def load_assets(self):
+        if not self.asset_bank_active():
+            return
+        count = self.asset_bank.scan_options(self.extension_manifests)
+        if count:
+            print(f"Звуковые ресурсы загружены в память: {count}")
+
     """
         Подмешивает сущности из манифеста расширения в ядро:
             commands - словарь "варианты фраз" -> "следующий контекст/функция"
@@ -217,6 +309,18 @@ class Core(Load):
                     self.extensions[modname].append(cmd)
                 else:
                     self.extensions[modname] = [cmd]
+            self.commands_version += 1
+
+        # Команды с произвольным текстом
+        if "free_text_commands" in manifest:
+            self.free_text_commands.update(manifest["free_text_commands"])
+            self.commands_version += 1
+
+        # Команды без аргументов (полные фразы, варианты через "|")
+        if "early_commands" in manifest:
+            for phrases in manifest["early_commands"]:
+                self.early_commands.update(phrases.split("|"))
+            self.commands_version += 1
 
         # Движки TTS
         if "tts" in manifest:
@@ -302,6 +406,53 @@ class Core(Load):
         else:
             return self.normalizers[self.normalization_engine][1](self, text)
 
+    """
+        Нормализует набор текстов (расшифровка файла, субтитры, ответ целиком), порядок сохраняется
+        Повторяющиеся фразы нормализуются один раз
+        Если нормализатор регистрирует пакетную функцию (третий элемент кортежа: normalize_many(core, texts) -> list),
+        весь набор уходит ей одним вызовом - она может один раз подготовить таблицы или распараллелить работу
+    """
+    def normalize_many(self, texts):
+        texts = list(texts)
+        if self.normalization_engine == "none" or not texts:
+            return texts
+
+        unique = list(dict.fromkeys(texts))
+        engine = self.normalizers[self.normalization_engine]
+        if len(engine) > 2 and engine[2] is not None:
+            results = engine[2](self, unique)
+        else:
+            results = [engine[1](self, text) for text in unique]
+
+        normalized = dict(zip(unique, results))
+        return [normalized[text] for text in texts]
+
+    """
+        Потоковая нормализация: тексты берутся из итератора и отдаются по мере готовности
+        batch_size > 1 - тексты копятся пачками и уходят в normalize_many (меньше накладных расходов, больше задержка)
+        Уже встречавшиеся фразы повторно не нормализуются
+    """
+    def normalize_iter(self, texts, batch_size: int = 1):
+        seen = {}
+        batch = []
+        for text in texts:
+            if text in seen:
+                if not batch:
+                    yield seen[text]
+                    continue
+            batch.append(text)
+            if len(batch) >= batch_size:
+                yield from self._normalize_batch(batch, seen)
+                batch = []
+        if batch:
+            yield from self._normalize_batch(batch, seen)
+
+    def _normalize_batch(self, batch, seen):
+        todo = [text for text in dict.fromkeys(batch) if text not in seen]
+        if todo:
+            seen.update(zip(todo, self.normalize_many(todo)))
+        return [seen[text] for text in batch]
+
     """
         Озвучивание фразы разными путями: локально или подготовка данных для удалённого клиента
         Режимы remote_tts:
@@ -310,15 +461,19 @@ class Core(Load):
             saywav - генерируем wav в файл (с кэшем при необходимости), кодируем в base64 в ответ
         Можно комбинировать через запятую
     """
+    @traced("say", lambda self, text_to_speech: {"remote_tts": self.remote_tts, "chars": len(text_to_speech)})
     def play_voice_assistant_speech(self, text_to_speech: str):
+        tts_start = time.perf_counter()
         self.last_say = text_to_speech
         remote_tts_list = self.remote_tts.split(",")
 
         self.remote_tts_result = {}
         is_processed = False
 
-        # Локальное озвучивание
-        if "none" in remote_tts_list:
+        # Локальное озвучивание (пропускается, если речь прервана)
+        if "none" in remote_tts_list and self.speech_cancel.is_set():
+            is_processed = True
+        elif "none" in remote_tts_list:
             if self.ttss[self.tts_engine_id][1] is not None:
                 # Если TTS-расширение поддерживает прямое озвучивание
                 self.ttss[self.tts_engine_id][1](self, text_to_speech)
@@ -367,12 +522,88 @@ class Core(Load):
             print("Текущий remote_tts: {}".format(self.remote_tts))
             print("Текущий remote_tts_list: {}".format(remote_tts_list))
 
+        timings = self.phrase_timings
+        if timings is not None:
+            timings["tts"] = timings.get("tts", 0.0) + time.perf_counter() - tts_start
+
     """
         Псевдоним для play_voice_assistant_speech
     """
     def say(self, text_to_speech: str):
         self.play_voice_assistant_speech(text_to_speech)
 
+    """
+        Потоковое озвучивание: каждый фрагмент (например, предложение ответа LLM) нормализуется
+        и сразу уходит в play_voice_assistant_speech, не дожидаясь остальных
+        (say() текст не нормализует - тот же текст целиком озвучивают как say(core.normalize(text)))
+
+        Для удалённого клиента результат каждого фрагмента передаётся в remote_tts_partial_handler (если задан),
+        а в remote_tts_result в конце собирается общий ответ
+
+        Фрагменты нормализуются через normalize_iter: повторы - один раз; batch_size > 1 - пачками
+        через normalize_many (для заранее известного набора, например расшифровки файла)
+
+        Возвращает полный текст (без нормализации)
+    """
+    def say_stream(self, chunks, batch_size: int = 1):
+        spoken = []
+        results = []
+        originals = []
+
+        def pending():
+            for chunk in chunks:
+                if self.speech_cancel.is_set():
+                    return
+                originals.append(chunk)
+                yield chunk
+
+        for i, text in enumerate(self.normalize_iter(pending(), batch_size)):
+            if self.speech_cancel.is_set():
+                break
+            chunk = originals[i]
+            if not text or not text.strip():
+                continue
+
+            self.play_voice_assistant_speech(text)
+            spoken.append(chunk)
+            results.append(self.remote_tts_result)
+
+            if self.remote_tts_partial_handler is not None:
+                try:
+                    self.remote_tts_partial_handler(self.remote_tts_result)
+                except Exception as e:
+                    self.print_error("Ошибка передачи частичного ответа удалённому клиенту", e)
+
+        full_text = " ".join(spoken)
+        if len(results) > 1:
+            self.remote_tts_result = self._merge_remote_tts_results(results)
+        self.last_say = full_text
+        return full_text
+
+    """
+        Склеивает результаты нескольких вызовов play_voice_assistant_speech в один:
+        тексты через пробел, WAV - конкатенацией кадров (формат берётся из первого фрагмента)
+    """
+    def _merge_remote_tts_results(self, results):
+        merged = {}
+
+        txts = [r["txt"] for r in results if "txt" in r]
+        if txts:
+            merged["txt"] = " ".join(txts)
+
+        wavs = [r["wav_base64"] for r in results if "wav_base64" in r]
+        if wavs:
+            out = io.BytesIO()
+            with wave.open(out, "wb") as dst:
+                for i, wav_b64 in enumerate(wavs):
+                    with wave.open(io.BytesIO(base64.b64decode(wav_b64)), "rb") as src:
+                        if i == 0:
+                            dst.setparams(src.getparams())
+                        dst.writeframes(src.readframes(src.getnframes()))
+            merged["wav_base64"] = base64.b64encode(out.getvalue())
+
+        return merged
+
     """
         Озвучивает через второй TTS-движок
     """
@@ -389,6 +620,7 @@ class Core(Load):
     """
         Сохранение синтеза в WAV-файл основным TTS
     """
+    @traced("tts", lambda self, text_to_speech, filename: {"engine": self.tts_engine_id})
     def tts_to_filewav(self, text_to_speech: str, filename: str):
         if len(self.ttss[self.tts_engine_id]) > 2:
             self.ttss[self.tts_engine_id][2](self, text_to_speech, filename)
@@ -470,7 +702,7 @@ class Core(Load):
                 res = self.fuzzy_processors[fuzzy_processor_k][1](self, command, context)
 
             # Ожидается: None или (context_key:str, probability:float[0..1], rest_phrase:str)
-            print("Fuzzy processor {0}, result for '{1}': {2}".format(fuzzy_processor_k, command, res))
+            log_event(events, logging.DEBUG, "fuzzy.result", "Fuzzy processor %s, result for '%s': %s", fuzzy_processor_k, command, res, processor=fuzzy_processor_k, command=command, result=res)
 
             if res is not None:
                 keyall, probability, rest_phrase = res
@@ -487,6 +719,7 @@ class Core(Load):
             Если context - это dict, ищем подходящий ключ (в т.ч. через fuzzy) и рекурсивно спускаемся
             Если context - вызываемый объект (функция), вызываем её и очищаем контекст
     """
+    @traced("execute_next", lambda self, command, context: {"command": command})
     def execute_next(self, command, context):
         is_first_call = False
         # первый вход
@@ -556,12 +789,13 @@ class Core(Load):
             if self.timers[i] <= 0:
                 self.timers[i] = curtime + duration
                 self.timers_func_end[i] = timerFuncEnd
-                print(
-                    f"Новый таймер #{i} | "
-                    f"Текущее время: {self.util_time_to_readable(curtime)} | "
-                    f"Длительность: {duration} сек | "
-                    f"Время окончания: {self.util_time_to_readable(self.timers[i])}"
-                )
+                if events.isEnabledFor(logging.INFO):
+                    log_event(
+                        events, logging.INFO, "timer.set",
+                        "Новый таймер #%s | Текущее время: %s | Длительность: %s сек | Время окончания: %s",
+                        i, self.util_time_to_readable(curtime), duration, self.util_time_to_readable(self.timers[i]),
+                        timer=i, duration=duration, end=self.timers[i],
+                    )
 
                 return i
         # нет свободных таймеров
@@ -594,12 +828,13 @@ class Core(Load):
         for i in range(len(self.timers)):
             if self.timers[i] > 0:
                 if curtime >= self.timers[i]:
-                    print(
-                        "End Timer ID =",
-                        str(i),
-                        ' curtime=', self.util_time_to_readable(curtime),
-                        'endtime=', self.util_time_to_readable(self.timers[i])
-                    )
+                    if events.isEnabledFor(logging.INFO):
+                        log_event(
+                            events, logging.INFO, "timer.end",
+                            "End Timer ID = %s curtime= %s endtime= %s",
+                            i, self.util_time_to_readable(curtime), self.util_time_to_readable(self.timers[i]),
+                            timer=i, end=self.timers[i],
+                        )
                     self.clear_timer(i, True)
 
     """
@@ -622,7 +857,12 @@ class Core(Load):
             funcparam = (func, param) - вызовет func(self, phrase, param)
             funcparam = func - вызовет func(self, phrase)
     """
+    @traced("handler", lambda self, phrase, funcparam: {"handler": _handler_name(funcparam), "phrase": phrase})
     def call_ext_func_phrase(self, phrase, funcparam):
+        timings = self.phrase_timings
+        if timings is not None and "resolved" not in timings:
+            timings["resolved"] = time.perf_counter()
+
         if isinstance(funcparam, tuple):  # funcparam =(func, param)
             funcparam[0](self, phrase, funcparam[1])
         else:
@@ -631,9 +871,76 @@ class Core(Load):
 
     """
         Воспроизводит WAV-файл через зарегистрированный движок play_wav
+
+        Файлы из банка ресурсов уходят в движок готовым PCM, если он это умеет (play_pcm_fn), без чтения с диска
     """
+    @traced("play_wav", lambda self, wavfile: {"file": os.path.basename(str(wavfile)), "engine": self.play_wav_engine_id})
     def play_wav(self, wavfile):
-        self.play_wavs[self.play_wav_engine_id][1](self, wavfile)
+        engine = self.play_wavs[self.play_wav_engine_id]
+        if self.asset_bank_active():
+            asset = self.asset_bank.get(wavfile)
+            if asset is not None:
+                engine[2](self, asset[0], asset[1])
+                return
+        engine[1](self, wavfile)
+
+    """
+        Прерывает текущую речь ассистента: дальнейшие фразы не озвучиваются (до следующей команды),
+        звучащее останавливается, если движок play_wav это умеет (stop_fn - четвёртый элемент)
+        Можно вызывать из другого потока
+    """
+    def stop_speech(self):
+        self.speech_cancel.set()
+        engine = self.play_wavs.get(self.play_wav_engine_id)
+        if engine is not None and len(engine) > 3 and engine[3] is not None:
+            try:
+                engine[3](self)
+            except Exception as e:
+                logger.exception(e)
+
+    """
+        Фраза прерывания: обращение к ассистенту + одна из voice_stop_phrases («легион стоп»)
+    """
+    def is_stop_command(self, text: str) -> bool:
+        match = self.wake_matcher().find(text or "")
+        return match is not None and match.rest.strip() in self.voice_stop_phrases
+
+    """
+        Проигрывает звуковой сигнал times раз с паузой pause секунд между повторами
+    """
+    def play_asset(self, wavfile, times: int = 1, pause: float = 0.2):
+        for i in range(max(1, times)):
+            if i > 0 and pause > 0:
+                time.sleep(pause)
+            self.play_wav(wavfile)
+
+    """
+        Воспроизводит PCM-буфер (NumPy float32 в [-1, 1] или int16, форма (n,) или (n, каналы))
+
+        Если движок play_wav умеет играть буферы напрямую - передаём ему,
+        иначе пишем временный WAV и играем его через play_wav
+    """
+    def play_pcm(self, data, samplerate: int):
+        engine = self.play_wavs[self.play_wav_engine_id]
+        if len(engine) > 2 and engine[2] is not None:
+            engine[2](self, data, samplerate)
+            return
+
+        pcm = numpy.asarray(data)
+        if pcm.dtype != numpy.int16:
+            pcm = (numpy.clip(pcm, -1.0, 1.0) * 32767.0).astype(numpy.int16)
+
+        tempfilename = self.get_temp_filename() + ".wav"
+        with wave.open(tempfilename, "wb") as wf:
+            wf.setnchannels(1 if pcm.ndim == 1 else pcm.shape[1])
+            wf.setsampwidth(2)
+            wf.setframerate(int(samplerate))
+            wf.writeframes(pcm.tobytes())
+        try:
+            self.play_wav(tempfilename)
+        finally:
+            if os.path.exists(tempfilename):
+                os.unlink(tempfilename)
 
     """
         Разбирает входную строку распознанной речи и запускает команду
@@ -642,48 +949,54 @@ class Core(Load):
         Если уже есть активный контекст, обрабатываем всю строку как продолжение диалога
     """
     def run_input_str(self, voice_input_str, func_before_run_cmd=None):
-        haveRun = False
         if voice_input_str is None:
             return False
 
+        # Новая команда - прерывание предыдущего ответа больше не действует
+        self.speech_cancel.clear()
+
+        # Все записи разбора и выполнения фразы получают один ID запроса (он же ID трассы)
+        with tracer.utterance(), tracer.span("run_input_str", text=voice_input_str):
+            return self._run_input_str(voice_input_str, func_before_run_cmd)
+
+    def _log_input(self, voice_input_str, in_context: bool):
+        if in_context:
+            log_event(events, logging.INFO, "input", "Ввод (команда в контексте): %s", voice_input_str, text=voice_input_str, context=True)
+        else:
+            log_event(events, logging.INFO, "input", "Ввод (команда): %s", voice_input_str, text=voice_input_str, context=False)
+
+    def _run_input_str(self, voice_input_str, func_before_run_cmd=None):
+        haveRun = False
+
         if self.log_policy == "all":
-            if self.context is None:
-                print("Ввод (команда): ", voice_input_str)
-            else:
-                print("Ввод (команда в контексте): ", voice_input_str)
+            self._log_input(voice_input_str, self.context is not None)
 
         try:
-            voice_input = voice_input_str.split(" ")
             if self.context is None:
                 # Ищем обращение по имени ("тест", "легион" и т.п.)
-                for ind in range(len(voice_input)):
-                    callname = voice_input[ind]
-
-                    if callname in self.voice_names:
-                        self.cur_callname = callname
-                        if self.log_policy == "cmd":
-                            print("Ввод (команда): ", voice_input_str)
-
-                        # Остаток после имени ассистента
-                        command_options = " ".join([
-                            str(input_part) for input_part in voice_input[(ind + 1):len(voice_input)]
-                        ])
-
-                        # Доп. подстановка команды для конкретного имени
-                        if callname in self.voice_name_run_cmd:
-                            command_options = self.voice_name_run_cmd.get(callname) + " " + command_options
-                            print("Модифицированный ввод, добавлено ", self.voice_name_run_cmd.get(callname))
-
-                        # Хук: выполнить что-то до запуска команды
-                        if func_before_run_cmd is not None:
-                            func_before_run_cmd()
-
-                        self.execute_next(command_options, None)
-                        haveRun = True
-                        break
+                match = self.wake_matcher().find(voice_input_str)
+                if match is not None:
+                    self.cur_callname = match.name
+                    if self.log_policy == "cmd":
+                        self._log_input(voice_input_str, False)
+
+                    # Остаток после имени ассистента
+                    command_options = match.rest
+
+                    # Доп. подстановка команды для конкретного имени
+                    if match.run_cmd is not None:
+                        command_options = match.run_cmd + " " + command_options
+                        log_event(events, logging.INFO, "input.modified", "Модифицированный ввод, добавлено %s", match.run_cmd, name=match.name, run_cmd=match.run_cmd)
+
+                    # Хук: выполнить что-то до запуска команды
+                    if func_before_run_cmd is not None:
+                        func_before_run_cmd()
+
+                    self.execute_next(command_options, None)
+                    haveRun = True
             else:
                 if self.log_policy == "cmd":
-                    print("Ввод (команда в контексте): ", voice_input_str)
+                    self._log_input(voice_input_str, True)
 
                 if func_before_run_cmd is not None:
                     func_before_run_cmd()
@@ -693,10 +1006,171 @@ class Core(Load):
                 haveRun = True
 
         except Exception as err:
-            print(traceback.format_exc())
+            logger.exception(err)
 
         return haveRun
 
+    """
+        Индекс имён ассистента; перестраивается, только если изменились voice_names и связанные настройки
+    """
+    def wake_matcher(self) -> WakeNameMatcher:
+        key = (
+            tuple(self.voice_names),
+            tuple(self.voice_name_run_cmd.items()),
+            self.voice_names_fuzzy_distance,
+            self.voice_names_fuzzy_min_length,
+            tuple(self.voice_names_fuzzy_exclude),
+        )
+        if self._wake_matcher is None or key != self._wake_matcher_key:
+            self._wake_matcher = WakeNameMatcher(
+                self.voice_names,
+                self.voice_name_run_cmd,
+                max_distance=self.voice_names_fuzzy_distance,
+                min_length=self.voice_names_fuzzy_min_length,
+                exclude=self.voice_names_fuzzy_exclude,
+            )
+            self._wake_matcher_key = key
+        return self._wake_matcher
+
+    """
+        Индекс законченных команд: полная фраза (через все уровни дерева команд) -> обработчик
+        Фраза, с которой начинается более длинная команда, законченной не считается
+        В индекс попадают только фразы, объявленные расширениями в early_commands: у остальных
+        команд могут быть аргументы («поставь таймер на ...»), и они ждут окончательного результата
+    """
+    def complete_commands_index(self) -> Dict[str, object]:
+        key = (id(self.commands), len(self.commands), self.commands_version)
+        if self._complete_commands is None or key != self._complete_commands_key:
+            phrases: Dict[str, object] = {}
+
+            def walk(tree: dict, prefix: str):
+                for keyall, value in tree.items():
+                    for key_phrase in keyall.split("|"):
+                        phrase = (prefix + " " + key_phrase).strip()
+                        if isinstance(value, dict):
+                            walk(value, phrase)
+                        else:
+                            phrases[phrase] = value
+
+            walk(self.commands, "")
+            # Для каждой фразы проверяем, не начинается ли с неё другая (сортировка ставит продолжения сразу после)
+            ordered = sorted(phrases)
+            for i, phrase in enumerate(ordered):
+                for other in ordered[i + 1:]:
+                    if not other.startswith(phrase):
+                        break
+                    if other.startswith(phrase + " "):
+                        phrases.pop(phrase, None)
+                        break
+
+            self._complete_commands = {phrase: value for phrase, value in phrases.items() if phrase in self.early_commands}
+            self._complete_commands_key = key
+        return self._complete_commands
+
+    """
+        Проверяет частичный результат распознавания: обращение к ассистенту + законченная команда без аргументов
+        (см. complete_commands_index())
+        context - контекст сеанса входа, с которого пришла фраза (session_context()): вызывается из потоков
+        распознавания, пока поток команд может работать в другом сеансе
+        Возвращает совпадение имени (см. wake_matcher()) или None
+    """
+    def match_complete_command(self, text: str, context):
+        if context is not None or not text:
+            return None
+        match = self.wake_matcher().find(text)
+        if match is None:
+            return None
+        rest = match.rest.strip()
+        if match.run_cmd is not None:
+            rest = (match.run_cmd + " " + rest).strip()
+        # После команды с произвольным текстом («скажи ...») фраза ещё не закончена
+        if rest in self.free_text_commands:
+            return None
+        return match if rest in self.complete_commands_index() else None
+
+    """
+        Грамматика для KaldiRecognizer (JSON-список слов): слова всех фраз команд (с вложенными),
+        имена ассистента и числительные; "[unk]" - для всего остального
+        Перестраивается при изменении команд или имён
+    """
+    def vosk_grammar(self) -> str:
+        key = (id(self.commands), len(self.commands), self.commands_version, tuple(self.voice_names), tuple(self.voice_name_run_cmd.values()), tuple(self.voice_stop_phrases))
+        if self._vosk_grammar is None or key != self._vosk_grammar_key:
+            words = set(number_words())
+            words.update(self.voice_names)
+            for phrase in self.voice_name_run_cmd.values():
+                words.update(phrase.split())
+            for phrase in self.free_text_commands:
+                words.update(phrase.split())
+            for phrase in self.voice_stop_phrases:
+                words.update(phrase.split())
+
+            stack = [self.commands]
+            while stack:
+                tree = stack.pop()
+                for keyall, value in tree.items():
+                    for key_phrase in keyall.split("|"):
+                        words.update(key_phrase.split())
+                    if isinstance(value, dict):
+                        stack.append(value)
+
+            self._vosk_grammar = json.dumps(sorted(words) + ["[unk]"], ensure_ascii=False)
+            self._vosk_grammar_key = key
+        return self._vosk_grammar
+
+    """
+        Нужен ли фразе, распознанной по грамматике, открытый словарь:
+        после обращения идёт команда с произвольным текстом или в остатке есть неизвестные слова ([unk])
+    """
+    def needs_open_vocabulary(self, text: str) -> bool:
+        match = self.wake_matcher().find(text or "")
+        if match is None:
+            return False
+        rest = match.rest.strip()
+        if "[unk]" in rest:
+            return True
+        return any(rest == phrase or rest.startswith(phrase + " ") for phrase in self.free_text_commands)
+
+    """
+        Сеанс входа: состояние диалога (контекст, его таймер, имя обращения, исходная фраза) у каждого входа своё
+        Внутри with core.session("кухня") ядро работает с состоянием этого входа, на выходе оно сохраняется
+        Команды разных сеансов должны выполняться последовательно (из одного потока)
+    """
+    @contextlib.contextmanager
+    def session(self, name):
+        if name == self._session:
+            yield
+            return
+
+        # Состояние прежнего сеанса на время работы хранится вместе с остальными (его может очистить таймер контекста)
+        with self._session_lock:
+            previous = self._session
+            self._sessions[previous] = {field: getattr(self, field) for field in SESSION_FIELDS}
+            state = self._sessions.pop(name, None)
+            if state is None:
+                state = {"context": None, "context_timer": None, "context_timer_last_duration": 0, "cur_callname": "", "input_cmd_full": ""}
+            for field, value in state.items():
+                setattr(self, field, value)
+            self._session = name
+        try:
+            yield
+        finally:
+            with self._session_lock:
+                self._sessions[name] = {field: getattr(self, field) for field in SESSION_FIELDS}
+                for field, value in self._sessions.pop(previous).items():
+                    setattr(self, field, value)
+                self._session = previous
+
+    """
+        Контекст диалога сеанса name без переключения сеанса - для потоков распознавания
+    """
+    def session_context(self, name):
+        with self._session_lock:
+            if name == self._session:
+                return self.context
+            state = self._sessions.get(name)
+            return state["context"] if state is not None else None
+
     """
         Устанавливает новый контекст и запускает таймер его очистки
 
@@ -710,7 +1184,7 @@ class Core(Load):
 
         self.context = context
         self.context_timer_last_duration = duration
-        self.context_timer = Timer(duration, self._context_clear_timer)
+        self.context_timer = Timer(duration, self._context_clear_timer, args=(self._session,))
 
         remote_tts_list = self.remote_tts.split(",")
         if self.context_remote_wait_for_call and ("saytxt" in remote_tts_list or "saywav" in remote_tts_list):
@@ -723,8 +1197,16 @@ class Core(Load):
     """
         Колбэк таймера контекста: очищает активный контекст
     """
-    def _context_clear_timer(self):
+    def _context_clear_timer(self, session=None):
         print("Context cleared after timeout")
+        with self._session_lock:
+            if session != self._session:
+                # Таймер сеанса, который сейчас не активен, - чистим его сохранённое состояние
+                state = self._sessions.get(session)
+                if state is not None:
+                    state["context"] = None
+                    state["context_timer"] = None
+                return
         self.context_timer = None
         self.context_clear()
 
@@ -0,0 +1,174 @@
+import atexit
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from typing import Optional
+
+"""
+    Асинхронное логирование ядра
+
+    Поток запроса только кладёт запись в очередь (QueueHandler), запись в консоль и файл
+    выполняет отдельный поток (QueueListener)
+
+    События (ввод команды, нечеткий поиск, таймеры) пишутся в логгер EVENTS_LOGGER:
+        в консоль (stdout) - только текст сообщения, как раньше print
+        в файл - вместе с остальными логами, в JSON (log_file_format="json") с полями события и ID запроса
+    Уровень логгера событий задаётся отдельно - выключенные debug-строки отсекаются проверкой isEnabledFor
+    до форматирования (см. log_event)
+"""
+
+EVENTS_LOGGER = "legion.events"
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+# ID текущего запроса (фраза с микрофона, HTTP-запрос, сообщение WebSocket)
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("legion_request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+events = logging.getLogger(EVENTS_LOGGER)
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+"""
+    Контекст запроса: все записи внутри получают один request_id
+    Без явного ID используется уже установленный (вложенные вызовы), иначе создаётся новый
+"""
+@contextlib.contextmanager
+def request_context(request_id: Optional[str] = None):
+    if request_id is None:
+        request_id = _request_id.get() or new_request_id()
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+"""
+    Структурированное событие: log_event(events, logging.INFO, "timer.set", "Новый таймер #%s", i, timer=i)
+    Аргументы и поля не обрабатываются, если уровень выключен
+"""
+def log_event(logger: logging.Logger, level: int, event: str, msg: str, *args, **fields):
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, msg, *args, extra={"event": event, "fields": fields})
+
+class _RequestIdFilter(logging.Filter):
+    # Выполняется в потоке запроса - там, где установлен контекст
+    def filter(self, record):
+        record.request_id = _request_id.get() or "-"
+        return True
+
+class _RouteFilter(logging.Filter):
+    # Разводит события и обычные логи: у каждого свой порог, None - не пропускать
+    def __init__(self, level: Optional[int], events_level: Optional[int]):
+        super().__init__()
+        self.level = level
+        self.events_level = events_level
+
+    def filter(self, record):
+        if record.name == EVENTS_LOGGER or record.name.startswith(EVENTS_LOGGER + "."):
+            threshold = self.events_level
+        else:
+            threshold = self.level
+        return threshold is not None and record.levelno >= threshold
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        event = getattr(record, "event", None)
+        if event is not None:
+            data["event"] = event
+            data.update(getattr(record, "fields", None) or {})
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+def _level(level) -> int:
+    return level if isinstance(level, int) else logging.getLevelName(str(level).upper())
+
+"""
+    Настраивает корневой логгер: QueueHandler на корне, консоль/файл - в потоке QueueListener
+    Повторный вызов останавливает прежний слушатель
+"""
+def setup_logging(
+        log_console: bool = True,
+        log_console_level="WARNING",
+        log_file: bool = True,
+        log_file_level="WARNING",
+        log_file_path: str = "runtime/legion.log",
+        log_file_format: str = "text",
+        log_events_level="INFO",
+):
+    global _listener
+    shutdown_logging()
+
+    console_level = _level(log_console_level)
+    file_level = _level(log_file_level)
+    events_level = _level(log_events_level)
+
+    handlers = []
+
+    # События в консоль - как раньше print (только текст)
+    events_handler = logging.StreamHandler(sys.stdout)
+    events_handler.setFormatter(logging.Formatter("%(message)s"))
+    events_handler.addFilter(_RouteFilter(None, events_level))
+    handlers.append(events_handler)
+
+    if log_console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        console_handler.addFilter(_RouteFilter(console_level, None))
+        handlers.append(console_handler)
+
+    if log_file:
+        file_handler = logging.FileHandler(log_file_path, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter() if log_file_format == "json" else logging.Formatter(TEXT_FORMAT))
+        file_handler.addFilter(_RouteFilter(file_level, events_level))
+        handlers.append(file_handler)
+
+    # Сбрасываем старые обработчики, чтобы избежать дублирования логов
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(_RequestIdFilter())
+    root_logger.addHandler(queue_handler)
+
+    # Общий уровень - минимальный из включённых; у событий свой
+    levels = [lvl for on, lvl in ((log_console, console_level), (log_file, file_level)) if on]
+    root_logger.setLevel(min(levels) if levels else logging.CRITICAL)
+    events.setLevel(events_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=False)
+    _listener.start()
+    return _listener
+
+"""
+    Останавливает поток записи, дописав очередь до конца
+"""
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+atexit.register(shutdown_logging)
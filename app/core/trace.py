@@ -0,0 +1,182 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.core.log import get_request_id, request_context
+
+"""
+    Трассировка обработки фразы: интервалы (span) от распознавания до воспроизведения ответа
+
+    ID трассы - это ID запроса из app/core/log.py: записи журнала и интервалы одной фразы связаны
+    Решение о выборке принимается один раз на фразу (utterance()), с вероятностью sample_rate
+    Интервалы хранятся в кольцевом буфере (последние capacity) и выгружаются в формате
+    Chrome trace events (chrome://tracing, Perfetto): export_chrome()
+
+    При sample_rate=0 span() и @traced стоят одной проверки флага - интервалы не создаются
+"""
+
+# Трасса текущей фразы попала в выборку
+_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("legion_trace_sampled", default=None)
+
+class Span:
+    __slots__ = ("name", "trace_id", "start_ns", "end_ns", "tid", "thread", "args")
+
+    def __init__(self, name: str, trace_id: Optional[str], start_ns: int, end_ns: int, args: Optional[dict] = None):
+        thread = threading.current_thread()
+        self.name = name
+        self.trace_id = trace_id
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.tid = thread.ident
+        self.thread = thread.name
+        self.args = args
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+class _NullSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Tracer:
+    def __init__(self, capacity: int = 2048, sample_rate: float = 0.0):
+        self.spans: "collections.deque[Span]" = collections.deque(maxlen=capacity)
+        self.sample_rate = 0.0
+        self.enabled = False
+        self.configure(sample_rate, capacity)
+
+    """
+        sample_rate: 0 - выключено, 1 - каждая фраза
+    """
+    def configure(self, sample_rate: float, capacity: Optional[int] = None):
+        if capacity is not None and capacity != self.spans.maxlen:
+            self.spans = collections.deque(self.spans, maxlen=max(1, int(capacity)))
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.enabled = self.sample_rate > 0
+
+    """
+        Текущая фраза трассируется
+    """
+    def active(self) -> bool:
+        return self.enabled and bool(_sampled.get())
+
+    """
+        Контекст фразы: ID трассы (он же request_id) и решение о выборке
+        Внутри уже открытой фразы ничего не меняет; trace_id - продолжить трассу, начатую в другом потоке
+    """
+    @contextlib.contextmanager
+    def utterance(self, trace_id: Optional[str] = None, sampled: Optional[bool] = None):
+        if _sampled.get() is not None and trace_id is None:
+            yield get_request_id()
+            return
+
+        if sampled is None:
+            sampled = self.should_sample()
+        token = _sampled.set(sampled)
+        try:
+            with request_context(trace_id) as request_id:
+                yield request_id
+        finally:
+            _sampled.reset(token)
+
+    def should_sample(self) -> bool:
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    """
+        Интервал вокруг блока кода: with tracer.span("tts", engine="rhvoice"): ...
+    """
+    def span(self, name: str, **args):
+        if not self.enabled or not _sampled.get():
+            return _NULL_SPAN
+        return self._span(name, args)
+
+    @contextlib.contextmanager
+    def _span(self, name: str, args: dict):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.spans.append(Span(name, get_request_id(), start, time.perf_counter_ns(), args or None))
+
+    """
+        Интервал, измеренный заранее (time.perf_counter_ns()), например распознавание в потоке захвата
+        до того, как стало известно, что это фраза
+    """
+    def record(self, name: str, start_ns: int, end_ns: int, trace_id: Optional[str] = None, **args):
+        if not self.enabled:
+            return
+        if trace_id is None:
+            if not _sampled.get():
+                return
+            trace_id = get_request_id()
+        self.spans.append(Span(name, trace_id, start_ns, end_ns, args or None))
+
+    def snapshot(self, trace_id: Optional[str] = None) -> List[Span]:
+        spans = list(self.spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans
+
+    def clear(self):
+        self.spans.clear()
+
+    """
+        Интервалы в формате Chrome trace events (события "X" - полные интервалы)
+    """
+    def chrome_trace(self, trace_id: Optional[str] = None) -> Dict:
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for s in self.snapshot(trace_id):
+            threads[s.tid] = s.thread
+            args = {"trace_id": s.trace_id}
+            if s.args:
+                args.update(s.args)
+            events.append({
+                "name": s.name,
+                "cat": "legion",
+                "ph": "X",
+                "ts": s.start_ns / 1000,
+                "dur": (s.end_ns - s.start_ns) / 1000,
+                "pid": pid,
+                "tid": s.tid,
+                "args": args,
+            })
+        for tid, thread in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path: str, trace_id: Optional[str] = None) -> int:
+        data = self.chrome_trace(trace_id)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        return sum(1 for e in data["traceEvents"] if e["ph"] == "X")
+
+tracer = Tracer()
+
+"""
+    Декоратор: вызов функции - интервал name; args(*a, **kw) -> dict - атрибуты интервала
+"""
+def traced(name: str, args: Optional[Callable[..., dict]] = None):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            if not tracer.enabled or not _sampled.get():
+                return fn(*a, **kw)
+            with tracer._span(name, args(*a, **kw) if args is not None else {}):
+                return fn(*a, **kw)
+        return inner
+    return wrap
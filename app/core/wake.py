@@ -0,0 +1,124 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+"""
+    Поиск имени ассистента во фразе
+
+    Индекс строится один раз при настройке (WakeNameMatcher):
+        точные имена - словарь
+        похожие слова (ошибки распознавания: «легеон», «лигион») - индекс удалений (как в SymSpell):
+        все варианты имени без одной/двух букв -> имя; кандидат проверяется расстоянием Левенштейна
+    Поиск - один проход по словам строки без разбиения и склейки остатка
+"""
+
+_TOKEN_RE = re.compile(r"[^ ]+")
+
+class WakeMatch(NamedTuple):
+    # Порядковый номер слова во фразе
+    index: int
+    # Каноническое имя (из voice_names)
+    name: str
+    # Как имя прозвучало во фразе
+    token: str
+    # Остаток фразы после имени
+    rest: str
+    # Команда, подставляемая для этого имени (voice_name_run_cmd), или None
+    run_cmd: Optional[str]
+
+"""
+    Расстояние Левенштейна с ранним выходом, если оно заведомо больше limit
+"""
+def edit_distance(a: str, b: str, limit: int) -> int:
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    result = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+class WakeNameMatcher:
+    def __init__(self, names: Iterable[str], run_cmd: Optional[Dict[str, str]] = None, max_distance: int = 1, min_length: int = 5, exclude: Iterable[str] = ()):
+        self.names = list(names)
+        self.run_cmd = dict(run_cmd or {})
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.exclude = {self._norm(w) for w in exclude}
+
+        # точное слово -> имя
+        self.exact: Dict[str, str] = {}
+        for name in self.names:
+            self.exact[name] = name
+            self.exact.setdefault(self._norm(name), name)
+
+        # вариант с удалёнными буквами -> имена
+        self.deletes: Dict[str, List[str]] = {}
+        if max_distance > 0:
+            for name in self.names:
+                if len(name) < min_length:
+                    continue
+                for variant in _deletes(self._norm(name), max_distance):
+                    self.deletes.setdefault(variant, []).append(name)
+
+        # Результаты нечеткого поиска по словам (слов во фразах немного, а повторяются они часто)
+        self._fuzzy_cache: Dict[str, Optional[str]] = {}
+
+    @staticmethod
+    def _norm(word: str) -> str:
+        return word.lower().replace("ё", "е")
+
+    """
+        Имя ассистента для слова или None
+    """
+    def lookup(self, token: str) -> Optional[str]:
+        name = self.exact.get(token)
+        if name is not None or not self.deletes:
+            return name
+
+        cached = self._fuzzy_cache.get(token, False)
+        if cached is not False:
+            return cached
+
+        name = self._fuzzy(self._norm(token))
+        if len(self._fuzzy_cache) < 10000:
+            self._fuzzy_cache[token] = name
+        return name
+
+    def _fuzzy(self, word: str) -> Optional[str]:
+        name = self.exact.get(word)
+        if name is not None:
+            return name
+        if len(word) < self.min_length - self.max_distance or word in self.exclude:
+            return None
+
+        best, best_distance = None, self.max_distance + 1
+        for variant in _deletes(word, self.max_distance):
+            for candidate in self.deletes.get(variant, ()):
+                distance = edit_distance(word, self._norm(candidate), self.max_distance)
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return best
+
+    """
+        Находит первое обращение к ассистенту в строке
+        Остаток - срез исходной строки после имени (слова разделены пробелом, как в split(" "))
+    """
+    def find(self, text: str) -> Optional[WakeMatch]:
+        for index, m in enumerate(_TOKEN_RE.finditer(text)):
+            token = m.group()
+            name = self.lookup(token)
+            if name is not None:
+                return WakeMatch(index, name, token, text[m.end() + 1:], self.run_cmd.get(name))
+        return None
@@ -13,6 +13,9 @@ from vosk import Model
 
     Опции:
         model_path - путь к модели Vosk
+        recognizer - распознаватель /ws/asr/stream: "open" (открытый словарь) или "grammar" (только команды, см. core.vosk_grammar())
+                     В режиме "grammar" слова вне грамматики отбрасываются: аргументы команд (имена, пути, текст
+                     после «лама», «скажи») не доходят - для таких команд нужен "open"
 """
 
 def manifest() -> Dict[str, Any]:
@@ -20,7 +23,8 @@ def manifest() -> Dict[str, Any]:
         "name": "API",
 
         "options": {
-            "model_path": "./app/models/vosk"
+            "model_path": "./app/models/vosk",
+            "recognizer": "open",
         }
     }
 
@@ -36,7 +40,7 @@ def start(core: Core, manifest: Dict[str, Any]) -> None:
     try:
         model_path: str = opts["model_path"]
         model = Model(model_path)
-        attach_ws(core, app, model)
+        attach_ws(core, app, model, opts.get("recognizer", "open"))
     except Exception:
         traceback.print_exc()
         core.print_red("[api] Не удалось инициализировать модель Vosk")
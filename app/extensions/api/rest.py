@@ -1,8 +1,11 @@
 import os
+from typing import Optional
 from fastapi import APIRouter, FastAPI, HTTPException, status, UploadFile, File, Form
+from starlette.concurrency import run_in_threadpool
 from app.core.core import Core
+from app.core.trace import tracer
 from .models import SynthesizeRequest, SynthesizeResponse, CommonResponse, CommonRequest, ErrorResponse
-from .utils import run_cmd, send_raw_txt, normalize_speech_response
+from .utils import run_cmd, send_raw_txt, synthesize as synthesize_wav, normalize_speech_response
 import shutil
 from app.extensions.stt_speaker_vosk_speechbrain.main import process_audio_file
 
@@ -13,6 +16,10 @@ def attach_rest(core: Core, app: FastAPI) -> None:
     async def health():
         return {"status": "ok"}
 
+    @router.get("/trace", response_model=dict, summary="Трасса последних фраз (Chrome trace events)")
+    async def trace(trace_id: Optional[str] = None):
+        return tracer.chrome_trace(trace_id)
+
     @router.post("/synthesize",
         response_model=SynthesizeResponse,
         responses={
@@ -23,10 +30,7 @@ def attach_rest(core: Core, app: FastAPI) -> None:
     )
     async def synthesize(req: SynthesizeRequest):
         try:
-            core.remote_tts = "saywav"
-            core.remote_tts_result = ""
-            core.play_voice_assistant_speech(req.text)
-            result = core.remote_tts_result
+            result = await run_in_threadpool(synthesize_wav, core, req.text)
 
             if not isinstance(result, dict) or "wav_base64" not in result:
                 raise HTTPException(status_code=400, detail="TTS вернул неожиданный формат")
@@ -52,7 +56,7 @@ def attach_rest(core: Core, app: FastAPI) -> None:
     )
     async def send_command(req: CommonRequest):
         try:
-            result = run_cmd(core, req.text, req.format.value)
+            result = await run_in_threadpool(run_cmd, core, req.text, req.format.value)
             return normalize_speech_response(result)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Ошибка выполнения команды: {e}")
@@ -68,7 +72,7 @@ def attach_rest(core: Core, app: FastAPI) -> None:
     )
     async def send_utterance(req: CommonRequest):
         try:
-            result = send_raw_txt(core, req.text, req.format.value)
+            result = await run_in_threadpool(send_raw_txt, core, req.text, req.format.value)
             if result == "NO_VA_NAME":
                 raise HTTPException(status_code=404, detail="Ассистент не распознан в фразе")
             return normalize_speech_response(result)
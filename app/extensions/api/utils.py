@@ -1,7 +1,11 @@
+import contextlib
 import json
-from typing import Union, Dict, Any
+import threading
+import time
+from typing import Callable, Optional, Union, Dict, Any
 
 from app.core.core import Core
+from app.core.trace import tracer
 from .models import CommonResponse, ReturnFormat
 
 def map_format(fmt: ReturnFormat) -> str:
@@ -10,19 +14,42 @@ def map_format(fmt: ReturnFormat) -> str:
 
     return fmt.value
 
-def run_cmd(core: Core, cmd: str, format: str):
-    core.remote_tts = format
-    core.remote_tts_result = ""
-    core.last_say = ""
-    core.execute_next(cmd, core.context)
-    return core.remote_tts_result
+# Запросы к ядру выполняются по одному: ответ собирается в общем состоянии ядра
+# (remote_tts, remote_tts_result, last_say, context, remote_tts_partial_handler)
+# Функции ниже ждут блокировку - из async-обработчиков их вызывают через run_in_threadpool
+command_lock = threading.Lock()
 
-def send_raw_txt(core: Core, txt: str, format: str = "none"):
-    core.remote_tts = format
-    core.remote_tts_result = ""
-    core.last_say = ""
-    is_found = core.run_input_str(txt)
-    return core.remote_tts_result if is_found else "NO_VA_NAME"
+"""
+    Запрос к ядру под command_lock: формат ответа, сброс результата и обработчик частичных ответов
+    (core.say_stream) - только на время этого запроса
+"""
+@contextlib.contextmanager
+def core_request(core: Core, format: str, on_partial: Optional[Callable[[dict], None]] = None):
+    with command_lock:
+        core.remote_tts = format
+        core.remote_tts_result = ""
+        core.last_say = ""
+        core.remote_tts_partial_handler = on_partial
+        try:
+            yield
+        finally:
+            core.remote_tts_partial_handler = None
+
+def run_cmd(core: Core, cmd: str, format: str, on_partial: Optional[Callable[[dict], None]] = None):
+    with core_request(core, format, on_partial):
+        with tracer.utterance(), tracer.span("api.command", text=cmd):
+            core.execute_next(cmd, core.context)
+        return core.remote_tts_result
+
+def send_raw_txt(core: Core, txt: str, format: str = "none", on_partial: Optional[Callable[[dict], None]] = None):
+    with core_request(core, format, on_partial):
+        is_found = core.run_input_str(txt)
+        return core.remote_tts_result if is_found else "NO_VA_NAME"
+
+def synthesize(core: Core, text: str):
+    with core_request(core, "saywav"):
+        core.play_voice_assistant_speech(text)
+        return core.remote_tts_result
 
 """
     Приводит текущие форматы (none | {text} | {wav_base64} | оба) к CommonResponse
@@ -64,15 +91,22 @@ def process_chunk(core: Core, rec, message: bytes | str, format: str) -> Dict[st
         heard = final.get("text") or None
         return {"heard": heard, "text": None, "wav_base64": None}
 
+    start_ns = time.perf_counter_ns()
     if rec.AcceptWaveform(message):
         try:
             resj = json.loads(rec.Result() or "{}")
         except Exception:
             resj = {}
         text = resj.get("text", "") or ""
+        # Слова вне грамматики (распознаватель "grammar")
+        if "[unk]" in text:
+            text = " ".join(w for w in text.split() if w != "[unk]")
 
         if text:
-            result = send_raw_txt(core, text, format)
+            # Трасса фразы: распознавание (последний чанк) и выполнение
+            with tracer.utterance():
+                tracer.record("asr", start_ns, time.perf_counter_ns(), text=text)
+                result = send_raw_txt(core, text, format)
 
             if result != "NO_VA_NAME":
                 norm = normalize_speech_response(result)
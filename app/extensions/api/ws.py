@@ -1,10 +1,27 @@
+import asyncio
 import json
 from fastapi import FastAPI, WebSocket
+from starlette.concurrency import run_in_threadpool
 from vosk import Model, KaldiRecognizer
 from app.core.core import Core
 from .utils import send_raw_txt, run_cmd, normalize_speech_response, process_chunk
 
-def attach_ws(core: Core, app: FastAPI, model: Model) -> None:
+def attach_ws(core: Core, app: FastAPI, model: Model, recognizer: str = "open") -> None:
+
+    """
+        Выполняет команду в пуле потоков (по одной, см. utils.command_lock); частичные ответы потоковой
+        озвучки (core.say_stream) сразу отправляются этому клиенту с пометкой "partial": true,
+        итоговый ответ возвращается как обычно
+    """
+    async def run_with_partials(websocket: WebSocket, func, text: str, format: str):
+        loop = asyncio.get_running_loop()
+
+        def on_partial(result):
+            message = normalize_speech_response(result).model_dump()
+            message["partial"] = True
+            asyncio.run_coroutine_threadsafe(websocket.send_text(json.dumps(message, ensure_ascii=False)), loop)
+
+        return await run_in_threadpool(func, core, text, format, on_partial)
 
     """
         Принимает raw PCM16 LE mono 48kHz
@@ -17,18 +34,21 @@ def attach_ws(core: Core, app: FastAPI, model: Model) -> None:
     @app.websocket("/ws/asr/stream")
     async def ws_asr_stream(websocket: WebSocket):
         await websocket.accept()
-        rec = KaldiRecognizer(model, 48000)
+        if recognizer == "grammar":
+            rec = KaldiRecognizer(model, 48000, core.vosk_grammar())
+        else:
+            rec = KaldiRecognizer(model, 48000)
 
         while True:
             msg = await websocket.receive()
             if "bytes" in msg and msg["bytes"] is not None:
                 data = msg["bytes"]
-                payload = process_chunk(core, rec, data, "saytxt,saywav")
+                payload = await run_in_threadpool(process_chunk, core, rec, data, "saytxt,saywav")
                 await websocket.send_text(json.dumps(payload, ensure_ascii=False))
             elif "text" in msg and msg["text"] is not None:
                 text = msg["text"]
                 if text.strip() in ('{"eof" : 1}', '{"eof":1}', '{"eof": 1}'):
-                    payload = process_chunk(core, rec, text, "saytxt,saywav")
+                    payload = await run_in_threadpool(process_chunk, core, rec, text, "saytxt,saywav")
                     await websocket.send_text(json.dumps(payload, ensure_ascii=False))
                 else:
                     await websocket.send_text(json.dumps(
@@ -56,7 +76,7 @@ def attach_ws(core: Core, app: FastAPI, model: Model) -> None:
             data = await websocket.receive_text()
             try:
                 payload = json.loads(data)
-                result = run_cmd(core, payload.get("text", ""), payload.get("format", "none"))
+                result = await run_with_partials(websocket, run_cmd, payload.get("text", ""), payload.get("format", "none"))
                 await websocket.send_text(json.dumps(
                     normalize_speech_response(result).model_dump(),
                     ensure_ascii=False
@@ -71,7 +91,7 @@ def attach_ws(core: Core, app: FastAPI, model: Model) -> None:
             data = await websocket.receive_text()
             try:
                 payload = json.loads(data)
-                result = send_raw_txt(core, payload.get("text", ""), payload.get("format", "none"))
+                result = await run_with_partials(websocket, send_raw_txt, payload.get("text", ""), payload.get("format", "none"))
                 await websocket.send_text(json.dumps(
                     normalize_speech_response(result).model_dump(),
                     ensure_ascii=False
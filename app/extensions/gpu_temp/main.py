@@ -31,6 +31,8 @@ def manifest() -> Dict[str, Any]:
         "commands": {
             "температура видеокарты": _cmd_gpu_temp,
         },
+
+        "early_commands": ["температура видеокарты"],
     }
 
 def start(core: Core, manifest: Dict[str, Any]) -> None:
@@ -5,7 +5,8 @@ from datetime import datetime
 from typing import Any, Dict
 
 from app.core.core import Core
-from app.utils.num_to_text_ru import num2text
+from app.utils.num_to_text_ru import num2text, precompute
+from app.utils.spoken_numbers_ru import parse_duration, duration_seconds, duration_to_text, parts_from_seconds
 
 """
     Приветствия, Дата/Время, Таймер (+список/удаление), Рандом (монета/кубик).
@@ -24,7 +25,7 @@ from app.utils.num_to_text_ru import num2text
         привет|доброе утро                                      -> приветствие
         дата                                                    -> озвучить дату
         время                                                   -> озвучить время
-        поставь таймер|поставь тайгер|таймер|тайгер [на ...]    -> таймер (по умолчанию 5 минут)
+        поставь таймер|поставь тайгер|таймер|тайгер [на ...]    -> таймер (по умолчанию 5 минут; «на час тридцать», «на полчаса»)
         таймеры|список таймеров                                 -> озвучить активные таймеры
         удали таймер|сбрось таймер|отмени таймер [N]            -> удалить конкретный таймер
         удали все таймеры|сбрось все таймеры|отмени все таймеры -> удалить все таймеры
@@ -63,13 +64,32 @@ def manifest() -> Dict[str, Any]:
             },
 
             "команды": _list_all_commands,
-        }
+        },
+
+        "early_commands": [
+            "привет|доброе утро",
+            "дата",
+            "время",
+            "таймеры|список таймеров",
+            "удали все таймеры|сбрось все таймеры|отмени все таймеры",
+            "подбрось монету|подбрось монетку|брось монету|брось монетку",
+            "подбрось кубик|подбрось кость|брось кубик|брось кость",
+            "команды",
+        ],
     }
 
 _last_list_ids: list[int] = []
 
+female_units_min = (('минута', 'минуты', 'минут'), 'f')
+female_units_sec = (('секунда', 'секунды', 'секунд'), 'f')
+male_units_hours = (('час', 'часа', 'часов'), 'm')
+no_units_f = (('', '', ''), 'f')
+no_units_m = (('', '', ''), 'm')
+
 def start(core: Core, manifest: Dict[str, Any]) -> None:
-    pass
+    # Готовые формы чисел для времени и таймеров - чтобы первый ответ не строил таблицы
+    for units in (female_units_min, female_units_sec, male_units_hours, no_units_f, no_units_m):
+        precompute(units)
 
 def _play_greetings(core: Core, phrase: str):
     greet_str = random.choice(["И тебе привет!", "Рада тебя видеть!"])
@@ -96,11 +116,11 @@ def _play_time(core: Core, phrase: str):
     skipMinutesWhenZero = bool(opts.get("skipMinutesWhenZero", True))
 
     if skipUnits:
-        units_minutes = (('', '', ''), 'f')
-        units_hours = (('', '', ''), 'm')
+        units_minutes = no_units_f
+        units_hours = no_units_m
     else:
-        units_minutes = (('минута', 'минуты', 'минут'), 'f')
-        units_hours = (('час', 'часа', 'часов'), 'm')
+        units_minutes = female_units_min
+        units_hours = male_units_hours
 
     now = datetime.now()
     hours = int(now.strftime("%H"))
@@ -125,11 +145,6 @@ def _play_time(core: Core, phrase: str):
 
     core.say(txt)
 
-female_units_min2 = (('минуту', 'минуты', 'минут'), 'f')
-female_units_min  = (('минута', 'минуты', 'минут'), 'f')
-female_units_sec2 = (('секунду', 'секунды', 'секунд'), 'f')
-female_units_sec  = (('секунда', 'секунды', 'секунд'), 'f')
-
 def _set_timer(core: Core, phrase: str):
     phrase = (phrase or "").strip()
     if phrase == "":
@@ -138,62 +153,31 @@ def _set_timer(core: Core, phrase: str):
         _set_timer_real(core, 5 * 60, txt)
         return
 
-    phrase += " "
-    if phrase.startswith("на "):
-        phrase = phrase[3:]
-
-    # Секунды
-    for i in range(100, 1, -1):
-        t1 = num2text(i, female_units_sec) + " "
-        if phrase.startswith(t1):
-            _set_timer_real(core, i, t1)
-            return
-        t2 = num2text(i, female_units_sec2) + " "
-        if phrase.startswith(t2):
-            _set_timer_real(core, i, t1)
-            return
-        t3 = f"{i} секунд "
-        if phrase.startswith(t3):
-            _set_timer_real(core, i, t1)
-            return
-
-    # Минуты
-    for i in range(100, 1, -1):
-        t1 = num2text(i, female_units_min) + " "
-        if phrase.startswith(t1):
-            _set_timer_real(core, i * 60, t1)
-            return
-        t2 = num2text(i, female_units_min2) + " "
-        if phrase.startswith(t2):
-            _set_timer_real(core, i * 60, t1)
-            return
-        t3 = f"{i} минут "
-        if phrase.startswith(t3):
-            _set_timer_real(core, i * 60, t1)
-            return
-
-    # Без единиц - считаем минутами
-    for i in range(100, 1, -1):
-        t1 = num2text(i, female_units_min) + " "
-        t2 = num2text(i) + " "
-        if phrase.startswith(t2):
-            _set_timer_real(core, i * 60, t1)
-            return
-        t3 = f"{i} "
-        if phrase.startswith(t3):
-            _set_timer_real(core, i * 60, t1)
-            return
-
-    # Спецкейс на 1 минуту
-    if phrase.startswith(("один ", "одна ", "одну ")):
-        t1 = num2text(1, female_units_min)
-        _set_timer_real(core, 60, t1)
+    # Числа, единицы и составные длительности («на двадцать пять минут», «час тридцать») - за один проход
+    parts = parse_duration(phrase)
+    if parts is None:
+        parts = _extract_duration_parts(phrase)
+    if parts:
+        _set_timer_real(core, duration_seconds(parts), duration_to_text(parts))
         return
 
     # Непонятно - сохраняем контекст и переспрашиваем
     core.say("Что после таймера ?")
     core.context_set(_set_timer)
 
+"""
+    Запасной разбор длительности через lingua_franca («через две с половиной минуты» и т.п.)
+"""
+def _extract_duration_parts(phrase: str):
+    try:
+        from lingua_franca.parse import extract_duration
+        result = extract_duration(phrase, lang="ru")
+    except Exception:
+        return None
+    if not result or result[0] is None:
+        return None
+    return parts_from_seconds(int(result[0].total_seconds())) or None
+
 def _set_timer_real(core: Core, seconds: int, txt: str):
     core.set_timer(seconds, (_after_timer, txt))
     core.play_voice_assistant_speech("Ставлю таймер на " + txt)
@@ -203,9 +187,7 @@ def _after_timer(core: Core, txt: str):
     times = int(opts.get("wavRepeatTimes", 1))
     wav_path = opts.get("wavPath", "assets/audio/timer.wav")
 
-    for _ in range(max(1, times)):
-        core.play_wav(wav_path)
-        time.sleep(0.2)
+    core.play_asset(wav_path, times, 0.2)
 
     core.play_voice_assistant_speech(txt + " прошло")
 
@@ -310,10 +292,10 @@ def _format_left_ru(seconds: int) -> str:
     mins = seconds // 60
     secs = seconds % 60
     if mins > 0 and secs > 0:
-        return f"{num2text(mins, (('минута','минуты','минут'),'f'))} {num2text(secs, (('секунда','секунды','секунд'),'f'))}"
+        return f"{num2text(mins, female_units_min)} {num2text(secs, female_units_sec)}"
     if mins > 0:
-        return f"{num2text(mins, (('минута','минуты','минут'),'f'))}"
-    return f"{num2text(secs, (('секунда','секунды','секунд'),'f'))}"
+        return f"{num2text(mins, female_units_min)}"
+    return f"{num2text(secs, female_units_sec)}"
 
 def _play_coin(core: Core, phrase: str):
     core.play_voice_assistant_speech(random.choice(["Выпал орел", "Выпала решка"]))
@@ -1,7 +1,8 @@
 import logging
-import re
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from app.core.core import Core
+from app.extensions.normalizer_prepare.normalizer import get_normalizer, normalize_in_pool
+from app.extensions.normalizer_prepare.transliterator import LatinTransliterator
 
 """
     Расширение для нормализации текста перед синтезом речи
@@ -18,11 +19,16 @@ from app.core.core import Core
             - сохранение без изменений
 
         Опции:
-            hangeNumbers         - ЧИСЛА: process | delete | no_process
+            changeNumbers        - ЧИСЛА: process | delete | no_process
             changeLatin          - ЛАТИНИЦА: process | delete | no_process
             changeSymbols        - символы, которые заменяем словами
             keepSymbols          - символы, которые оставляем как есть
             deleteUnknownSymbols - удалять ли всё остальное из прочих символов
+            latinCachePath       - таблица транслитерации английских слов (JSON); пусто - только в памяти
+            batchProcesses       - процессов для пакетной нормализации (Core.normalize_many); 0 - в текущем процессе
+            batchPoolMinTexts    - с какого размера пакета включать пул процессов
+
+        Нормализатор компилируется один раз на набор опций и проходит текст за один проход (см. normalizer.py)
 """
 
 def manifest() -> Dict[str, Any]:
@@ -35,10 +41,13 @@ def manifest() -> Dict[str, Any]:
             "changeSymbols": r"#$%&*+\-/<=>@~[\]_`{|}№\\^",
             "keepSymbols": r",.?!;:() «»\"' ",
             "deleteUnknownSymbols": True,
+            "latinCachePath": "./runtime/normalizer_prepare/latin_words.json",
+            "batchProcesses": 0,
+            "batchPoolMinTexts": 200,
         },
 
         "normalizer": {
-            "prepare": (init, normalize)
+            "prepare": (init, normalize, normalize_many)
         },
     }
 
@@ -47,111 +56,44 @@ logger = logging.getLogger(__name__)
 def start(core: Core, manifest: Dict[str, Any]) -> None:
     pass
 
+_transliterator: Optional[LatinTransliterator] = None
+
+"""
+    Таблица транслитерации английских слов (загружается один раз; пересоздаётся при смене пути)
+"""
+def _get_transliterator(opts: dict) -> LatinTransliterator:
+    global _transliterator
+    path = opts.get("latinCachePath") or None
+    if _transliterator is None or _transliterator.path != path:
+        if _transliterator is not None:
+            _transliterator.flush()
+        _transliterator = LatinTransliterator(path)
+    return _transliterator
+
 def init(core: Core):
-    pass
+    transliterator = _get_transliterator(core.extension_options(__package__))
+    logger.debug("Таблица транслитерации: %d слов", len(transliterator))
 
 def normalize(core: Core, text: str) -> str:
-    opts = core.extension_options(__package__)
     logger.debug("Текст до преобразований: %s", text)
-
-    # Если только кириллица + разрешённая пунктуация - возвращаем как есть
-    if not re.search(r'[^,.?!;:"() «»\'ЁА-Яа-яё\d\s%-]', text):
-        return _process_numbers(core, text, opts)
-
-    # 1) Символы -> слова / сохранить / удалить
-    text = _process_symbols(text, opts)
-
-    # 2) Числа -> слова/удалить/оставить
-    text = _process_numbers(core, text, opts)
-
-    # 3) Латиница -> удалить/оставить/конвертировать в русскую «фонетику»
-    text = _process_latin(text, opts)
-
-    # Финальная чистка пробелов
-    text = re.sub(r"\s+", " ", text).strip()
-    logger.info("Текст после всех преобразований: %s", text)
-    return text
-
-def _process_symbols(text: str, opts: dict) -> str:
-    change = opts.get("changeSymbols", "")
-    keep = opts.get("keepSymbols", "")
-    delete_unknown = bool(opts.get("deleteUnknownSymbols", True))
-
-    symbol_dict = {
-        '!': ' восклицательный знак ', '"': ' двойная кавычка ', '#': ' решётка ', '$': ' доллар ',
-        '%': ' процент ', '&': ' амперсанд ', "'": ' кавычка ', '(': ' левая скобка ', ')': ' правая скобка ',
-        '*': ' звёздочка ', '+': ' плюс ', ',': ',', '-': ' минус ', '.': '.', '/': ' косая черта ',
-        ':': ':', ';': ';', '<': ' меньше ', '=': ' равно ', '>': ' больше ', '?': '?', '@': ' собака ',
-        '~': ' тильда ', '[': ' левая квадратная скобка ', '\\': ' обратная косая черта ',
-        ']': ' правая квадратная скобка ', '^': ' циркумфлекс ', '_': ' нижнее подчеркивание ',
-        '`': ' обратная кавычка ', '{': ' левая фигурная скобка ', '|': ' вертикальная черта ',
-        '}': ' правая фигурная скобка ', '№': ' номер ',
-        '«': ' « ', '»': ' » ',
-    }
-
-    # Оставляем только разрешённые к замене
-    repl = {k: v for k, v in symbol_dict.items() if k in change}
-    # Символы, которые просто сохраняем
-    repl.update({k: k for k in keep})
-
-    if repl:
-        text = text.translate(str.maketrans(repl))
-
-    if delete_unknown:
-        # Всё, что не кириллица/латиница/цифра/пробел и не входит в набор keep/change - удаляем
-        safe = re.escape(change + keep)
-        text = re.sub(fr"[^{safe}A-Za-zЁА-Яа-яё0-9\s%-]", "", text)
-
+    # Таблицы и регулярные выражения компилируются один раз на набор опций
+    opts = core.extension_options(__package__)
+    normalizer = get_normalizer(opts, core.all_num_to_text, _get_transliterator(opts))
+    text = normalizer.normalize(text)
+    logger.debug("Текст после всех преобразований: %s", text)
     return text
 
-def _process_numbers(core: Core, text: str, opts: dict) -> str:
-    mode = (opts.get("changeNumbers") or "process").lower()
-    if not re.search(r"\d", text):
-        return text
-    if mode == "process":
-        text = core.all_num_to_text(text)
-    elif mode == "delete":
-        text = re.sub(r"\d", "", text)
-    # no_process - оставляем
-    # Проценты: заменяем знак на слово
-    return text.replace("%", " процентов")
-
-def _process_latin(text: str, opts: dict) -> str:
-    mode = (opts.get("changeLatin") or "process").lower()
-    if not re.search(r"[A-Za-z]", text) or mode == "no_process":
-        return text
-    if mode == "delete":
-        return re.sub(r"[A-Za-z]", "", text)
-
-    # mode == process -> конвертируем через IPA в русскую «фонетику»
-    ipa2ru_map = {
-        "p": "п", "b": "б", "t": "т", "d": "д", "k": "к", "g": "г", "m": "м", "n": "н",
-        "ŋ": "нг", "ʧ": "ч", "ʤ": "дж", "f": "ф", "v": "в", "θ": "т", "ð": "з", "s": "с", "z": "з",
-        "ʃ": "ш", "ʒ": "ж", "h": "х", "w": "в", "j": "й", "r": "р", "l": "л",
-        "i": "и", "ɪ": "и", "e": "э", "ɛ": "э", "æ": "э", "ʌ": "а", "ə": "е", "u": "у", "ʊ": "у",
-        "oʊ": "оу", "ɔ": "о", "ɑ": "а", "aɪ": "ай", "aʊ": "ау", "ɔɪ": "ой", "ɛr": "ё", "ər": "ё",
-        "ɚ": "а", "ju": "ю", "əv": "ов", "o": "о", "ˈ": "", "ˌ": "", "*": "",
-    }
-
-    try:
-        import app.lib.eng_to_ipa as ipa
-    except Exception as e:
-        logger.warning("Нет eng_to_ipa, латиница останется как есть: %s", e)
-        return text
-
-    ipa_text = ipa.convert(text)
-    logger.debug("IPA: %s", ipa_text)
-
-    def ipa2ru_at_pos(s: str, pos: int) -> tuple[str, int]:
-        ch2 = s[pos:pos+2]
-        if ch2 in ipa2ru_map: return ipa2ru_map[ch2], pos+2
-        ch1 = s[pos]
-        if ch1 in ipa2ru_map: return ipa2ru_map[ch1], pos+1
-        if ord(ch1) < 128:    return ch1, pos+1
-        return ch1, pos+1
-
-    out, i = [], 0
-    while i < len(ipa_text):
-        chunk, i = ipa2ru_at_pos(ipa_text, i)
-        out.append(chunk)
-    return "".join(out)
+"""
+    Пакетная нормализация (Core.normalize_many): нормализатор компилируется один раз на весь набор,
+    большие наборы при batchProcesses > 0 уходят в пул процессов
+"""
+def normalize_many(core: Core, texts: List[str]) -> List[str]:
+    opts = core.extension_options(__package__)
+    processes = int(opts.get("batchProcesses", 0) or 0)
+    if processes > 0 and len(texts) >= int(opts.get("batchPoolMinTexts", 200)):
+        try:
+            return normalize_in_pool(opts, core.lingua_franca_lang, texts, processes)
+        except Exception as e:
+            core.print_error("Ошибка пакетной нормализации в пуле процессов, нормализую в текущем", e)
+
+    return get_normalizer(opts, core.all_num_to_text, _get_transliterator(opts)).normalize_many(texts)
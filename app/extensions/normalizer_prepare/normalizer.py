@@ -0,0 +1,193 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app.extensions.normalizer_prepare.transliterator import LatinTransliterator
+
+"""
+    Скомпилированный нормализатор текста для TTS
+
+    Все таблицы и регулярные выражения строятся один раз на набор опций (см. PrepareNormalizer),
+    сама нормализация - один проход токенизатора по тексту:
+        число (цифры с точками/дефисами) -> в слова / удалить / оставить
+        точка внутри имени файла ("song_01.wav") -> «точка»
+        латиница (слова через пробелы и апострофы) -> русская «фонетика» через IPA (пословный кэш) / удалить / оставить
+        прочий символ -> слово / оставить / удалить (по таблице)
+    Кириллица и пробелы проходят без изменений
+"""
+
+SYMBOL_WORDS = {
+    '!': ' восклицательный знак ', '"': ' двойная кавычка ', '#': ' решётка ', '$': ' доллар ',
+    '%': ' процент ', '&': ' амперсанд ', "'": ' кавычка ', '(': ' левая скобка ', ')': ' правая скобка ',
+    '*': ' звёздочка ', '+': ' плюс ', ',': ',', '-': ' минус ', '.': '.', '/': ' косая черта ',
+    ':': ':', ';': ';', '<': ' меньше ', '=': ' равно ', '>': ' больше ', '?': '?', '@': ' собака ',
+    '~': ' тильда ', '[': ' левая квадратная скобка ', '\\': ' обратная косая черта ',
+    ']': ' правая квадратная скобка ', '^': ' циркумфлекс ', '_': ' нижнее подчеркивание ',
+    '`': ' обратная кавычка ', '{': ' левая фигурная скобка ', '|': ' вертикальная черта ',
+    '}': ' правая фигурная скобка ', '№': ' номер ',
+    '«': ' « ', '»': ' » ',
+}
+
+# Текст только из кириллицы, цифр и разрешённой пунктуации - символы и латиницу можно не разбирать
+_PLAIN_RE = re.compile(r'[^,.?!;:"() «»\'ЁА-Яа-яё\d\s%-]')
+_DIGIT_RE = re.compile(r"\d")
+_LATIN_WORD_RE = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+
+class PrepareNormalizer:
+    def __init__(self, opts: dict, num_to_text: Callable[[str], str], transliterator: Optional[LatinTransliterator] = None):
+        self.num_to_text = num_to_text
+        self.transliterator = transliterator if transliterator is not None else LatinTransliterator()
+        self.numbers_mode = (opts.get("changeNumbers") or "process").lower()
+        self.latin_mode = (opts.get("changeLatin") or "process").lower()
+
+        change = opts.get("changeSymbols", "")
+        keep = opts.get("keepSymbols", "")
+        delete_unknown = bool(opts.get("deleteUnknownSymbols", True))
+
+        # Таблица символов: символ -> замена
+        # Сначала заменяемые словами, затем сохраняемые как есть (сохранение важнее замены)
+        self.symbols: Dict[str, str] = {k: v for k, v in SYMBOL_WORDS.items() if k in change}
+        self.symbols.update({k: k for k in keep})
+        # Символы, которые не удаляются при deleteUnknownSymbols
+        self.delete_unknown = delete_unknown
+        self.allowed = set(change) | set(keep) | {"%", "-"}
+
+        # Дефис и точка переживают замену символов - значит, участвуют в числах (диапазоны, минусы, дроби)
+        # Число заканчивается цифрой: точка в "01.wav" - не часть числа
+        num_chars = "".join(c for c in ".-" if self.symbols.get(c, c) == c)
+        num_class = re.escape(num_chars) if num_chars else ""
+        self.number_pattern = rf"[{num_class}]*\d(?:\d|[{num_class}]+(?=\d))*" if num_class else r"\d+"
+
+        # Точка между словом/числом и латинским суффиксом без пробела - расширение файла, читается словом
+        # (если точка не удаляется как неизвестный символ)
+        dot_kept = self.symbols.get(".") == "." or not delete_unknown
+        self.file_dot = " точка " if dot_kept else " "
+
+        self.tokenizer = re.compile(
+            rf"(?P<num>{self.number_pattern})"
+            r"|(?P<dot>(?<=[A-Za-zЁА-Яа-яё0-9])\.(?=[A-Za-z]))"
+            r"|(?P<lat>[A-Za-z]+(?:['’][A-Za-z]+)*(?:\s+[A-Za-z]+(?:['’][A-Za-z]+)*)*)"
+            r"|(?P<sym>[^A-Za-zЁА-Яа-яё0-9\s])"
+        )
+
+    """
+        Нормализует текст за один проход токенизатора
+    """
+    def normalize(self, text: str) -> str:
+        # Только кириллица + разрешённая пунктуация - разбираем лишь числа
+        if not _PLAIN_RE.search(text):
+            return self._numbers_only(text)
+
+        # Все неизвестные английские слова фразы - одним вызовом eng_to_ipa
+        if self.latin_mode == "process":
+            self.transliterator.prefetch(_LATIN_WORD_RE.findall(text))
+
+        has_digits = _DIGIT_RE.search(text) is not None
+        text = self.tokenizer.sub(lambda m: self._dispatch(m, has_digits), text)
+        return " ".join(text.split())
+
+    """
+        Нормализует набор текстов одним скомпилированным нормализатором
+        Английские слова всего набора транслитерируются заранее одним вызовом
+    """
+    def normalize_many(self, texts: List[str]) -> List[str]:
+        if self.latin_mode == "process":
+            self.transliterator.prefetch(w for text in texts for w in _LATIN_WORD_RE.findall(text))
+        normalize = self.normalize
+        return [normalize(text) for text in texts]
+
+    def _numbers_only(self, text: str) -> str:
+        if not _DIGIT_RE.search(text):
+            return text
+        if self.numbers_mode == "process":
+            text = self.num_to_text(text)
+        elif self.numbers_mode == "delete":
+            text = _DIGIT_RE.sub("", text)
+        return text.replace("%", " процентов")
+
+    def _dispatch(self, m: re.Match, has_digits: bool) -> str:
+        kind = m.lastgroup
+        token = m.group()
+
+        if kind == "num":
+            if self.numbers_mode == "process":
+                words = self.num_to_text(token).replace("%", " процентов")
+                # Число вплотную к слову ("llama3") читается отдельным словом
+                start, end, s = m.start(), m.end(), m.string
+                if start > 0 and s[start - 1].isalpha():
+                    words = " " + words
+                if end < len(s) and s[end].isalpha():
+                    words += " "
+                return words
+            if self.numbers_mode == "delete":
+                return _DIGIT_RE.sub("", token)
+            return token
+
+        if kind == "lat":
+            return self._latin(token)
+
+        if kind == "dot":
+            return self.file_dot
+
+        repl = self.symbols.get(token)
+        if repl is None:
+            if self.delete_unknown and token not in self.allowed:
+                return ""
+            repl = token
+        # Знак процента, переживший замену символов, в тексте с числами произносится словом
+        if repl == "%" and has_digits:
+            return " процентов"
+        return repl
+
+    def _latin(self, token: str) -> str:
+        if self.latin_mode == "no_process":
+            return token
+        if self.latin_mode == "delete":
+            return ""
+
+        return self.transliterator.convert(token)
+
+_compiled: Optional[PrepareNormalizer] = None
+_compiled_key = None
+
+"""
+    Возвращает нормализатор, скомпилированный для текущих опций (перекомпиляция - только при их изменении)
+"""
+def get_normalizer(opts: dict, num_to_text: Callable[[str], str], transliterator: Optional[LatinTransliterator] = None) -> PrepareNormalizer:
+    global _compiled, _compiled_key
+    key = (
+        opts.get("changeNumbers"),
+        opts.get("changeLatin"),
+        opts.get("changeSymbols"),
+        opts.get("keepSymbols"),
+        opts.get("deleteUnknownSymbols"),
+        num_to_text,
+        transliterator,
+    )
+    if _compiled is None or key != _compiled_key:
+        _compiled = PrepareNormalizer(opts, num_to_text, transliterator)
+        _compiled_key = key
+    return _compiled
+
+# Нормализатор процесса пула (см. normalize_in_pool)
+_worker: Optional[PrepareNormalizer] = None
+
+def _pool_init(opts: dict, lang: str):
+    global _worker
+    from app.utils.all_num_to_text import all_num_to_text, load_language
+    load_language(lang)
+    # Таблица транслитерации в процессах пула только читается - общий файл пишет основной процесс
+    transliterator = LatinTransliterator(opts.get("latinCachePath") or None, persist=False)
+    _worker = PrepareNormalizer(opts, all_num_to_text, transliterator)
+
+def _pool_normalize(texts: List[str]) -> List[str]:
+    return _worker.normalize_many(texts)
+
+"""
+    Нормализует большой набор текстов в пуле процессов (озвучивание целой расшифровки и т.п.)
+    Каждый процесс один раз загружает язык и компилирует нормализатор, тексты раздаются пачками по chunk_size
+"""
+def normalize_in_pool(opts: dict, lang: str, texts: List[str], processes: int, chunk_size: int = 64) -> List[str]:
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_pool_init, initargs=(dict(opts), lang)) as pool:
+        return [text for chunk in pool.map(_pool_normalize, chunks) for text in chunk]
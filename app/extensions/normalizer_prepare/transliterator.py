@@ -0,0 +1,161 @@
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+"""
+    Транслитерация английских слов в русскую «фонетику» через IPA с пословным кэшем
+
+        Слово (в нижнем регистре) -> русская запись; таблица хранится в JSON под runtime/
+        и загружается в словарь при старте - повторные слова не идут в eng_to_ipa
+        Неизвестные слова всего предложения (или пакета) конвертируются одним вызовом eng_to_ipa.ipa_list
+        Файл таблицы перезаписывается не на каждое новое слово, а не чаще раза в save_delay секунд (и при выходе)
+"""
+
+logger = logging.getLogger(__name__)
+
+IPA2RU = {
+    "p": "п", "b": "б", "t": "т", "d": "д", "k": "к", "g": "г", "m": "м", "n": "н",
+    "ŋ": "нг", "ʧ": "ч", "ʤ": "дж", "f": "ф", "v": "в", "θ": "т", "ð": "з", "s": "с", "z": "з",
+    "ʃ": "ш", "ʒ": "ж", "h": "х", "w": "в", "j": "й", "r": "р", "l": "л",
+    "i": "и", "ɪ": "и", "e": "э", "ɛ": "э", "æ": "э", "ʌ": "а", "ə": "е", "u": "у", "ʊ": "у",
+    "oʊ": "оу", "ɔ": "о", "ɑ": "а", "aɪ": "ай", "aʊ": "ау", "ɔɪ": "ой", "ɛr": "ё", "ər": "ё",
+    "ɚ": "а", "ju": "ю", "əv": "ов", "o": "о", "ˈ": "", "ˌ": "", "*": "",
+}
+
+# Двухсимвольные ключи IPA идут первыми - в каждой позиции сначала пробуется более длинное совпадение
+_IPA2RU_RE = re.compile("|".join(re.escape(k) for k in sorted(IPA2RU, key=len, reverse=True)))
+
+_eng_to_ipa = None
+_eng_to_ipa_failed = False
+
+"""
+    Модуль eng_to_ipa (пакет pip или копия в app/lib) импортируется один раз
+    Если его нет - латиница остаётся как есть
+"""
+def _get_eng_to_ipa():
+    global _eng_to_ipa, _eng_to_ipa_failed
+    if _eng_to_ipa is None and not _eng_to_ipa_failed:
+        try:
+            try:
+                import eng_to_ipa as ipa
+            except ImportError:
+                import app.lib.eng_to_ipa as ipa
+            _eng_to_ipa = ipa
+        except Exception as e:
+            _eng_to_ipa_failed = True
+            logger.warning("Нет eng_to_ipa, латиница останется как есть: %s", e)
+    return _eng_to_ipa
+
+"""
+    Переводит IPA-запись в русскую «фонетику»
+"""
+def ipa_to_ru(ipa_text: str) -> str:
+    return _IPA2RU_RE.sub(lambda m: IPA2RU[m.group()], ipa_text)
+
+class LatinTransliterator:
+    def __init__(self, path: Optional[str] = None, persist: bool = True, save_delay: float = 5.0):
+        self.path = path
+        # False - таблица только читается (процессы пула не пишут общий файл)
+        self.persist = persist
+        self.save_delay = save_delay
+        # слово в нижнем регистре -> русская запись
+        self.words: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        # Отложенная запись файла: есть несохранённые слова, запланированная запись
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+
+        self._load()
+        if self.path and self.persist:
+            atexit.register(self.flush)
+
+    """
+        Переводит список слов; неизвестные слова конвертируются одним вызовом eng_to_ipa
+        Без eng_to_ipa слова возвращаются как есть
+    """
+    def convert_words(self, words: List[str]) -> List[str]:
+        self.prefetch(words)
+        table = self.words
+        return [table.get(w.lower(), w) for w in words]
+
+    """
+        Переводит текст из латинских слов через пробелы: 'Hello World' -> 'хэлоу вёлд'
+    """
+    def convert(self, text: str) -> str:
+        return " ".join(self.convert_words(text.split()))
+
+    """
+        Заранее конвертирует все неизвестные слова (например, всей фразы или пакета) одним вызовом
+    """
+    def prefetch(self, words: Iterable[str]):
+        table = self.words
+        missing = list(dict.fromkeys(w.lower() for w in words if w.lower() not in table))
+        if not missing:
+            return
+
+        ipa = _get_eng_to_ipa()
+        if ipa is None:
+            return
+
+        # ipa_list - варианты транскрипции для каждого слова; последний совпадает с выбором eng_to_ipa.convert
+        variants = ipa.ipa_list(missing)
+        with self._lock:
+            for word, options in zip(missing, variants):
+                self.words[word] = ipa_to_ru(options[-1])
+            self._schedule_save()
+
+    """
+        Записывает несохранённые слова сразу
+    """
+    def flush(self):
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._dirty = False
+                self._save()
+
+    def __len__(self):
+        return len(self.words)
+
+    def _load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.words = dict(json.load(f))
+        except Exception as e:
+            logger.warning("Таблица транслитерации повреждена, начинаю с пустой: %s", e)
+
+    # Вызывается под self._lock
+    def _schedule_save(self):
+        if not self.path or not self.persist:
+            return
+        self._dirty = True
+        if self._save_timer is not None:
+            return
+        if self.save_delay <= 0:
+            self._dirty = False
+            self._save()
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _save(self):
+        if not self.path or not self.persist:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.words, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Не удалось сохранить таблицу транслитерации: %s", e)
@@ -0,0 +1,209 @@
+import atexit
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+"""
+    Кэш ответов LLM
+
+        Точное совпадение - по нормализованному вопросу + модели + параметрам генерации
+        Похожие вопросы (опционально) - косинусная близость векторов символьных n-грамм,
+        сравниваются только записи с той же моделью и параметрами
+        TTL и ограничение размера (вытесняются самые давно использованные записи)
+        Сохранение в JSON-файл (под runtime/), загрузка при создании
+        Файл перезаписывается не на каждый put(), а не чаще раза в save_delay секунд (и при выходе)
+"""
+
+_NORMALIZE_RE = re.compile(r"[^\w\s]+")
+_SPACES_RE = re.compile(r"\s+")
+
+"""
+    Нормализует вопрос: нижний регистр, ё -> е, без знаков препинания и лишних пробелов
+"""
+def normalize_prompt(text: str) -> str:
+    text = (text or "").lower().replace("ё", "е")
+    text = _NORMALIZE_RE.sub(" ", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+"""
+    Вектор символьных n-грамм и его норма
+"""
+def ngram_vector(text: str, n: int = 3) -> Tuple[Counter, float]:
+    padded = f" {text} "
+    vec = Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return vec, math.sqrt(sum(v * v for v in vec.values()))
+
+def cosine(a: Tuple[Counter, float], b: Tuple[Counter, float]) -> float:
+    (va, na), (vb, nb) = a, b
+    if not na or not nb:
+        return 0.0
+    if len(va) > len(vb):
+        va, vb = vb, va
+    return sum(v * vb.get(g, 0) for g, v in va.items()) / (na * nb)
+
+class ResponseCache:
+    def __init__(self, path: Optional[str], ttl: float = 86400, max_entries: int = 500, similarity: float = 0.0, ngram: int = 3, save_delay: float = 5.0):
+        self.path = path
+        self.save_delay = save_delay
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Порог близости для похожих вопросов (0 - только точное совпадение)
+        self.similarity = similarity
+        self.ngram = ngram
+
+        # key -> {"scope", "prompt", "answer", "ts"}; порядок - от давно использованных к недавним
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # key -> вектор n-грамм нормализованного вопроса
+        self._vectors: Dict[str, Tuple[Counter, float]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        # Отложенная запись файла: есть несохранённые изменения, запланированная запись
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+
+        self._load()
+        atexit.register(self.flush)
+
+    """
+        Область кэша: модель + параметры генерации + системная инструкция
+    """
+    @staticmethod
+    def scope_for(model: str, options: Dict[str, Any], system: Optional[str]) -> str:
+        raw = json.dumps([model, options, system], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def key_for(scope: str, norm_prompt: str) -> str:
+        return hashlib.sha1(f"{scope}\n{norm_prompt}".encode("utf-8")).hexdigest()
+
+    """
+        Ищет ответ: сначала точное совпадение, затем (если включено и similar=True) самый похожий вопрос
+        Возвращает (ответ, близость) или None
+    """
+    def get(self, scope: str, prompt: str, similar: bool = True) -> Optional[Tuple[str, float]]:
+        norm = normalize_prompt(prompt)
+        if not norm:
+            return None
+
+        with self._lock:
+            self._expire()
+
+            key = self.key_for(scope, norm)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["answer"], 1.0
+
+            if similar and self.similarity > 0:
+                vec = ngram_vector(norm, self.ngram)
+                best_key, best_sim = None, 0.0
+                for k, e in self._entries.items():
+                    if e["scope"] != scope:
+                        continue
+                    sim = cosine(vec, self._vectors[k])
+                    if sim > best_sim:
+                        best_key, best_sim = k, sim
+                if best_key is not None and best_sim >= self.similarity:
+                    self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    return self._entries[best_key]["answer"], best_sim
+
+            self.misses += 1
+            return None
+
+    def put(self, scope: str, prompt: str, answer: str):
+        norm = normalize_prompt(prompt)
+        if not norm or not answer:
+            return
+
+        with self._lock:
+            key = self.key_for(scope, norm)
+            self._entries[key] = {"scope": scope, "prompt": norm, "answer": answer, "ts": time.time()}
+            self._entries.move_to_end(key)
+            self._vectors[key] = ngram_vector(norm, self.ngram)
+
+            while len(self._entries) > self.max_entries > 0:
+                old_key, _ = self._entries.popitem(last=False)
+                self._vectors.pop(old_key, None)
+
+            self._schedule_save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+            self._dirty = True
+        self.flush()
+
+    """
+        Записывает несохранённые изменения сразу
+    """
+    def flush(self):
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._dirty = False
+                self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self):
+        if self.ttl <= 0:
+            return
+        deadline = time.time() - self.ttl
+        for key in [k for k, e in self._entries.items() if e["ts"] < deadline]:
+            del self._entries[key]
+            self._vectors.pop(key, None)
+
+    def _load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[llama] Кэш ответов повреждён, начинаю с пустого: {e}")
+            return
+
+        for key, entry in data.get("entries", []):
+            self._entries[key] = entry
+            self._vectors[key] = ngram_vector(entry["prompt"], self.ngram)
+        self._expire()
+
+    # Вызывается под self._lock
+    def _schedule_save(self):
+        self._dirty = True
+        if not self.path or self._save_timer is not None:
+            return
+        if self.save_delay <= 0:
+            self._dirty = False
+            self._save()
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": list(self._entries.items())}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[llama] Не удалось сохранить кэш ответов: {e}")
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+"""
+    Клиент Ollama API с постоянной HTTP-сессией
+
+        Одна requests.Session с пулом соединений (keep-alive), без нового TCP-соединения на каждый вопрос
+        keep_alive в каждом запросе - модель остаётся загруженной в памяти Ollama
+        warm_up() - прогрев: загрузка модели без генерации
+        Повторное использование context из ответа /api/generate - уточняющий вопрос
+        не заставляет модель заново обрабатывать весь диалог
+"""
+class OllamaClient:
+    def __init__(self, host: str, keep_alive: Any = "30m", pool_size: int = 4, connect_timeout: float = 5, read_timeout: float = 600, context_ttl: float = 120):
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.context_ttl = context_ttl
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Контекст последнего диалога (токены из ответа /api/generate) и время его получения
+        self._context: Optional[List[int]] = None
+        self._context_model: Optional[str] = None
+        self._context_ts = 0.0
+        self._lock = threading.Lock()
+
+    """
+        Потоковая генерация: отдаёт текстовые токены по мере их генерации
+
+        use_context=True - подставляет context предыдущего ответа (если он не устарел и получен от той же модели)
+        и сохраняет context нового ответа
+    """
+    def generate(self, payload: Dict[str, Any], use_context: bool = False) -> Iterator[str]:
+        payload = dict(payload)
+        payload.setdefault("keep_alive", self.keep_alive)
+        payload["stream"] = True
+
+        if use_context:
+            context = self.get_context(payload.get("model"))
+            if context:
+                payload["context"] = context
+
+        with self.session.post(self._url("/api/generate"), json=payload, stream=True, timeout=self.timeout) as r:
+            r.raise_for_status()
+            for line in r.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except Exception:
+                    continue
+
+                chunk = obj.get("response")
+                if chunk:
+                    yield chunk
+
+                if obj.get("done"):
+                    if use_context and isinstance(obj.get("context"), list):
+                        self.set_context(payload.get("model"), obj["context"])
+                    break
+
+    """
+        Прогрев: запрос без prompt загружает модель в память Ollama и держит её keep_alive
+    """
+    def warm_up(self, model: str) -> bool:
+        payload = {"model": model, "keep_alive": self.keep_alive, "stream": False}
+        r = self.session.post(self._url("/api/generate"), json=payload, timeout=self.timeout)
+        r.raise_for_status()
+        return True
+
+    def get_context(self, model: Optional[str]) -> Optional[List[int]]:
+        with self._lock:
+            if self._context is None or self._context_model != model:
+                return None
+            if self.context_ttl > 0 and time.monotonic() - self._context_ts > self.context_ttl:
+                self._context = None
+                return None
+            return self._context
+
+    def set_context(self, model: Optional[str], context: List[int]):
+        with self._lock:
+            self._context = context
+            self._context_model = model
+            self._context_ts = time.monotonic()
+
+    def reset_context(self):
+        with self._lock:
+            self._context = None
+            self._context_model = None
+
+    def close(self):
+        self.session.close()
+
+    def _url(self, path: str) -> str:
+        return self.host + path
@@ -1,10 +1,13 @@
-import json
+import re
+import threading
 import traceback
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, Optional
 
 import requests
 
 from app.core.core import Core
+from .cache import ResponseCache
+from .client import OllamaClient
 
 """
     Расширение для интеграции с моделью Llama через Ollama API
@@ -15,14 +18,37 @@ from app.core.core import Core
         ollama serve
 
     Опции:
-        ollama_host (str)   - адрес Ollama API (по умолчанию http://127.0.0.1:11434)
-        model (str)         - модель
-        temperature (float) - параметр генерации (0–1, выше = более креативно)
-        top_p (float)       - параметр nucleus sampling (0–1)
-        max_tokens (int)    - ограничение на количество токенов (0/None = без ограничения)
-        stop (list)         - список стоп-токенов
-        system_prompt (str) - системная инструкция для модели
-        say_answer (bool)   - озвучивать ли ответ TTS
+        ollama_host (str)        - адрес Ollama API (по умолчанию http://127.0.0.1:11434)
+        model (str)              - модель
+        temperature (float)      - параметр генерации (0–1, выше = более креативно)
+        top_p (float)            - параметр nucleus sampling (0–1)
+        max_tokens (int)         - ограничение на количество токенов (0/None = без ограничения)
+        stop (list)              - список стоп-токенов
+        system_prompt (str)      - системная инструкция для модели
+        say_answer (bool)        - озвучивать ли ответ TTS
+        stream_answer (bool)     - потоковый режим: озвучивать ответ по предложениям, не дожидаясь конца генерации
+        stream_min_chars (int)   - минимальная длина фрагмента (короткие предложения склеиваются со следующими)
+        stream_max_chars (int)   - максимальная длина фрагмента (длинное предложение режется по запятой/пробелу)
+        keep_alive (str)         - сколько Ollama держит модель в памяти после запроса ("30m", -1 = всегда)
+        warm_up_on_start (bool)  - прогреть модель при старте (в фоне)
+        use_context (bool)       - продолжать диалог: передавать context предыдущего ответа
+        context_ttl (int)        - через сколько секунд тишины диалог начинается заново
+        pool_size (int)          - размер пула HTTP-соединений
+        cache_enabled (bool)     - кэшировать ответы (повторный вопрос отвечается без генерации)
+        cache_path (str)         - файл кэша ответов
+        cache_ttl (int)          - время жизни ответа в кэше, сек (0 = без ограничения)
+        cache_max_entries (int)  - максимум ответов в кэше
+        cache_similarity (float) - порог близости для похожих вопросов (0..1, 0 = только точное совпадение)
+
+    Кэш и диалог (use_context): пока диалог не истёк (context_ttl), вопрос может быть уточнением
+    и зависеть от контекста - поэтому внутри диалога из кэша берётся только дословный повтор
+    (после нормализации) ранее заданного вопроса, похожие вопросы не ищутся, а новые ответы
+    в кэш не записываются (они получены с контекстом)
+
+    Команды:
+        лама <вопрос>                 - задать вопрос модели
+        лама забудь|лама новый диалог - сбросить контекст диалога
+        лама очисти кэш               - очистить кэш ответов
 
 """
 
@@ -39,42 +65,167 @@ def manifest() -> Dict[str, Any]:
             "stop": [],
             "system_prompt": "Отвечайте кратко на том же языке, на котором обращается пользователь",
             "say_answer": True,
+            "stream_answer": True,
+            "stream_min_chars": 20,
+            "stream_max_chars": 250,
+            "keep_alive": "30m",
+            "warm_up_on_start": True,
+            "use_context": True,
+            "context_ttl": 120,
+            "pool_size": 4,
+            "cache_enabled": False,
+            "cache_path": "./runtime/ollama_llama/response_cache.json",
+            "cache_ttl": 86400,
+            "cache_max_entries": 500,
+            "cache_similarity": 0.9,
         },
 
         "commands": {
             "лама": ask_llama,
-        }
+            "лама забудь|лама новый диалог": reset_llama_context,
+            "лама очисти кэш": clear_llama_cache,
+        },
+
+        # Вопрос модели - произвольный текст (для распознавания по грамматике команд)
+        "free_text_commands": ["лама"],
     }
     return manifest
 
+_client: Optional[OllamaClient] = None
+_cache: Optional[ResponseCache] = None
+
 def start(core: Core, manifest: Dict[str, Any]) -> None:
-    pass
-
-def _post_ollama_generate(host: str, payload: Dict[str, Any]):
-    url = f"{host.rstrip('/')}/api/generate"
-    with requests.post(url, json=payload, stream=True, timeout=(5, 600)) as r:
-        r.raise_for_status()
-        full_text = []
-        for line in r.iter_lines(decode_unicode=True):
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-            except Exception:
-                continue
-
-            chunk = obj.get("response")
-            if chunk:
-                full_text.append(chunk)
-
-            if obj.get("done"):
+    opts = manifest["options"]
+    client = _get_client(opts)
+
+    if opts.get("warm_up_on_start", True):
+        threading.Thread(target=_warm_up, args=(client, opts["model"]), daemon=True).start()
+
+"""
+    Возвращает клиент Ollama расширения; пересоздаёт его, если в опциях сменился адрес
+"""
+def _get_client(opts: Dict[str, Any]) -> OllamaClient:
+    global _client
+    host = opts["ollama_host"].rstrip("/")
+    if _client is None or _client.host != host:
+        if _client is not None:
+            _client.close()
+        _client = OllamaClient(
+            host,
+            keep_alive=opts.get("keep_alive", "30m"),
+            pool_size=int(opts.get("pool_size", 4)),
+            context_ttl=float(opts.get("context_ttl", 120)),
+        )
+    else:
+        _client.keep_alive = opts.get("keep_alive", "30m")
+        _client.context_ttl = float(opts.get("context_ttl", 120))
+    return _client
+
+"""
+    Возвращает кэш ответов (или None, если он выключен); пересоздаёт его, если сменился файл кэша
+"""
+def _get_cache(opts: Dict[str, Any]) -> Optional[ResponseCache]:
+    global _cache
+    if not opts.get("cache_enabled", False):
+        return None
+
+    path = opts.get("cache_path") or None
+    if _cache is None or _cache.path != path:
+        _cache = ResponseCache(path)
+    _cache.ttl = float(opts.get("cache_ttl", 86400))
+    _cache.max_entries = int(opts.get("cache_max_entries", 500))
+    _cache.similarity = float(opts.get("cache_similarity", 0.0))
+    return _cache
+
+def _warm_up(client: OllamaClient, model: str):
+    try:
+        client.warm_up(model)
+        print(f"[llama] Модель {model} загружена в Ollama")
+    except Exception as e:
+        print(f"[llama] Прогрев модели не удался: {e}")
+
+# Конец предложения: знак(и) препинания, возможно закрывающая кавычка/скобка, затем пробел
+_SENTENCE_END_RE = re.compile(r'[.!?…;\n]+["»)]*\s')
+
+"""
+    Собирает поток токенов в фрагменты размером с предложение
+    Фрагмент закрывается на конце предложения (не раньше min_chars символов),
+    либо принудительно, если буфер длиннее max_chars
+"""
+def _iter_sentences(tokens: Iterable[str], min_chars: int = 20, max_chars: int = 250) -> Iterator[str]:
+    buf = ""
+    for token in tokens:
+        buf += token
+        while True:
+            cut = _find_sentence_cut(buf, min_chars, max_chars)
+            if cut <= 0:
                 break
+            sentence = buf[:cut].strip()
+            buf = buf[cut:]
+            if sentence:
+                yield sentence
 
-        return "".join(full_text).strip()
+    tail = buf.strip()
+    if tail:
+        yield tail
+
+"""
+    Возвращает позицию, по которой можно отрезать готовый фрагмент, или 0, если фрагмент ещё не закрыт
+"""
+def _find_sentence_cut(buf: str, min_chars: int, max_chars: int) -> int:
+    m = _SENTENCE_END_RE.search(buf, max(0, min_chars - 1))
+    if m:
+        return m.end()
+
+    if max_chars > 0 and len(buf) > max_chars:
+        comma = buf.rfind(", ", 0, max_chars)
+        if comma >= min_chars:
+            return comma + 2
+        space = buf.rfind(" ", 0, max_chars)
+        if space > 0:
+            return space + 1
+        return max_chars
+
+    return 0
+
+"""
+    Озвучивает (или печатает) ответ из потока токенов и возвращает его текст
+
+    Потоковый режим: первое предложение звучит, пока модель ещё генерирует остальные
+    При прерывании речи («легион стоп», core.speech_cancel) возвращается уже сказанная часть
+"""
+def _deliver_answer(core: Core, opts: Dict[str, Any], tokens: Iterable[str]) -> str:
+    if opts.get("say_answer", True) and opts.get("stream_answer", True):
+        sentences = _iter_sentences(
+            tokens,
+            int(opts.get("stream_min_chars", 20)),
+            int(opts.get("stream_max_chars", 250)),
+        )
+        answer = core.say_stream(sentences)
+        if not answer and not core.speech_cancel.is_set():
+            core.say("Ответ пустой. Возможно, модель не запущена или вернула пустой результат")
+        return answer
+
+    answer = "".join(tokens).strip()
+
+    if not answer:
+        core.say("Ответ пустой. Возможно, модель не запущена или вернула пустой результат")
+        return answer
+
+    if opts.get("say_answer", True):
+        # Нормализация как у потокового пути (core.say_stream): ответ звучит одинаково при любом stream_answer
+        core.say(core.normalize(answer))
+        core.last_say = answer
+    else:
+        print(f"[llama] {answer}")
+        core.last_say = answer
+    return answer
 
 def ask_llama(core: Core, phrase: str):
     try:
-        opts = manifest()["options"]
+        opts = core.extension_options(__package__)
+        client = _get_client(opts)
+        use_context = bool(opts.get("use_context", True))
 
         query = (phrase or "").strip()
         if not query:
@@ -100,17 +251,24 @@ def ask_llama(core: Core, phrase: str):
         if isinstance(stop, list) and stop:
             payload["options"]["stop"] = stop
 
-        answer = _post_ollama_generate(opts["ollama_host"], payload)
+        # Внутри диалога вопрос может быть уточнением: из кэша - только дословный повтор, новый ответ не кэшируется
+        cache = _get_cache(opts)
+        in_dialog = use_context and client.get_context(opts["model"]) is not None
+        scope = None
+        if cache is not None:
+            scope = ResponseCache.scope_for(opts["model"], payload["options"], payload["system"])
+            cached = cache.get(scope, query, similar=not in_dialog)
+            if cached is not None:
+                answer, similarity = cached
+                print(f"[llama] Ответ из кэша (сходство {similarity:.2f})")
+                _deliver_answer(core, opts, [answer])
+                return
 
-        if not answer:
-            core.say("Ответ пустой. Возможно, модель не запущена или вернула пустой результат")
-            return
+        answer = _deliver_answer(core, opts, client.generate(payload, use_context))
 
-        if opts.get("say_answer", True):
-            core.say(answer)
-        else:
-            print(f"[llama] {answer}")
-            core.lastSay = answer
+        # Прерванный ответ обрезан - в кэш не попадает
+        if scope is not None and answer and not in_dialog and not core.speech_cancel.is_set():
+            cache.put(scope, query, answer)
 
     except requests.exceptions.ConnectionError:
         core.print_red("[llama] Нет соединения с Ollama")
@@ -122,3 +280,22 @@ def ask_llama(core: Core, phrase: str):
         traceback.print_exc()
         core.print_red(f"[llama] Неожиданная ошибка: {e}")
         core.say("Произошла ошибка при обращении к модели")
+
+"""
+    Сбрасывает контекст диалога: следующий вопрос начнёт новый разговор
+"""
+def reset_llama_context(core: Core, phrase: str):
+    if _client is not None:
+        _client.reset_context()
+    core.say("Начинаем новый диалог")
+
+"""
+    Очищает кэш ответов
+"""
+def clear_llama_cache(core: Core, phrase: str):
+    cache = _get_cache(core.extension_options(__package__))
+    if cache is None:
+        core.say("Кэш ответов выключен")
+        return
+    cache.clear()
+    core.say("Кэш ответов очищен")
@@ -54,6 +54,14 @@ def manifest() -> Dict[str, Any]:
             "включи оповещение": _cmd_alert_on,
             "выключи оповещение": _cmd_alert_off,
         },
+
+        "early_commands": [
+            "включи детектор людей",
+            "выключи детектор людей",
+            "сколько людей",
+            "включи оповещение",
+            "выключи оповещение",
+        ],
     }
 
 _worker: Optional[threading.Thread] = None
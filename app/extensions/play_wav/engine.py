@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy
+
+try:
+    import sounddevice as sound_device
+    import soundfile as sound_file
+except Exception:
+    pass
+
+"""
+    Движок воспроизведения PCM с постоянным выходным потоком
+
+        Один sounddevice.OutputStream открыт всё время работы - нет задержки на открытие устройства для каждого клипа
+        Клипы - NumPy-буферы (float32/int16, моно или по каналам), не только файлы
+        Режимы: очередь (клипы звучат по порядку) или микширование (клипы звучат одновременно)
+        Декодированные файлы кэшируются (load/preload) - повторное воспроизведение без чтения с диска
+        В аудио-колбэке не создаются буферы и списки: данные клипа копируются прямо в выходной буфер
+        (через срезы-представления NumPy), список закончившихся клипов заведён заранее
+"""
+
+class Clip:
+    def __init__(self, data: numpy.ndarray):
+        self.data = data
+        self.pos = 0
+        self.done = threading.Event()
+
+    def remaining(self) -> int:
+        return len(self.data) - self.pos
+
+    """
+        Ждёт окончания воспроизведения клипа
+    """
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+class PlaybackEngine:
+    def __init__(self, samplerate: int = 48000, channels: int = 1, device=None, latency="low", blocksize: int = 0, mix: bool = False, cache_size: int = 32):
+        self.samplerate = int(samplerate)
+        self.channels = int(channels)
+        self.device = device
+        self.latency = latency
+        self.blocksize = int(blocksize)
+        self.mix = mix
+        self.cache_size = cache_size
+
+        self._clips: List[Clip] = []
+        # Закончившиеся за вызов колбэка клипы - список переиспользуется (только поток колбэка)
+        self._finished: List[Clip] = []
+        self._lock = threading.Lock()
+        self._stream = None
+
+        # Кэш декодированных файлов: путь -> буфер в формате потока
+        self._cache: "OrderedDict[str, numpy.ndarray]" = OrderedDict()
+        # Закреплённые (предзагруженные) буферы не вытесняются из кэша
+        self._pinned: Dict[str, numpy.ndarray] = {}
+
+    def start(self):
+        if self._stream is not None:
+            return
+        self._stream = sound_device.OutputStream(
+            samplerate=self.samplerate,
+            channels=self.channels,
+            dtype="float32",
+            device=self.device,
+            latency=self.latency,
+            blocksize=self.blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def close(self):
+        self.stop()
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            finally:
+                self._stream = None
+
+    """
+        Ставит буфер на воспроизведение
+        data - NumPy-массив (float32 в [-1, 1] или int16), форма (n,) или (n, каналы)
+        block=True - дождаться окончания воспроизведения
+    """
+    def play(self, data: numpy.ndarray, samplerate: Optional[int] = None, block: bool = True) -> Clip:
+        return self.play_prepared(self.prepare(data, samplerate), block)
+
+    """
+        Ставит на воспроизведение буфер, уже приведённый к формату потока (см. prepare)
+    """
+    def play_prepared(self, data: numpy.ndarray, block: bool = True) -> Clip:
+        if self._stream is None:
+            self.start()
+
+        clip = Clip(data)
+        if len(data) == 0:
+            clip.done.set()
+            return clip
+
+        with self._lock:
+            self._clips.append(clip)
+
+        if block:
+            self.wait(clip)
+        return clip
+
+    """
+        Проигрывает файл; при cache=True декодированный файл остаётся в кэше
+    """
+    def play_file(self, path: str, block: bool = True, cache: bool = True) -> Clip:
+        data = self.load(path) if cache else self.decode(path)
+        return self.play_prepared(data, block)
+
+    """
+        Ждёт окончания клипа и досылки уже переданных устройству данных
+    """
+    def wait(self, clip: Clip):
+        clip.wait()
+        if self._stream is not None:
+            latency = self._stream.latency
+            time.sleep(latency if isinstance(latency, float) else max(latency))
+
+    """
+        Останавливает всё, что звучит или стоит в очереди
+    """
+    def stop(self):
+        with self._lock:
+            clips, self._clips = self._clips, []
+        for clip in clips:
+            clip.done.set()
+
+    def is_playing(self) -> bool:
+        with self._lock:
+            return bool(self._clips)
+
+    """
+        Декодирует файл в формат потока (с кэшированием)
+    """
+    def load(self, path: str) -> numpy.ndarray:
+        data = self._pinned.get(path)
+        if data is not None:
+            return data
+
+        with self._lock:
+            data = self._cache.get(path)
+            if data is not None:
+                self._cache.move_to_end(path)
+                return data
+
+        data = self.decode(path)
+
+        with self._lock:
+            self._cache[path] = data
+            while len(self._cache) > self.cache_size > 0:
+                self._cache.popitem(last=False)
+        return data
+
+    """
+        Декодирует файл в формат потока без кэширования
+    """
+    def decode(self, path: str) -> numpy.ndarray:
+        raw, samplerate = sound_file.read(path, dtype="float32", always_2d=False)
+        return self.prepare(raw, samplerate)
+
+    """
+        Декодирует файл заранее и закрепляет его в памяти (сигналы, бипы)
+    """
+    def preload(self, path: str) -> numpy.ndarray:
+        data = self.load(path)
+        self._pinned[path] = data
+        return data
+
+    """
+        Приводит буфер к формату потока: float32, частота потока, (n,) для моно или (n, каналы)
+    """
+    def prepare(self, data: numpy.ndarray, samplerate: Optional[int] = None) -> numpy.ndarray:
+        data = numpy.asarray(data)
+        if data.dtype == numpy.int16:
+            data = data.astype(numpy.float32) / 32768.0
+        elif data.dtype != numpy.float32:
+            data = data.astype(numpy.float32)
+
+        # Каналы
+        if data.ndim == 2:
+            if data.shape[1] == 1:
+                data = data[:, 0]
+            elif self.channels == 1:
+                data = data.mean(axis=1, dtype=numpy.float32)
+            elif data.shape[1] != self.channels:
+                data = data[:, 0]
+
+        # Частота дискретизации (линейная интерполяция)
+        if samplerate and int(samplerate) != self.samplerate and len(data) > 0:
+            n_out = int(round(len(data) * self.samplerate / float(samplerate)))
+            x_old = numpy.arange(len(data), dtype=numpy.float64)
+            x_new = numpy.linspace(0, len(data) - 1, n_out)
+            if data.ndim == 1:
+                data = numpy.interp(x_new, x_old, data).astype(numpy.float32)
+            else:
+                data = numpy.stack([numpy.interp(x_new, x_old, data[:, c]) for c in range(data.shape[1])], axis=1).astype(numpy.float32)
+
+        return numpy.ascontiguousarray(data)
+
+    def _callback(self, outdata, frames, time_info, status):
+        outdata.fill(0)
+        finished = self._finished
+
+        with self._lock:
+            if self.mix:
+                for clip in self._clips:
+                    n = min(frames, clip.remaining())
+                    self._write(outdata, 0, clip, n, add=True)
+                    if clip.remaining() == 0:
+                        finished.append(clip)
+                if len(self._clips) > 1:
+                    numpy.clip(outdata, -1.0, 1.0, out=outdata)
+            else:
+                offset = 0
+                for clip in self._clips:
+                    if offset >= frames:
+                        break
+                    n = min(frames - offset, clip.remaining())
+                    self._write(outdata, offset, clip, n, add=False)
+                    offset += n
+                    if clip.remaining() == 0:
+                        finished.append(clip)
+
+            for clip in finished:
+                self._clips.remove(clip)
+
+        for clip in finished:
+            clip.done.set()
+        finished.clear()
+
+    @staticmethod
+    def _write(outdata, offset: int, clip: Clip, n: int, add: bool):
+        if n <= 0:
+            return
+        chunk = clip.data[clip.pos:clip.pos + n]
+        target = outdata[offset:offset + n]
+        if chunk.ndim == 1:
+            chunk = chunk[:, None]
+        if add:
+            target += chunk
+        else:
+            target[:] = chunk
+        clip.pos += n
@@ -7,35 +7,88 @@ try:
 except Exception:
     pass
 
-try:
-    import sounddevice as sound_device
-    import soundfile as sound_file
-except Exception:
-    pass
-
-from typing import Any, Dict
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from app.core.core import Core
+from .engine import PlaybackEngine
 
 """
     Расширение для воспроизведения WAV-файлов с использованием библиотек
+
+    Движки:
+        audioplayer - через библиотеку audioplayer (плееры кэшируются по файлу)
+        sounddevice - через постоянный выходной поток sounddevice (см. engine.py):
+                      принимает и файлы, и готовые PCM-буферы, декодированные файлы кэшируются
+
+    Опции (для sounddevice):
+        samplerate (int)      - частота выходного потока
+        channels (int)        - количество каналов выходного потока
+        device (int|str|None) - устройство вывода (None - по умолчанию)
+        latency (str|float)   - задержка потока ("low", "high" или секунды)
+        mix (bool)            - микшировать одновременные клипы (иначе - очередь)
+        cache_size (int)      - сколько декодированных файлов держать в памяти
+
+    Сигналы из опций расширений Core держит в банке ресурсов (core.asset_bank) и передаёт сюда
+    готовым PCM (play_pcm_sounddevice); их подготовленная форма кэшируется
 """
 
 def manifest() -> Dict[str, Any]:
     return {
         "name": "Воспроизведение WAV",
 
+        "options": {
+            "samplerate": 48000,
+            "channels": 1,
+            "device": None,
+            "latency": "low",
+            "mix": False,
+            "cache_size": 32,
+        },
+
         "play_wav": {
-            "audioplayer": (init, play_wav_audioplayer),
-            "sounddevice": (init, play_wav_sounddevice)
+            "audioplayer": (init_audioplayer, play_wav_audioplayer, None, stop_audioplayer),
+            "sounddevice": (init_sounddevice, play_wav_sounddevice, play_pcm_sounddevice, stop_sounddevice)
         }
     }
 
+_engine: Optional[PlaybackEngine] = None
+
+# Подготовленные формы неизменяемых буферов (ресурсы из core.asset_bank): id -> (исходный, подготовленный)
+_prepared: Dict[int, Tuple[numpy.ndarray, numpy.ndarray]] = {}
+
+# Кэш плееров audioplayer: путь -> AudioPlayer
+_audioplayers: "OrderedDict[str, AudioPlayer]" = OrderedDict()
+_AUDIOPLAYERS_MAX = 16
+# Плееры, которые сейчас играют (для stop_audioplayer)
+_playing: set = set()
+
 def start(core: Core, manifest: Dict[str, Any]) -> None:
     pass
 
-def init(core: Core):
+def init_audioplayer(core: Core):
     pass
 
+"""
+    Открывает постоянный выходной поток
+"""
+def init_sounddevice(core: Core):
+    global _engine
+    opts = core.extension_options(__package__)
+
+    if _engine is not None:
+        _engine.close()
+
+    _engine = PlaybackEngine(
+        samplerate=int(opts.get("samplerate", 48000)),
+        channels=int(opts.get("channels", 1)),
+        device=opts.get("device"),
+        latency=opts.get("latency", "low"),
+        mix=bool(opts.get("mix", False)),
+        cache_size=int(opts.get("cache_size", 32)),
+    )
+    _engine.start()
+    _prepared.clear()
+
 """
     Проигрывает WAV-файл с использованием библиотеки audioplayer
 """
@@ -43,17 +96,79 @@ def play_wav_audioplayer(core: Core, wav_file: str):
     if not os.path.exists(wav_file):
         print(f"[Play wav audioplayer] Файл не найден: {wav_file}")
         return
-    AudioPlayer(wav_file).play(block=True)
+
+    # Временные файлы TTS одноразовые - их плееры не кэшируем
+    if wav_file.startswith(str(core.tmp_path)):
+        player = AudioPlayer(wav_file)
+    else:
+        player = _audioplayers.get(wav_file)
+        if player is None:
+            player = AudioPlayer(wav_file)
+            _audioplayers[wav_file] = player
+            while len(_audioplayers) > _AUDIOPLAYERS_MAX:
+                _audioplayers.popitem(last=False)
+        else:
+            _audioplayers.move_to_end(wav_file)
+
+    _playing.add(player)
+    try:
+        player.play(block=True)
+    finally:
+        _playing.discard(player)
+
+"""
+    Останавливает плееры audioplayer, которые сейчас играют (вызывается из другого потока)
+"""
+def stop_audioplayer(core: Core):
+    for player in list(_playing):
+        try:
+            player.stop()
+        except Exception:
+            pass
 
 """
     Проигрывает WAV-файл с использованием библиотеки sounddevice
 """
 def play_wav_sounddevice(core: Core, wav_file: str):
-    filename = os.path.dirname(__file__) + "/../" + wav_file
-    data_set, fsample = sound_file.read(filename, dtype = 'float32')
-    zeros = numpy.zeros((5000,))
-    data_set_new = numpy.concatenate((data_set,zeros))
-    sound_device.play(data_set_new, fsample)
-    status = sound_device.wait()
-
-    return
+    filename = _resolve_path(wav_file)
+    if not os.path.exists(filename):
+        print(f"[Play wav sounddevice] Файл не найден: {wav_file}")
+        return
+
+    # Временные файлы TTS одноразовые - декодируем без кэша
+    _get_engine(core).play_file(filename, cache=not filename.startswith(str(core.tmp_path)))
+
+"""
+    Проигрывает PCM-буфер (NumPy float32/int16) без записи во временный файл
+    Буферы только для чтения считаются неизменяемыми: ресэмплинг/конвертация делается один раз
+"""
+def play_pcm_sounddevice(core: Core, data: numpy.ndarray, samplerate: int):
+    engine = _get_engine(core)
+    if isinstance(data, numpy.ndarray) and not data.flags.writeable:
+        cached = _prepared.get(id(data))
+        if cached is None or cached[0] is not data:
+            cached = (data, engine.prepare(data, samplerate))
+            _prepared[id(data)] = cached
+        engine.play_prepared(cached[1])
+        return
+    engine.play(data, samplerate)
+
+"""
+    Останавливает всё, что звучит или стоит в очереди выходного потока
+"""
+def stop_sounddevice(core: Core):
+    if _engine is not None:
+        _engine.stop()
+
+def _get_engine(core: Core) -> PlaybackEngine:
+    if _engine is None:
+        init_sounddevice(core)
+    return _engine
+
+"""
+    Путь относительно рабочей директории; для совместимости - относительно app/
+"""
+def _resolve_path(wav_file: str) -> str:
+    if os.path.isabs(wav_file) or os.path.exists(wav_file):
+        return wav_file
+    return os.path.join(os.path.dirname(__file__), "..", "..", wav_file)
@@ -0,0 +1,185 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.core import Core
+from app.utils.spoken_numbers_ru import parse_duration, duration_seconds
+from .sampler import StackSampler
+
+"""
+    Встроенный сэмплирующий профилировщик (см. sampler.py): стеки всех потоков -> collapsed stacks в runtime/
+
+    Файл runtime/<output_dir>/profile-<дата-время>.collapsed открывается в speedscope или
+    превращается в SVG: flamegraph.pl profile.collapsed > profile.svg
+
+    Опции:
+        rate_hz (int)                - частота сэмплирования
+        max_duration_sec (int)       - предел длительности профилирования (и длительность по умолчанию)
+        max_overhead_percent (float) - предел накладных расходов, при превышении частота снижается
+        skip_idle (bool)             - не учитывать ждущие потоки
+        output_dir (str)             - папка для профилей внутри runtime/
+
+    Команды:
+        начни профилирование|профилирование старт [на N секунд/минут] -> запуск
+        останови профилирование|профилирование стоп                   -> остановка и запись профиля
+
+    API (если запущено в API-режиме):
+        POST /api/v1/profiler/start?duration=30&rate_hz=100
+        POST /api/v1/profiler/stop
+        GET  /api/v1/profiler
+"""
+
+def manifest() -> Dict[str, Any]:
+    return {
+        "name": "Профилировщик",
+
+        "options": {
+            "rate_hz": 100,
+            "max_duration_sec": 120,
+            "max_overhead_percent": 2.0,
+            "skip_idle": True,
+            "output_dir": "profiles",
+        },
+
+        "commands": {
+            "начни профилирование|профилирование старт": _cmd_start,
+            "останови профилирование|профилирование стоп": _cmd_stop,
+        },
+
+        # Запуск принимает длительность («на 30 секунд») - досрочно только остановка
+        "early_commands": ["останови профилирование|профилирование стоп"],
+    }
+
+_sampler: Optional[StackSampler] = None
+# Сэмплер, итог которого уже отдан stop_profiling() (повторная остановка - «не запущено»)
+_reported: Optional[StackSampler] = None
+_last_file: Optional[str] = None
+_lock = threading.Lock()
+
+def start(core: Core, manifest: Dict[str, Any]) -> None:
+    app = getattr(core, "fastapi_app", None)
+    if app is not None:
+        _attach_api(core, app)
+
+"""
+    Запускает профилирование; duration - секунд (не больше max_duration_sec)
+    Возвращает False, если профилирование уже идёт
+"""
+def start_profiling(core: Core, duration: Optional[float] = None, rate_hz: Optional[float] = None) -> bool:
+    global _sampler
+    opts = core.extension_options(__package__)
+    limit = float(opts.get("max_duration_sec", 120))
+
+    with _lock:
+        if _sampler is not None and _sampler.running:
+            return False
+        _sampler = StackSampler(
+            rate_hz=float(rate_hz or opts.get("rate_hz", 100)),
+            max_duration=min(limit, float(duration)) if duration else limit,
+            max_overhead=float(opts.get("max_overhead_percent", 2.0)),
+            skip_idle=bool(opts.get("skip_idle", True)),
+        )
+        _sampler.start(lambda sampler: _write_profile(core, sampler))
+    return True
+
+"""
+    Останавливает профилирование и дожидается записи профиля
+    Возвращает остановленный сэмплер (итог - result_path или error), в том числе если он уже
+    остановился сам по max_duration; None - профилирование не запускалось или итог уже отдан
+    Если профиль не успел записаться за время ожидания, sampler.done ещё не установлен - запись продолжается
+"""
+def stop_profiling(core: Core) -> Optional[StackSampler]:
+    global _reported
+    with _lock:
+        sampler = _sampler
+        if sampler is None or sampler is _reported:
+            return None
+        _reported = sampler
+    sampler.stop()
+    return sampler
+
+def status() -> Dict[str, Any]:
+    sampler = _sampler
+    if sampler is None:
+        return {"running": False, "last_file": _last_file}
+    return {
+        "running": sampler.running,
+        "samples": sampler.samples,
+        "stacks": len(sampler.counts),
+        "elapsed_sec": round(sampler.elapsed, 2),
+        "max_duration_sec": sampler.max_duration,
+        "interval_ms": round(sampler.interval * 1000, 2),
+        "overhead_percent": round(sampler.overhead_percent(), 3),
+        "throttled": sampler.throttled,
+        "last_file": _last_file,
+    }
+
+def _write_profile(core: Core, sampler: StackSampler):
+    global _last_file
+    opts = core.extension_options(__package__)
+    path = core.runtime_path / opts.get("output_dir", "profiles") / f"profile-{datetime.now():%Y%m%d-%H%M%S}.collapsed"
+    try:
+        sampler.write_collapsed(str(path))
+        sampler.result_path = _last_file = str(path)
+        print(f"[Профилировщик] {sampler.summary()} -> {path}")
+    except OSError as e:
+        sampler.error = e
+        core.print_error(f"[Профилировщик] Не удалось записать профиль {path}", e)
+
+def _cmd_start(core: Core, phrase: str):
+    opts = core.extension_options(__package__)
+    parts = parse_duration(phrase) if phrase.strip() else None
+    duration = duration_seconds(parts) if parts else None
+
+    if not start_profiling(core, duration):
+        core.say("Профилирование уже идёт")
+        return
+
+    seconds = int(_sampler.max_duration)
+    if duration and duration > float(opts.get("max_duration_sec", 120)):
+        core.say(f"Профилирование запущено, не дольше {seconds} секунд")
+    else:
+        core.say(f"Профилирование запущено на {seconds} секунд")
+
+def _cmd_stop(core: Core, phrase: str):
+    sampler = stop_profiling(core)
+    if sampler is None:
+        core.say("Профилирование не запущено")
+        return
+    if not sampler.done.is_set():
+        core.say("Профилирование остановлено, профиль ещё записывается")
+        return
+    if sampler.result_path is None:
+        core.say("Не удалось записать профиль")
+        return
+    core.say(f"Профиль записан, сэмплов {sampler.samples}")
+
+def _attach_api(core: Core, app):
+    from fastapi import APIRouter, HTTPException
+    from starlette.concurrency import run_in_threadpool
+
+    router = APIRouter(prefix="/api/v1/profiler", tags=["Профилировщик"])
+
+    @router.get("", response_model=dict, summary="Состояние профилировщика")
+    async def profiler_status():
+        return status()
+
+    @router.post("/start", response_model=dict, summary="Запустить сэмплирующий профилировщик")
+    async def profiler_start(duration: Optional[float] = None, rate_hz: Optional[float] = None):
+        if not start_profiling(core, duration, rate_hz):
+            raise HTTPException(status_code=409, detail="Профилирование уже идёт")
+        return status()
+
+    @router.post("/stop", response_model=dict, summary="Остановить профилировщик и записать профиль")
+    async def profiler_stop():
+        sampler = await run_in_threadpool(stop_profiling, core)
+        if sampler is None:
+            raise HTTPException(status_code=409, detail="Профилирование не запущено")
+        # Запись ещё идёт - итог появится в last_file (GET /api/v1/profiler)
+        if not sampler.done.is_set():
+            return {**status(), "writing": True}
+        if sampler.result_path is None:
+            raise HTTPException(status_code=500, detail=f"Не удалось записать профиль: {sampler.error}")
+        return status()
+
+    app.include_router(router)
@@ -0,0 +1,160 @@
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+"""
+    Сэмплирующий профилировщик на отдельном потоке (только стандартная библиотека)
+
+    Раз в interval секунд снимает стеки всех потоков (sys._current_frames()) и считает одинаковые стеки
+    Результат - collapsed stacks («поток;кадр;кадр... число»), вход для flamegraph.pl, speedscope, inferno
+
+    Ограничения, чтобы профилировщик можно было держать включённым:
+        max_duration - через сколько секунд сэмплирование остановится само
+        max_overhead - доля времени (%), которую может занимать снятие стеков; при превышении интервал удваивается
+    skip_idle - не считать потоки, которые ждут (Event.wait, Queue.get, select...)
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Самый глубокий Python-кадр ждущего потока: (файл, функция)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("socketserver.py", "serve_forever"),
+    ("base_events.py", "_run_once"),
+    ("pcm_ring.py", "read"),
+    ("handlers.py", "dequeue"),
+}
+
+# Интервал при дросселировании не длиннее, с
+MAX_INTERVAL = 1.0
+
+class StackSampler:
+    def __init__(self, rate_hz: float = 100.0, max_duration: float = 60.0, max_overhead: float = 2.0, skip_idle: bool = True):
+        self.interval = 1.0 / max(1.0, float(rate_hz))
+        self.max_duration = float(max_duration)
+        self.max_overhead = float(max_overhead)
+        self.skip_idle = skip_idle
+
+        self.counts: "collections.Counter[str]" = collections.Counter()
+        self.samples = 0
+        # Сколько раз интервал увеличивался из-за превышения max_overhead
+        self.throttled = 0
+        self.busy = 0.0
+        self.started = 0.0
+        self.finished = 0.0
+        # Итог записи профиля - заполняет on_done: путь к файлу или ошибка
+        self.result_path: Optional[str] = None
+        self.error: Optional[Exception] = None
+        # Сэмплирование закончено и on_done отработал (профиль записан или не записан из-за ошибки)
+        self.done = threading.Event()
+
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def elapsed(self) -> float:
+        if not self.started:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    """
+        Доля времени на снятие стеков, %
+    """
+    def overhead_percent(self) -> float:
+        return 100.0 * self.busy / self.elapsed if self.elapsed else 0.0
+
+    """
+        on_done(sampler) вызывается в потоке профилировщика после остановки (по stop() или по max_duration)
+    """
+    def start(self, on_done: Optional[Callable[["StackSampler"], None]] = None):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, args=(on_done,), name="legion-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self, on_done):
+        own = threading.get_ident()
+        try:
+            while not self._stop.wait(self.interval):
+                t0 = time.perf_counter()
+                self._sample(own)
+                self.busy += time.perf_counter() - t0
+
+                elapsed = time.monotonic() - self.started
+                if elapsed >= self.max_duration:
+                    break
+                if self.max_overhead > 0 and 100.0 * self.busy / elapsed > self.max_overhead and self.interval < MAX_INTERVAL:
+                    self.interval = min(MAX_INTERVAL, self.interval * 2)
+                    self.throttled += 1
+        finally:
+            self.finished = time.monotonic()
+            try:
+                if on_done is not None:
+                    on_done(self)
+            finally:
+                self.done.set()
+
+    def _sample(self, own: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            if self.skip_idle and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(tid, f"thread-{tid}"))
+            stack.reverse()
+            self.counts[";".join(stack)] += 1
+        self.samples += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            if path.startswith(ROOT):
+                path = os.path.relpath(path, ROOT)
+            else:
+                path = os.path.basename(path)
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({path}:{code.co_firstlineno})".replace(";", ",")
+            self._labels[code] = label
+        return label
+
+    """
+        Записывает collapsed stacks, возвращает число разных стеков
+    """
+    def write_collapsed(self, path: str) -> int:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return len(self.counts)
+
+    def summary(self) -> str:
+        return (
+            f"сэмплов {self.samples} за {self.elapsed:.1f} с, стеков {len(self.counts)}, "
+            f"накладные расходы {self.overhead_percent():.2f}%, интервал {self.interval * 1000:.0f} мс"
+            + (f" (увеличен {self.throttled} раз)" if self.throttled else "")
+        )
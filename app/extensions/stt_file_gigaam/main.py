@@ -48,7 +48,10 @@ def manifest() -> Dict[str, Any]:
 
         "commands": {
             "gigaam распознай файл": _entry_stt,
-        }
+        },
+
+        # После команды идёт путь к файлу
+        "free_text_commands": ["gigaam распознай файл"],
     }
 
 _model = None
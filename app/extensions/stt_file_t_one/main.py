@@ -48,7 +48,10 @@ def manifest() -> Dict[str, Any]:
 
         "commands": {
             "t-one распознай файл": _entry_stt,
-        }
+        },
+
+        # После команды идёт путь к файлу
+        "free_text_commands": ["t-one распознай файл"],
     }
 
 _pipeline: Optional[StreamingCTCPipeline] = None
@@ -46,7 +46,10 @@ def manifest() -> Dict[str, Any]:
 
         "commands": {
             "распознай файл": _stt_entry,
-        }
+        },
+
+        # После команды идёт путь к файлу
+        "free_text_commands": ["распознай файл"],
     }
 
 def start(core: Core, manifest: Dict[str, Any]) -> None:
@@ -233,7 +236,8 @@ def _stt_entry(core: Core, phrase: str):
         return
 
     if say_result:
-        core.say(text)
+        # Сегменты расшифровки нормализуются одним пакетом (normalize_many) и озвучиваются по очереди
+        core.say_stream([t for t in full_text if t], batch_size=len(full_text))
     else:
         prev = core.remote_tts
         try:
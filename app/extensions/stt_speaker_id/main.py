@@ -52,7 +52,12 @@ def manifest() -> Dict[str, Any]:
             "забудь голос": _cmd_forget,
             "очисти голоса": _cmd_clear,
             "диаризация файла": _cmd_diarize
-        }
+        },
+
+        # Команды с аргументами (имя, путь к файлу) - для распознавания по грамматике команд
+        "free_text_commands": ["запомни голос", "кто на записи", "забудь голос", "диаризация файла"],
+
+        "early_commands": ["список голосов", "очисти голоса"],
     }
 
 _svc: Optional[SpeakerService] = None
@@ -101,7 +101,10 @@ def manifest() -> Dict[str, Any]:
         "commands": {
             "голос в текст": _cmd_stt_only,
             "распознай голоса": _cmd_stt_speaker,
-        }
+        },
+
+        # После команды идёт путь к файлу
+        "free_text_commands": ["голос в текст", "распознай голоса"],
     }
 
 def start(core: Core, manifest: dict):
@@ -302,19 +305,7 @@ def _speaker_diarization(opts: Dict, wav_path: str, sr: int, window_sec: float,
         return []
 
     X = np.stack(feats)
-
-    if num_speakers and num_speakers > 0:
-        labels = _agglo_fit_predict(X, n_clusters=int(num_speakers), metric="cosine", linkage="average")
-    else:
-        best_labels = None
-        best_score = None
-        for k in range(2, min(6, X.shape[0] + 1)):
-            cand_labels = _agglo_fit_predict(X, n_clusters=k, metric="cosine", linkage="average")
-            score = _cluster_compactness(X, cand_labels)
-            if best_score is None or score < best_score:
-                best_score = score
-                best_labels = cand_labels
-        labels = best_labels if best_labels is not None else _agglo_fit_predict(X, n_clusters=2, metric="cosine", linkage="average")
+    labels = _cluster_embeddings(X, num_speakers)
 
     segs: List[dict] = []
     cur_spk = int(labels[0])
@@ -334,6 +325,23 @@ def _speaker_diarization(opts: Dict, wav_path: str, sr: int, window_sec: float,
     segs.append({"start": float(cur_start), "end": float(cur_end), "spk": int(cur_spk)})
     return segs
 
+"""
+    Кластеризация эмбеддингов окон: число дикторов задано или подбирается (2..5) по компактности кластеров
+"""
+def _cluster_embeddings(X: np.ndarray, num_speakers: Optional[int] = None) -> np.ndarray:
+    if num_speakers and num_speakers > 0:
+        return _agglo_fit_predict(X, n_clusters=int(num_speakers), metric="cosine", linkage="average")
+
+    best_labels = None
+    best_score = None
+    for k in range(2, min(6, X.shape[0] + 1)):
+        cand_labels = _agglo_fit_predict(X, n_clusters=k, metric="cosine", linkage="average")
+        score = _cluster_compactness(X, cand_labels)
+        if best_score is None or score < best_score:
+            best_score = score
+            best_labels = cand_labels
+    return best_labels if best_labels is not None else _agglo_fit_predict(X, n_clusters=2, metric="cosine", linkage="average")
+
 def _cluster_compactness(X: np.ndarray, labels: np.ndarray) -> float:
     score = 0.0
     for lab in np.unique(labels):
@@ -29,7 +29,12 @@ def manifest() -> Dict[str, Any]:
         "commands": {
             "озвучь|скажи": say,
             "буфер": say_clipboard,
-        }
+        },
+
+        # Команды с произвольным текстом после них (для распознавания по грамматике команд)
+        "free_text_commands": ["озвучь", "скажи"],
+
+        "early_commands": ["буфер"],
     }
 
 logger = logging.getLogger(__name__)
@@ -111,6 +111,16 @@ def manifest() -> Dict[str, Any]:
             "шёпот язык": _cmd_set_language,
             "шёпот подсказка": _cmd_set_prompt,
         },
+
+        "free_text_commands": [
+            "шёпот распознай файл",
+            "шёпот переведи аудио",
+            "шёпот распознай подробно",
+            "шёпот язык",
+            "шёпот подсказка",
+        ],
+
+        "early_commands": ["шёпот включи офлайн", "шёпот включи перевод офлайн", "шёпот выключи офлайн"],
     }
 
 try:
@@ -1,6 +1,7 @@
 import os.path
 from functools import wraps
 from importlib import import_module
+from importlib.util import find_spec
 from inspect import signature
 
 from warnings import warn
@@ -42,6 +43,12 @@ __loaded_langs = []
 
 _localized_functions = {}
 
+# Resolved localized functions, keyed by (module_name, func_name, lang):
+# (localized_func, accepted_params, lang_code, full_lang_code).
+# Filled on the first successful call, cleared whenever the set of loaded
+# languages (and therefore the function dict) changes.
+_resolved_functions = {}
+
 # TODO the deprecation of 'lang=None' and 'lang=<invalid>' can refer to
 # commit 35efd0661a178e82f6745ad17e10e607c0d83472 for the "proper" state
 # of affairs, raising the errors below instead of deprecation warnings
@@ -135,6 +142,7 @@ def _set_active_langs(langs=None, override_default=True):
 
 
 def _refresh_function_dict():
+    _resolved_functions.clear()
     for mod in _localized_functions.keys():
         populate_localized_function_dict(mod, langs=__loaded_langs)
 
@@ -383,6 +391,17 @@ def __get_full_lang_code_deprecation_warning(lang=''):
         raise UnsupportedLanguageError(lang)
 
 
+def _inject_timezones(args, kwargs):
+    """Add local timezone awareness to naive datetime arguments."""
+    for key, value in kwargs.items():
+        if isinstance(value, datetime) and value.tzinfo is None:
+            kwargs[key] = to_local(value)
+    for idx, value in enumerate(args):
+        if isinstance(value, datetime) and value.tzinfo is None:
+            args = (*args[:idx], to_local(value), *args[idx + 1:])
+    return args, kwargs
+
+
 def localized_function(run_own_code_on=[type(None)]):
     """
     Decorator which finds localized functions, and calls them, from signatures
@@ -450,24 +469,59 @@ def localized_function(run_own_code_on=[type(None)]):
 
     # Begin wrapper
     def localized_function_decorator(func):
+        # Everything that depends only on the wrapped function is computed
+        # once, here, rather than on every call.
+        func_params = list(signature(func).parameters)
+        lang_param_index = func_params.index('lang')
+        _module_name = func.__module__.split('.')[-1]
+        func_name = func.__name__.split('.')[-1]
+
+        def _call_resolved(resolved, args, kwargs):
+            localized_func, accepted_params, lang_code, full_lang_code = \
+                resolved
+            if config.inject_timezones:
+                args, kwargs = _inject_timezones(args, kwargs)
+            args = tuple(arg for arg in args if
+                         not isinstance(arg, str) or
+                         arg not in (lang_code, full_lang_code))
+            if not kwargs:
+                return localized_func(*args)
+            return localized_func(*args,
+                                  **{arg: val for arg, val
+                                     in kwargs.items()
+                                     if arg in accepted_params})
+
         # Wrapper's logic
         def _call_localized_function(func, *args, **kwargs):
+            # Fast path: the function has already been resolved for this
+            # language (the default one if no lang is passed).
+            if len(args) <= lang_param_index:
+                if 'lang' in kwargs:
+                    lang_param = kwargs['lang']
+                    resolved = _resolved_functions.get(
+                        (_module_name, func_name, lang_param)) \
+                        if isinstance(lang_param, str) else None
+                    if resolved is not None:
+                        del kwargs['lang']
+                        return _call_resolved(resolved, args, kwargs)
+                else:
+                    resolved = _resolved_functions.get(
+                        (_module_name, func_name, __default_lang))
+                    if resolved is not None:
+                        return _call_resolved(resolved, args, kwargs)
+
             lang_code = None
             load_langs_on_demand = config.load_langs_on_demand
             unload_language_afterward = False
-            func_signature = signature(func)
-            func_params = list(func_signature.parameters)
-            lang_param_index = func_params.index('lang')
             full_lang_code = None
+            # Which cache key this call may be remembered under
+            default_lang_call = 'lang' not in kwargs and \
+                len(args) <= lang_param_index
+            lang_kwarg = kwargs.get('lang')
 
             # Check if we need to add timezone awareness to any datetime object
             if config.inject_timezones:
-                for key, value in kwargs.items():
-                    if isinstance(value, datetime) and value.tzinfo is None:
-                        kwargs[key] = to_local(value)
-                for idx, value in enumerate(args):
-                    if isinstance(value, datetime) and value.tzinfo is None:
-                        args = (*args[:idx], to_local(value), *args[idx + 1:])
+                args, kwargs = _inject_timezones(args, kwargs)
 
             # Check if we're passing a lang as a kwarg
             if 'lang' in kwargs.keys():
@@ -530,7 +584,6 @@ def localized_function(run_own_code_on=[type(None)]):
                 full_lang_code = get_full_lang_code(lang_code)
 
             # Here comes the ugly business.
-            _module_name = func.__module__.split('.')[-1]
             _module = import_module(".lang." + _module_name +
                                     "_" + lang_code, "lingua_franca")
             # The nonsense above gets you from lingua_franca.parse
@@ -547,7 +600,6 @@ def localized_function(run_own_code_on=[type(None)]):
                                               " module of language '" +
                                               lang_code +
                                               "' is not currently loaded.")
-            func_name = func.__name__.split('.')[-1]
             # At some point in the past, both the module and the language
             # were imported/loaded, respectively.
             # When that happened, we cached the *signature* of each
@@ -586,6 +638,22 @@ def localized_function(run_own_code_on=[type(None)]):
                                       in kwargs.items()
                                       if arg in loc_signature.parameters})
 
+            # Remember the resolution so that the next call with the same
+            # lang (or with no lang, for the default one) skips all of the
+            # above. Languages loaded on demand are unloaded again, so they
+            # are not cached.
+            if not unload_language_afterward:
+                resolved = (localized_func,
+                            frozenset(loc_signature.parameters),
+                            lang_code, full_lang_code)
+                if default_lang_call and lang_code == __default_lang:
+                    _resolved_functions[
+                        (_module_name, func_name, lang_code)] = resolved
+                elif lang_kwarg in _SUPPORTED_LANGUAGES or \
+                        lang_kwarg in _SUPPORTED_FULL_LOCALIZATIONS:
+                    _resolved_functions[
+                        (_module_name, func_name, lang_kwarg)] = resolved
+
             # Unload all the stuff we just assembled and imported
             del localized_func
             del _module
@@ -614,6 +682,65 @@ def localized_function(run_own_code_on=[type(None)]):
         return
 
 
+class _LazyLocalizedFunctions(dict):
+    """Signatures of one language's localized functions for one top-level
+    module ({function_name(str): signature}).
+
+    The language module is imported and inspected on the first lookup, so
+    activating a language costs nothing until one of its functions is
+    actually called.
+    """
+
+    def __init__(self, lf_module, lang_code):
+        super().__init__()
+        self.lf_module = lf_module
+        self.lang_code = lang_code
+        self.loaded = False
+
+    def __missing__(self, function_name):
+        if self.loaded:
+            raise KeyError(function_name)
+        self.load()
+        return dict.__getitem__(self, function_name)
+
+    def load(self):
+        if self.loaded:
+            return self
+        self.loaded = True
+        _FUNCTION_NOT_FOUND = ""
+        try:
+            lang_common_data = import_module(".lang.common_data_" + self.lang_code,
+                                             "lingua_franca")
+            _FUNCTION_NOT_FOUND = getattr(lang_common_data,
+                                          "_FUNCTION_NOT_IMPLEMENTED_WARNING")
+            del lang_common_data
+        except Exception:
+            _FUNCTION_NOT_FOUND = "This function has not been implemented" \
+                " in the specified language."
+        _FUNCTION_NOT_FOUND = FunctionNotLocalizedError(_FUNCTION_NOT_FOUND)
+
+        mod = import_module(".lang." + self.lf_module + "_" + self.lang_code,
+                            "lingua_franca")
+        function_names = getattr(import_module("." + self.lf_module, "lingua_franca"),
+                                 "_REGISTERED_FUNCTIONS")
+        for function_name in function_names:
+            try:
+                function = getattr(mod, function_name
+                                   + "_" + self.lang_code)
+                function_signature = signature(function)
+                del function
+            except AttributeError:
+                function_signature = _FUNCTION_NOT_FOUND
+                # TODO log these occurrences: "function 'function_name' not
+                # implemented in language 'primary_lang_code'"
+                #
+                # Perhaps provide this info to autodocs, to help volunteers
+                # identify the functions in need of localization
+            self[function_name] = function_signature
+        del mod
+        return self
+
+
 def populate_localized_function_dict(lf_module, langs=get_active_langs()):
     """Returns a dictionary of dictionaries, containing localized functions.
 
@@ -633,54 +760,36 @@ def populate_localized_function_dict(lf_module, langs=get_active_langs()):
         and its members are invoked via the `@localized_function` decorator.
 
     Example:
-        populate_localized_function_dict("format")["en"]["pronounce_number"](1)
-        "one"
+        populate_localized_function_dict("format")["en"]["pronounce_number"]
+        <Signature (number, places=2, ...)>
+
+    Languages are resolved lazily: each language maps to a
+    _LazyLocalizedFunctions that imports the language module on first
+    lookup.
     """
     bad_lang_code = "Language code '{}' is registered with" \
         " Lingua Franca, but its " + lf_module + " module" \
         " could not be found."
+    previous = _localized_functions.get(lf_module, {})
     return_dict = {}
     for lang_code in langs:
         primary_lang_code = get_primary_lang_code(lang_code)
+        # Keep functions already resolved for this language, if any
+        if isinstance(previous.get(primary_lang_code), _LazyLocalizedFunctions):
+            return_dict[primary_lang_code] = previous[primary_lang_code]
+            continue
         return_dict[primary_lang_code] = {}
-        _FUNCTION_NOT_FOUND = ""
-        try:
-            lang_common_data = import_module(".lang.common_data_" + primary_lang_code,
-                                             "lingua_franca")
-            _FUNCTION_NOT_FOUND = getattr(lang_common_data,
-                                          "_FUNCTION_NOT_IMPLEMENTED_WARNING")
-            del lang_common_data
-        except Exception:
-            _FUNCTION_NOT_FOUND = "This function has not been implemented" \
-                " in the specified language."
-        _FUNCTION_NOT_FOUND = FunctionNotLocalizedError(_FUNCTION_NOT_FOUND)
-
-        try:
-            mod = import_module(".lang." + lf_module + "_" + primary_lang_code,
-                                "lingua_franca")
-        except ModuleNotFoundError:
+        if find_spec(".lang." + lf_module + "_" + primary_lang_code,
+                     "lingua_franca") is None:
             warn(Warning(bad_lang_code.format(primary_lang_code)))
             continue
+        # The language module is imported, and its functions inspected,
+        # on first use rather than here.
+        return_dict[primary_lang_code] = \
+            _LazyLocalizedFunctions(lf_module, primary_lang_code)
 
-        function_names = getattr(import_module("." + lf_module, "lingua_franca"),
-                                 "_REGISTERED_FUNCTIONS")
-        for function_name in function_names:
-            try:
-                function = getattr(mod, function_name
-                                   + "_" + primary_lang_code)
-                function_signature = signature(function)
-                del function
-            except AttributeError:
-                function_signature = _FUNCTION_NOT_FOUND
-                # TODO log these occurrences: "function 'function_name' not
-                # implemented in language 'primary_lang_code'"
-                #
-                # Perhaps provide this info to autodocs, to help volunteers
-                # identify the functions in need of localization
-            return_dict[primary_lang_code][function_name] = function_signature
-
-        del mod
     _localized_functions[lf_module] = return_dict
+    _resolved_functions.clear()
     return _localized_functions[lf_module]
 
 
@@ -26,6 +26,7 @@ from lingua_franca.lang.common_data_ru import _NUM_STRING_RU, \
 
 import re
 import json
+from functools import lru_cache
 from lingua_franca import resolve_resource_file
 from lingua_franca.time import now_local
 
@@ -59,43 +60,48 @@ _SUMS = {'двадцать', '20', 'тридцать', '30', 'сорок', '40',
          'пятьсот', '500', 'шестьсот', '600', 'семьсот', '700', 'восемьсот', '800',
          'девятьсот', '900'}
 
-_MULTIPLIES_LONG_SCALE_RU = set(_LONG_SCALE_RU.values()) | \
-                            generate_plurals_ru(_LONG_SCALE_RU.values())
-
-_MULTIPLIES_SHORT_SCALE_RU = set(_SHORT_SCALE_RU.values()) | \
-                             generate_plurals_ru(_SHORT_SCALE_RU.values())
-
 # split sentence parse separately and sum ( 2 and a half = 2 + 0.5 )
 _FRACTION_MARKER = {"и", "с", " "}
 
 # decimal marker ( 1 point 5 = 1 + 0.5)
 _DECIMAL_MARKER = {"целая", "целых", "точка", "запятая"}
 
-_STRING_NUM_RU = invert_dict(_NUM_STRING_RU)
-_STRING_NUM_RU.update({
-    "тысяч": 1e3,
-})
-_STRING_NUM_RU.update(generate_plurals_ru(_STRING_NUM_RU))
-_STRING_NUM_RU.update({
-    "четверти": 0.25,
-    "четвёртая": 0.25,
-    "четвёртых": 0.25,
-    "третья": 1 / 3,
-    "третяя": 1 / 3,
-    "вторая": 0.5,
-    "вторых": 0.5,
-    "половина": 0.5,
-    "половиной": 0.5,
-    "пол": 0.5,
-    "одна": 1,
-    "двойка": 2,
-    "двое": 2,
-    "пара": 2,
-    "сот": 100,
-    "сотен": 100,
-    "сотни": 100,
-    "сотня": 100,
-})
+@lru_cache(maxsize=None)
+def _string_num_ru():
+    """
+    Words to numbers table, built on first use rather than at import.
+
+    Returns:
+        dict(str, number)
+
+    """
+    string_num_ru = invert_dict(_NUM_STRING_RU)
+    string_num_ru.update({
+        "тысяч": 1e3,
+    })
+    string_num_ru.update(generate_plurals_ru(string_num_ru))
+    string_num_ru.update({
+        "четверти": 0.25,
+        "четвёртая": 0.25,
+        "четвёртых": 0.25,
+        "третья": 1 / 3,
+        "третяя": 1 / 3,
+        "вторая": 0.5,
+        "вторых": 0.5,
+        "половина": 0.5,
+        "половиной": 0.5,
+        "пол": 0.5,
+        "одна": 1,
+        "двойка": 2,
+        "двое": 2,
+        "пара": 2,
+        "сот": 100,
+        "сотен": 100,
+        "сотни": 100,
+        "сотня": 100,
+    })
+    return string_num_ru
+
 
 _WORDS_NEXT_RU = [
     "будущая", "будущее", "будущей", "будущий", "будущим", "будущую",
@@ -124,9 +130,6 @@ _WORDS_DAY_RU = ["днём"]
 _WORDS_EVENING_RU = ["вечер", "вечером"]
 _WORDS_NIGHT_RU = ["ночь", "ночью"]
 
-_STRING_SHORT_ORDINAL_RU = invert_dict(_SHORT_ORDINAL_RU)
-_STRING_LONG_ORDINAL_RU = invert_dict(_LONG_ORDINAL_RU)
-
 
 def _convert_words_to_numbers_ru(text, short_scale=True, ordinals=False):
     """
@@ -370,6 +373,7 @@ def _extract_whole_number_with_text_ru(tokens, short_scale, ordinals):
     """
     multiplies, string_num_ordinal, string_num_scale = \
         _initialize_number_data(short_scale)
+    string_num_ru = _string_num_ru()
 
     number_words = []  # type: [Token]
     val = False
@@ -407,7 +411,7 @@ def _extract_whole_number_with_text_ru(tokens, short_scale, ordinals):
             word = _text_ru_inflection_normalize(word, 1)
 
         if word not in string_num_scale and \
-                word not in _STRING_NUM_RU and \
+                word not in string_num_ru and \
                 word not in _SUMS and \
                 word not in multiplies and \
                 not (ordinals and word in string_num_ordinal) and \
@@ -440,8 +444,8 @@ def _extract_whole_number_with_text_ru(tokens, short_scale, ordinals):
             current_val = val
 
         # is this word the name of a number ?
-        if word in _STRING_NUM_RU:
-            val = _STRING_NUM_RU.get(word)
+        if word in string_num_ru:
+            val = string_num_ru.get(word)
             current_val = val
         elif word in string_num_scale:
             val = string_num_scale.get(word)
@@ -584,11 +588,13 @@ def _extract_whole_number_with_text_ru(tokens, short_scale, ordinals):
     return val, number_words
 
 
+@lru_cache(maxsize=None)
 def _initialize_number_data(short_scale):
     """
     Generate dictionaries of words to numbers, based on scale.
 
-    This is a helper function for _extract_whole_number.
+    This is a helper function for _extract_whole_number. The tables are
+    built once per scale, on first use, and must not be modified by callers.
 
     Args:
         short_scale boolean:
@@ -598,13 +604,14 @@ def _initialize_number_data(short_scale):
         multiplies, string_num_ordinal, string_num_scale
 
     """
-    multiplies = _MULTIPLIES_SHORT_SCALE_RU if short_scale \
-        else _MULTIPLIES_LONG_SCALE_RU
+    scale_ru = _SHORT_SCALE_RU if short_scale else _LONG_SCALE_RU
+    multiplies = set(scale_ru.values()) | \
+        generate_plurals_ru(scale_ru.values())
 
-    string_num_ordinal_ru = _STRING_SHORT_ORDINAL_RU if short_scale \
-        else _STRING_LONG_ORDINAL_RU
+    string_num_ordinal_ru = invert_dict(_SHORT_ORDINAL_RU if short_scale
+                                        else _LONG_ORDINAL_RU)
 
-    string_num_scale_ru = _SHORT_SCALE_RU if short_scale else _LONG_SCALE_RU
+    string_num_scale_ru = scale_ru
     string_num_scale_ru = invert_dict(string_num_scale_ru)
     string_num_scale_ru.update(generate_plurals_ru(string_num_scale_ru))
     return multiplies, string_num_ordinal_ru, string_num_scale_ru
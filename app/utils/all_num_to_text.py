@@ -1,33 +1,61 @@
 import re
-import app.lib.lingua_franca
+from functools import lru_cache
+import lingua_franca
 from app.lib.lingua_franca.format import pronounce_number
+from app.lib.lingua_franca.lang.format_ru import pronounce_number_ru
+
+_lang = "ru"
 
 """
     Загружает язык для библиотеки lingua_franca :param lang: код языка (например, 'ru' или 'en')
+    Язык загружается в пакет lingua_franca верхнего уровня - через него format диспетчеризует локализованные функции
 """
 def load_language(lang: str):
-    app.lib.lingua_franca.load_language(lang)
+    global _lang
+    lingua_franca.load_language(lang)
+    if lang != _lang:
+        _lang = lang
+        _say_number.cache_clear()
 
 """
-    Преобразует найденное число (целое или с плавающей точкой) в текст
-    Использует pronounce_number из lingua_franca
+    Все виды чисел за один проход; порядок альтернатив - приоритет при совпадении в одной позиции
+        range_float - диапазон с плавающей точкой: 120.1-120.8
+        float       - (отрицательное) число с плавающей точкой: -30.1, 44.05, .5
+        range_int   - диапазон целых: 10-20 (но не 5-3.2 - там минус у дробного)
+        int         - (отрицательное) целое: -10, 225
+        percent     - знак процента
 """
-def convert_one_num_float(match_obj):
-    if match_obj.group() is not None:
-        return pronounce_number(float(match_obj.group()))
+_NUMBER_RE = re.compile(
+    r"(?P<range_float>\d*\.\d+-\d*\.\d+)"
+    r"|(?P<float>-?\d*\.\d+)"
+    r"|(?P<range_int>\d+-\d+(?!\.\d))"
+    r"|(?P<int>-?\d+)"
+    r"|(?P<percent>%)"
+)
 
 """
-    Преобразует диапазон чисел в текст
-    Например: '120.1-120.8' -> 'сто двадцать целых одна десятая тире сто двадцать целых восемь десятых'
+    Произносит одно число; повторяющиеся числа (время, таймеры) берутся из кэша
+    Для русского вызывает вербализатор напрямую, минуя диспетчеризацию lingua_franca
 """
-def convert_diapazon(match_obj):
-    if match_obj.group() is not None:
-        text = str(match_obj.group())
-        text = text.replace("-", " тире ")
-        return all_num_to_text(text)
+@lru_cache(maxsize=4096)
+def _say_number(token: str) -> str:
+    if _lang == "ru":
+        return pronounce_number_ru(float(token))
+    return pronounce_number(float(token), lang=_lang)
+
+def _convert(match_obj) -> str:
+    kind = match_obj.lastgroup
+    token = match_obj.group()
+    if kind == "percent":
+        return " процентов"
+    if kind in ("range_float", "range_int"):
+        left, right = token.split("-", 1)
+        return f"{_say_number(left)} тире {_say_number(right)}"
+    return _say_number(token)
 
 """
     Находит и преобразует все числа в тексте в текстовую форму (пропись)
+    Например: '120.1-120.8' -> 'сто двадцать точка один тире сто двадцать точка восемь'
 
     Поддерживает
         числа с плавающей точкой
@@ -36,21 +64,7 @@ def convert_diapazon(match_obj):
         проценты
 """
 def all_num_to_text(text: str) -> str:
-    # Диапазон с плавающей точкой
-    text = re.sub(r'[\d]*[.][\d]+-[\d]*[.][\d]+', convert_diapazon, text)
-    # Отрицательные числа с плавающей точкой
-    text = re.sub(r'-[\d]*[.][\d]+', convert_one_num_float, text)
-    # Положительные числа с плавающей точкой
-    text = re.sub(r'[\d]*[.][\d]+', convert_one_num_float, text)
-    # Диапазон целых чисел
-    text = re.sub(r'[\d]-[\d]+', convert_diapazon, text)
-    # Отрицательные целые числа
-    text = re.sub(r'-[\d]+', convert_one_num_float, text)
-    # Положительные целые числа
-    text = re.sub(r'[\d]+', convert_one_num_float, text)
-    # Заменяем знак процента на слово
-    text = text.replace("%", " процентов")
-    return text
+    return _NUMBER_RE.sub(_convert, text)
 
 if __name__ == "__main__":
     load_language("ru")
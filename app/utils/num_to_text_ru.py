@@ -1,5 +1,6 @@
 import decimal
 import sys
+from functools import lru_cache
 
 units = (
     u'ноль',
@@ -88,11 +89,55 @@ def thousand(rest, sex):
             name.append(names[cur - 1])
     return plural, name
 
+# Размер таблиц готовых форм: 0..9999 покрывает время, таймеры и списки
+TABLE_SIZE = 10000
+
+# main_units -> список готовых строк для 0..TABLE_SIZE-1
+_tables = {}
+
 """
     Преобразует целое число в текст (на русском)
     main_units - ((ед.ч., род.ед., род.множ.), род)
+
+    0..9999 берутся из таблицы готовых форм для этих единиц (строится при первом обращении),
+    остальные значения - из LRU-кэша
 """
 def num2text(num, main_units=((u'', u'', u''), 'm')):
+    if type(num) is int and 0 <= num < TABLE_SIZE:
+        try:
+            table = _tables.get(main_units)
+            if table is None:
+                table = precompute(main_units)
+            return table[num]
+        except TypeError:
+            # Нехэшируемые единицы (списки) - без кэша
+            return _num2text(num, main_units)
+    try:
+        return _num2text_cached(num, main_units)
+    except TypeError:
+        return _num2text(num, main_units)
+
+"""
+    Строит таблицу форм 0..9999 для единиц: 0..999 - через _num2text, остальное - приставкой тысяч
+"""
+def precompute(main_units=((u'', u'', u''), 'm')):
+    table = _tables.get(main_units)
+    if table is not None:
+        return table
+
+    below = [_num2text(n, main_units) for n in range(1000)]
+    # Форма единиц для круглых тысяч («одна тысяча минут»)
+    round_tail = main_units[0][2]
+    table = below[:]
+    for t in range(1, TABLE_SIZE // 1000):
+        prefix = _num2text(t * 1000)
+        table.append((prefix + " " + round_tail).strip())
+        table.extend(prefix + " " + below[r] for r in range(1, 1000))
+
+    _tables[main_units] = table
+    return table
+
+def _num2text(num, main_units=((u'', u'', u''), 'm')):
     _orders = (main_units,) + orders
     if num == 0:
         return ' '.join((units[0], _orders[0][0][2])).strip()
@@ -113,6 +158,8 @@ def num2text(num, main_units=((u'', u'', u''), 'm')):
     name.reverse()
     return ' '.join(name).strip()
 
+_num2text_cached = lru_cache(maxsize=1024)(_num2text)
+
 """
     Преобразует десятичное число в текст с учётом дробной части
     places - сколько знаков после запятой озвучивать
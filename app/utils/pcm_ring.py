@@ -0,0 +1,86 @@
+import time
+from typing import Optional
+
+"""
+    Кольцевой буфер PCM для одного писателя и одного читателя (SPSC)
+
+    Память выделяется один раз (bytearray), запись и чтение - копирование срезов memoryview без блокировок:
+        писатель (колбэк аудио) меняет только счётчик записанного _write
+        читатель (цикл распознавания) меняет только счётчик прочитанного _read
+    Оба счётчика монотонно растут, позиция в буфере - остаток от деления на ёмкость
+    Если места нет, блок не пишется, а учитывается в overruns/dropped_bytes
+"""
+
+class PcmRing:
+    def __init__(self, capacity: int, align: int = 2):
+        # Ёмкость кратна размеру сэмпла (int16 - 2 байта), чтобы чтение не разрывало сэмплы
+        self.align = align
+        self.capacity = capacity - capacity % align
+        self._buf = bytearray(self.capacity)
+        self._mv = memoryview(self._buf)
+        self._write = 0
+        self._read = 0
+        # Переполнения: число потерянных блоков и байт
+        self.overruns = 0
+        self.dropped_bytes = 0
+
+    """
+        Сторона писателя: копирует блок в буфер целиком или отбрасывает его (с учётом в overruns)
+    """
+    def write(self, data) -> bool:
+        src = memoryview(data).cast("B")
+        n = len(src)
+        if n > self.capacity - (self._write - self._read):
+            self.overruns += 1
+            self.dropped_bytes += n
+            return False
+
+        pos = self._write % self.capacity
+        first = min(n, self.capacity - pos)
+        self._mv[pos:pos + first] = src[:first]
+        if first < n:
+            self._mv[:n - first] = src[first:]
+        # Публикуем блок только после копирования
+        self._write += n
+        return True
+
+    def available(self) -> int:
+        return self._write - self._read
+
+    """
+        Сторона читателя: непрерывный кусок готовых данных (до конца буфера) без копирования
+        Вид действителен до вызова advance()
+    """
+    def peek(self, max_bytes: int) -> memoryview:
+        pos = self._read % self.capacity
+        n = min(self._write - self._read, max_bytes, self.capacity - pos)
+        n -= n % self.align
+        return self._mv[pos:pos + n]
+
+    def advance(self, n: int):
+        self._read += n
+
+    """
+        Ждёт min_bytes (или таймаут) и возвращает до max_bytes данных копией
+        Копия нужна потребителям, которые принимают только bytes (KaldiRecognizer.AcceptWaveform)
+        При таймауте возвращает None
+    """
+    def read(self, max_bytes: int, min_bytes: int = 1, timeout: Optional[float] = None, poll_interval: float = 0.005) -> Optional[bytes]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._write - self._read < min_bytes:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+        view = self.peek(max_bytes)
+        data = bytes(view)
+        self.advance(len(data))
+        return data
+
+    """
+        Сторона читателя: отбрасывает всё накопленное (например, звук, записанный во время ответа ассистента)
+    """
+    def discard(self) -> int:
+        n = self._write - self._read
+        self._read += n
+        return n
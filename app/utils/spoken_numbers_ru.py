@@ -0,0 +1,174 @@
+import re
+from typing import List, Optional, Set, Tuple
+
+from app.utils.num_to_text_ru import num2text
+
+"""
+    Лексикон произносимых чисел и разбор длительностей («на двадцать пять минут», «час тридцать»)
+
+    Префиксное дерево (trie) по словам: последовательность слов числительного -> число
+    Строится один раз (при первом использовании) из num2text: 1..999 в мужском и женском роде,
+    плюс винительный падеж («одну», «двадцать одну») и «полтора»/«полторы»
+    Фраза разбирается за один проход слева направо: число (словами или цифрами) + единица
+"""
+
+# Единицы: ключ -> (секунд в единице, формы для num2text)
+UNITS = {
+    "hour": (3600, (('час', 'часа', 'часов'), 'm')),
+    "minute": (60, (('минута', 'минуты', 'минут'), 'f')),
+    "second": (1, (('секунда', 'секунды', 'секунд'), 'f')),
+}
+
+# Слово -> единица (все падежи, которые встречаются после числительного)
+_UNIT_WORDS = {
+    "час": "hour", "часа": "hour", "часов": "hour", "ч": "hour",
+    "минута": "minute", "минуту": "minute", "минуты": "minute", "минут": "minute", "мин": "minute",
+    "секунда": "second", "секунду": "second", "секунды": "second", "секунд": "second", "сек": "second",
+}
+
+# Слова, сразу означающие длительность: слово -> (число, единица)
+_DURATION_WORDS = {
+    "полчаса": (30, "minute"),
+    "полминуты": (30, "second"),
+}
+
+# Следующая по убыванию единица: «час тридцать» - минуты, «минута тридцать» - секунды
+_NEXT_UNIT = {"hour": "minute", "minute": "second"}
+
+_WORD_RE = re.compile(r"\d+|[а-яё]+")
+
+# Ключ узла trie, под которым хранится значение
+_VALUE = None
+
+_trie: Optional[dict] = None
+
+def _add(trie: dict, words: List[str], value: float):
+    node = trie
+    for word in words:
+        node = node.setdefault(word, {})
+    node[_VALUE] = value
+
+"""
+    Строит trie числительных 1..999 (мужской/женский род, винительный падеж женского рода)
+"""
+def _build_trie() -> dict:
+    trie: dict = {}
+    for n in range(1, 1000):
+        for sex in ('m', 'f'):
+            words = num2text(n, (('', '', ''), sex)).split()
+            _add(trie, words, n)
+            # Винительный падеж: «одну минуту», «двадцать одну секунду»
+            if words[-1] == 'одна':
+                _add(trie, words[:-1] + ['одну'], n)
+    _add(trie, ['полтора'], 1.5)
+    _add(trie, ['полторы'], 1.5)
+    return trie
+
+def get_trie() -> dict:
+    global _trie
+    if _trie is None:
+        _trie = _build_trie()
+    return _trie
+
+"""
+    Самое длинное числительное, начинающееся с tokens[i]
+    Возвращает (число, индекс следующего слова) или (None, i)
+"""
+def match_number(tokens: List[str], i: int) -> Tuple[Optional[float], int]:
+    if i >= len(tokens):
+        return None, i
+    if tokens[i].isdigit():
+        return int(tokens[i]), i + 1
+
+    node = get_trie()
+    value, end = None, i
+    j = i
+    while j < len(tokens):
+        node = node.get(tokens[j])
+        if node is None:
+            break
+        j += 1
+        if _VALUE in node:
+            value, end = node[_VALUE], j
+    return value, end
+
+"""
+    Разбирает длительность с начала фразы за один проход
+    Возвращает список частей [(число, единица)] или None, если длительность не найдена
+    Число без единицы - минуты, после часов - минуты, после минут - секунды
+"""
+def parse_duration(phrase: str) -> Optional[List[Tuple[int, str]]]:
+    tokens = _WORD_RE.findall((phrase or "").lower().replace("ё", "е"))
+    i = 1 if tokens[:1] == ["на"] else 0
+
+    parts: List[Tuple[int, str]] = []
+    last_unit: Optional[str] = None
+    while i < len(tokens):
+        if tokens[i] == "и" and parts:
+            i += 1
+            continue
+
+        if tokens[i] in _DURATION_WORDS:
+            value, unit = _DURATION_WORDS[tokens[i]]
+            j = i + 1
+        else:
+            value, j = match_number(tokens, i)
+            unit = _UNIT_WORDS.get(tokens[j]) if j < len(tokens) else None
+            if unit is not None:
+                j += 1
+            elif value is not None:
+                # Число без единицы
+                unit = _NEXT_UNIT.get(last_unit) if last_unit else "minute"
+            if value is None:
+                # «час», «минуту» без числа - одна единица
+                value = 1 if unit is not None else None
+
+        if value is None or unit is None or not value:
+            break
+        if any(u == unit for _, u in parts):
+            break
+
+        # Полтора часа -> час тридцать минут
+        whole = int(value)
+        if whole:
+            parts.append((whole, unit))
+        if value != whole and unit in _NEXT_UNIT:
+            parts.append((int(round((value - whole) * 60)), _NEXT_UNIT[unit]))
+
+        last_unit = parts[-1][1]
+        i = j
+        if unit == "second":
+            break
+
+    return parts or None
+
+"""
+    Все слова, из которых складываются числительные и длительности (для грамматики распознавателя)
+"""
+def number_words() -> Set[str]:
+    words: Set[str] = set(_UNIT_WORDS) | set(_DURATION_WORDS) | {"на", "и"}
+    stack = [get_trie()]
+    while stack:
+        node = stack.pop()
+        for word, child in node.items():
+            if word is not _VALUE:
+                words.add(word)
+                stack.append(child)
+    return words
+
+def duration_seconds(parts: List[Tuple[int, str]]) -> int:
+    return sum(value * UNITS[unit][0] for value, unit in parts)
+
+"""
+    Раскладывает секунды на части [(часы, 'hour'), (минуты, 'minute'), (секунды, 'second')] без нулевых
+"""
+def parts_from_seconds(seconds: int) -> List[Tuple[int, str]]:
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return [(value, unit) for value, unit in ((hours, "hour"), (minutes, "minute"), (secs, "second")) if value]
+
+"""
+    Озвучивание длительности: [(1, 'hour'), (30, 'minute')] -> 'один час тридцать минут'
+"""
+def duration_to_text(parts: List[Tuple[int, str]]) -> str:
+    return " ".join(num2text(value, UNITS[unit][1]) for value, unit in parts)
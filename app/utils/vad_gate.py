@@ -0,0 +1,138 @@
+import collections
+from typing import Optional
+
+import numpy
+
+try:
+    import webrtcvad
+except Exception:
+    webrtcvad = None
+
+"""
+    Шлюз активности голоса перед распознавателем (режим микрофона)
+
+    Звук режется на кадры VAD (10/20/30 мс), каждый кадр:
+        тише порога энергии - тишина (webrtcvad не вызывается)
+        иначе решает webrtcvad (если он установлен и частота поддерживается), без него - только энергия
+    В распознаватель уходят только участки речи:
+        при начале речи - сначала предзапись (pre-roll), чтобы не срезать начало слова
+        после речи - ещё hangover мс тишины, чтобы Kaldi успел закончить фразу
+    Окончание участка речи отмечается флагом speech_ended
+"""
+
+VAD_SAMPLERATES = (8000, 16000, 32000, 48000)
+
+class GateStats:
+    def __init__(self):
+        self.frames = 0
+        self.speech_frames = 0
+        self.fed_frames = 0
+        # Процессорное время цикла распознавания в тишине и на речи, длительность звука в тишине
+        self.idle_cpu = 0.0
+        self.busy_cpu = 0.0
+        self.idle_audio = 0.0
+
+    """
+        Доля процессорного времени на секунду тишины, %
+    """
+    def idle_cpu_percent(self) -> float:
+        return 100.0 * self.idle_cpu / self.idle_audio if self.idle_audio else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"кадров {self.frames}, речь {self.speech_frames}, в распознаватель {self.fed_frames}; "
+            f"CPU в тишине {self.idle_cpu_percent():.2f}% ({self.idle_cpu:.2f} с на {self.idle_audio:.0f} с звука), "
+            f"CPU на речи {self.busy_cpu:.2f} с"
+        )
+
+class VadGate:
+    def __init__(self, samplerate: int, aggressiveness: int = 2, frame_ms: int = 30, energy_threshold: float = 300.0, preroll_ms: int = 300, hangover_ms: int = 600):
+        self.samplerate = samplerate
+        self.frame_bytes = int(samplerate * frame_ms / 1000) * 2
+        self.energy_threshold = energy_threshold
+        self.vad = None
+        if webrtcvad is not None and samplerate in VAD_SAMPLERATES:
+            self.vad = webrtcvad.Vad(max(0, min(3, int(aggressiveness))))
+
+        self.preroll = collections.deque(maxlen=max(1, preroll_ms // frame_ms))
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+
+        self.active = False
+        self.speech_ended = False
+        self._hang = 0
+        # Остаток блока, не кратный кадру
+        self._tail = b""
+        self.stats = GateStats()
+
+    def _is_speech(self, frame: bytes) -> bool:
+        samples = numpy.frombuffer(frame, dtype=numpy.int16)
+        rms = float(numpy.sqrt(numpy.mean(samples.astype(numpy.float32) ** 2))) if len(samples) else 0.0
+        if rms < self.energy_threshold:
+            return False
+        if self.vad is None:
+            return True
+        return self.vad.is_speech(frame, self.samplerate)
+
+    """
+        Пропускает блок через шлюз, возвращает звук для распознавателя (b"" - тишина)
+    """
+    def process(self, block: bytes) -> bytes:
+        self.speech_ended = False
+        data = self._tail + block if self._tail else block
+        step = self.frame_bytes
+        usable = len(data) - len(data) % step
+        self._tail = data[usable:]
+
+        out = bytearray()
+        stats = self.stats
+        for off in range(0, usable, step):
+            frame = data[off:off + step]
+            stats.frames += 1
+            speech = self._is_speech(frame)
+            if speech:
+                stats.speech_frames += 1
+
+            if self.active:
+                out += frame
+                stats.fed_frames += 1
+                if speech:
+                    self._hang = self.hangover_frames
+                else:
+                    self._hang -= 1
+                    if self._hang <= 0:
+                        self.active = False
+                        self.speech_ended = True
+            elif speech:
+                for pre in self.preroll:
+                    out += pre
+                stats.fed_frames += len(self.preroll) + 1
+                self.preroll.clear()
+                out += frame
+                self.active = True
+                self._hang = self.hangover_frames
+            else:
+                self.preroll.append(frame)
+
+        return bytes(out)
+
+    """
+        Учёт процессорного времени обработки блока (для метрики CPU в тишине)
+    """
+    def account(self, cpu_seconds: float, block_seconds: float, fed: bool):
+        if fed:
+            self.stats.busy_cpu += cpu_seconds
+        else:
+            self.stats.idle_cpu += cpu_seconds
+            self.stats.idle_audio += block_seconds
+
+    def reset(self):
+        self.active = False
+        self.speech_ended = False
+        self._hang = 0
+        self._tail = b""
+        self.preroll.clear()
+
+def describe(gate: Optional[VadGate]) -> str:
+    if gate is None:
+        return "выключен"
+    return "webrtcvad + энергия" if gate.vad is not None else "только энергия"
@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import lingua_franca
+from lingua_franca.format import pronounce_number, nice_duration
+from lingua_franca.parse import extract_number
+from lingua_franca.lang.format_ru import pronounce_number_ru
+
+"""
+    Микробенчмарк диспетчеризации localized_function в lingua_franca
+
+    Сравнивает вызов через декоратор (язык по умолчанию и явный lang="ru") с прямым вызовом
+    русской функции - разница и есть накладные расходы диспетчеризации
+
+    Запуск из корня проекта:
+        python benchmarks/lingua_franca_dispatch.py --calls 20000
+"""
+
+def measure(name: str, fn, calls: int):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{name:<40} {calls / elapsed:>10.0f} вызовов/с {elapsed / calls * 1e6:>8.2f} мкс/вызов")
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк диспетчеризации lingua_franca")
+    parser.add_argument("--calls", type=int, default=20000, help="Количество вызовов на случай")
+    args = parser.parse_args()
+
+    lingua_franca.load_language("ru")
+
+    measure("pronounce_number_ru (напрямую)", lambda: pronounce_number_ru(42), args.calls)
+    measure("pronounce_number (по умолчанию)", lambda: pronounce_number(42), args.calls)
+    measure("pronounce_number (lang='ru')", lambda: pronounce_number(42, lang="ru"), args.calls)
+    measure("pronounce_number (places=1)", lambda: pronounce_number(3.14, places=1), args.calls)
+    measure("extract_number", lambda: extract_number("сорок два"), args.calls)
+    measure("nice_duration", lambda: nice_duration(125), args.calls)
+
+if __name__ == "__main__":
+    main()
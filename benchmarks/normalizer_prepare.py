@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.utils.all_num_to_text import all_num_to_text, load_language
+from app.extensions.normalizer_prepare.main import manifest
+from app.extensions.normalizer_prepare.normalizer import PrepareNormalizer
+
+"""
+    Микробенчмарк нормализатора normalizer_prepare на корпусе типичных ответов ассистента
+
+    Запуск из корня проекта:
+        python benchmarks/normalizer_prepare.py
+        python benchmarks/normalizer_prepare.py --corpus benchmarks/corpus/replies_ru.txt --repeat 50 --show
+"""
+
+DEFAULT_CORPUS = os.path.join(ROOT, "benchmarks", "corpus", "replies_ru.txt")
+
+def load_corpus(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк normalizer_prepare")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Файл с ответами, по одному в строке")
+    parser.add_argument("--repeat", type=int, default=20, help="Сколько раз прогнать корпус")
+    parser.add_argument("--show", action="store_true", help="Показать результат нормализации корпуса")
+    args = parser.parse_args()
+
+    load_language("ru")
+    corpus = load_corpus(args.corpus)
+    opts = manifest()["options"]
+
+    t0 = time.perf_counter()
+    normalizer = PrepareNormalizer(opts, all_num_to_text)
+    compile_ms = (time.perf_counter() - t0) * 1000
+
+    # Первый прогон - прогрев (импорт eng_to_ipa, словари lingua_franca)
+    t0 = time.perf_counter()
+    results = [normalizer.normalize(text) for text in corpus]
+    first_ms = (time.perf_counter() - t0) * 1000
+
+    calls = 0
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in corpus:
+            normalizer.normalize(text)
+            calls += 1
+    elapsed = time.perf_counter() - t0
+
+    if args.show:
+        for src, dst in zip(corpus, results):
+            print(f"{src}\n  -> {dst}")
+        print()
+
+    print(f"Корпус: {len(corpus)} ответов, {sum(len(t) for t in corpus)} символов")
+    print(f"Компиляция: {compile_ms:.2f} мс")
+    print(f"Первый прогон: {first_ms:.1f} мс")
+    print(f"Прогрето: {calls} вызовов за {elapsed:.3f} с - {calls / elapsed:.0f} вызовов/с, {elapsed / calls * 1e6:.1f} мкс/вызов")
+
+if __name__ == "__main__":
+    main()
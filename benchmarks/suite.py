@@ -0,0 +1,392 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import wave
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy
+
+from normalizer_prepare import DEFAULT_CORPUS, load_corpus
+
+"""
+    Набор бенчмарков горячих путей Легиона - без звуковой карты, сети и моделей:
+    TTS и воспроизведение заменены заглушками, распознаватель Vosk - заглушкой с заданной фразой
+
+    Случаи:
+        fuzzy/N           - find_best_cmd_with_fuzzy на синтетическом наборе из N команд (10/100/1000)
+        run_input_str     - полный разбор фразы в ядре (обращение, команда, ответ текстом)
+        all_num_to_text   - числа в словах на корпусе ответов
+        normalizer_prepare - нормализатор normalizer_prepare на корпусе ответов
+        num2text          - числительные с единицами
+        set_timer         - разбор длительности таймера в greetings
+        ws/process_chunk  - цикл WebSocket через FastAPI TestClient: чанк -> process_chunk -> ответ
+        diarization       - кластеризация синтетических эмбеддингов (нужны зависимости stt_speaker_vosk_speechbrain)
+
+    Время - лучшее из rounds прогонов (мкс на операцию), каждый прогон не короче min_time секунд
+    Результат сравнивается с baseline: медленнее больше чем на threshold - регрессия, код возврата 1
+    Без baseline сравнивать не с чем: код возврата 0, с --require-baseline - 2
+    Случай без нужных зависимостей пропускается
+
+    Запуск из корня проекта:
+        python benchmarks/suite.py --save           - прогон и запись baseline (на эталонной машине)
+        python benchmarks/suite.py                  - прогон и сравнение с baseline
+        python benchmarks/suite.py -k fuzzy -k ws --threshold 0.3
+
+    В CI baseline зависит от машины, поэтому в репозитории его нет:
+        1. На эталонном раннере (том же, где идёт проверка) один раз, и после намеренных изменений скорости:
+               python benchmarks/suite.py --save
+           полученный benchmarks/baseline.json сохраняется (кэш/артефакт CI или коммит в ветку раннера)
+        2. Шаг проверки восстанавливает baseline.json и запускает:
+               python benchmarks/suite.py --require-baseline
+           отсутствующий baseline - ошибка, а не молча пройденная проверка
+"""
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+
+# Случай: имя -> подготовка, возвращает функцию одной операции
+CASES: List[Tuple[str, Callable[["Bench"], Callable[[], None]]]] = []
+
+def case(name: str):
+    def wrap(setup):
+        CASES.append((name, setup))
+        return setup
+    return wrap
+
+class Skip(Exception):
+    pass
+
+"""
+    Заглушка TTS: вместо синтеза - короткий WAV с тишиной
+"""
+def _stub_tts_init(core):
+    pass
+
+def _stub_tts_to_wav(core, text_to_speech: str, filename: str):
+    with wave.open(filename, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(bytes(3200))
+
+def _stub_play_init(core):
+    pass
+
+def _stub_play_wav(core, wav_file: str):
+    pass
+
+"""
+    Заглушка KaldiRecognizer: каждый every-й чанк завершает фразу text
+"""
+class StubRecognizer:
+    def __init__(self, text: str, every: int = 4):
+        self.text = text
+        self.every = every
+        self.chunks = 0
+
+    def AcceptWaveform(self, data) -> bool:
+        self.chunks += 1
+        return self.chunks % self.every == 0
+
+    def Result(self) -> str:
+        return json.dumps({"text": self.text}, ensure_ascii=False)
+
+    def PartialResult(self) -> str:
+        return json.dumps({"partial": self.text.split()[0]}, ensure_ascii=False)
+
+    def FinalResult(self) -> str:
+        return json.dumps({"text": ""})
+
+"""
+    Общее окружение случаев: ядро с заглушками (создаётся один раз) и корпус ответов
+"""
+class Bench:
+    def __init__(self, corpus_path: str):
+        self.corpus_path = corpus_path
+        self._core = None
+        self._corpus = None
+        # Освобождение ресурсов случаев (соединения TestClient)
+        self.cleanup = contextlib.ExitStack()
+
+    @property
+    def core(self):
+        if self._core is None:
+            from app.core.core import Core
+            core = Core()
+            core.ttss["bench"] = (_stub_tts_init, None, _stub_tts_to_wav)
+            core.play_wavs["bench"] = (_stub_play_init, _stub_play_wav)
+            core.tts_engine_id = "bench"
+            core.play_wav_engine_id = "bench"
+            core.use_tts_cache = False
+            core.init_with_extensions()
+            core.remote_tts = "saytxt"
+            self._core = core
+        return self._core
+
+    @property
+    def corpus(self) -> List[str]:
+        if self._corpus is None:
+            self._corpus = load_corpus(self.corpus_path)
+        return self._corpus
+
+def _registry(size: int) -> dict:
+    def handler(core, phrase):
+        pass
+    return {f"команда номер {i}|синоним {i}": handler for i in range(size)}
+
+def _fuzzy_case(size: int):
+    def setup(bench: Bench):
+        core = bench.core
+        context = _registry(size)
+        # Точное совпадение с последней командой, совпадение с остатком фразы и промах
+        queries = [f"синоним {size - 1}", f"команда номер {size // 2} и ещё слова", "такой команды нет"]
+
+        def run():
+            for query in queries:
+                core.find_best_cmd_with_fuzzy(query, context)
+        return run
+    return setup
+
+for _size in (10, 100, 1000):
+    case(f"fuzzy/{_size}")(_fuzzy_case(_size))
+
+@case("run_input_str")
+def _run_input_str(bench: Bench):
+    core = bench.core
+    name = core.voice_names[0]
+    phrases = [f"{name} брось монетку", f"{name} дата", f"{name} подбрось кубик", f"{name} непонятная просьба", "разговор без обращения"]
+
+    def run():
+        for phrase in phrases:
+            core.run_input_str(phrase)
+        core.context_clear()
+    return run
+
+@case("all_num_to_text")
+def _all_num_to_text(bench: Bench):
+    from app.utils.all_num_to_text import all_num_to_text, load_language
+    load_language("ru")
+    corpus = bench.corpus
+
+    def run():
+        for text in corpus:
+            all_num_to_text(text)
+    return run
+
+@case("normalizer_prepare")
+def _normalizer_prepare(bench: Bench):
+    from app.utils.all_num_to_text import all_num_to_text, load_language
+    from app.extensions.normalizer_prepare.main import manifest
+    from app.extensions.normalizer_prepare.normalizer import PrepareNormalizer
+    load_language("ru")
+    normalizer = PrepareNormalizer(manifest()["options"], all_num_to_text)
+    corpus = bench.corpus
+
+    def run():
+        for text in corpus:
+            normalizer.normalize(text)
+    return run
+
+@case("num2text")
+def _num2text(bench: Bench):
+    from app.utils.num_to_text_ru import num2text
+    units = ((u'минута', u'минуты', u'минут'), 'f')
+    # Табличный диапазон и числа за его пределами (через LRU-кэш)
+    values = list(range(0, 200, 7)) + [1234, 9999, 10001, 123456, 2000000]
+
+    def run():
+        for value in values:
+            num2text(value)
+            num2text(value, units)
+    return run
+
+@case("set_timer")
+def _set_timer(bench: Bench):
+    from app.extensions.greetings.main import _set_timer
+    core = bench.core
+    phrases = ["на двадцать пять минут", "час тридцать", "на полчаса", "на десять секунд", ""]
+
+    def run():
+        for phrase in phrases:
+            _set_timer(core, phrase)
+        core.timers[:] = [-1] * len(core.timers)
+    return run
+
+@case("ws/process_chunk")
+def _ws_process_chunk(bench: Bench):
+    try:
+        from fastapi import FastAPI, WebSocket
+        from fastapi.testclient import TestClient
+    except ImportError as e:
+        raise Skip(str(e))
+    from app.extensions.api.utils import process_chunk
+
+    core = bench.core
+    app = FastAPI()
+
+    # Тот же обмен, что /ws/asr/stream (api/ws.py), с заглушкой распознавателя
+    @app.websocket("/ws/asr/stream")
+    async def ws_asr_stream(websocket: WebSocket):
+        await websocket.accept()
+        rec = StubRecognizer(f"{core.voice_names[0]} брось монетку")
+        while True:
+            msg = await websocket.receive()
+            if msg.get("bytes") is not None:
+                payload = process_chunk(core, rec, msg["bytes"], "saytxt")
+                await websocket.send_text(json.dumps(payload, ensure_ascii=False))
+            elif msg.get("type") == "websocket.disconnect":
+                break
+
+    client = TestClient(app)
+    stack = contextlib.ExitStack()
+    websocket = stack.enter_context(client.websocket_connect("/ws/asr/stream"))
+    bench.cleanup.callback(stack.close)
+    # 30 мс PCM16 48 кГц
+    chunk = bytes(2880)
+
+    def run():
+        websocket.send_bytes(chunk)
+        websocket.receive_text()
+    return run
+
+@case("diarization")
+def _diarization(bench: Bench):
+    try:
+        from app.extensions.stt_speaker_vosk_speechbrain.main import _cluster_embeddings
+    except Exception as e:
+        raise Skip(f"{type(e).__name__}: {e}")
+
+    # 4 диктора, 240 окон, эмбеддинги 192 (как у ECAPA)
+    rng = numpy.random.default_rng(0)
+    centers = rng.normal(size=(4, 192))
+    X = numpy.vstack([c + rng.normal(scale=0.4, size=(60, 192)) for c in centers]).astype(numpy.float32)
+
+    def run():
+        _cluster_embeddings(X)
+    return run
+
+"""
+    Лучшее время операции из rounds прогонов, мкс
+"""
+def measure(fn: Callable[[], None], rounds: int, min_time: float) -> float:
+    fn()
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    best = elapsed / number
+    for _ in range(rounds - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best * 1e6
+
+def run_cases(bench: Bench, selected: Optional[List[str]], rounds: int, min_time: float) -> Tuple[Dict[str, float], Dict[str, str]]:
+    results: Dict[str, float] = {}
+    skipped: Dict[str, str] = {}
+    # Вывод ядра и расширений (ответы, журнал ввода) на время замеров отключается
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for name, setup in CASES:
+            if selected and not any(s in name for s in selected):
+                continue
+            try:
+                fn = setup(bench)
+                results[name] = measure(fn, rounds, min_time)
+            except Skip as e:
+                skipped[name] = str(e)
+            except Exception as e:
+                skipped[name] = f"ошибка: {type(e).__name__}: {e}"
+    return results, skipped
+
+def load_baseline(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_baseline(path: str, results: Dict[str, float], rounds: int, min_time: float):
+    data = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {platform.node()}",
+        "rounds": rounds,
+        "min_time": min_time,
+        "results": {name: round(us, 3) for name, us in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+"""
+    Таблица результатов; возвращает список регрессий
+"""
+def report(results: Dict[str, float], skipped: Dict[str, str], baseline: Optional[dict], threshold: float) -> List[str]:
+    base = (baseline or {}).get("results", {})
+    regressions = []
+    print(f"{'случай':<22} {'мкс/оп':>12} {'baseline':>12} {'изменение':>10}")
+    for name, us in results.items():
+        ref = base.get(name)
+        if ref is None:
+            print(f"{name:<22} {us:>12.2f} {'-':>12} {'новый':>10}")
+            continue
+        change = us / ref - 1
+        mark = ""
+        if change > threshold:
+            mark = "  РЕГРЕССИЯ"
+            regressions.append(name)
+        print(f"{name:<22} {us:>12.2f} {ref:>12.2f} {change * 100:>+9.1f}%{mark}")
+    for name, reason in skipped.items():
+        print(f"{name:<22} пропущен: {reason}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки горячих путей Легиона")
+    parser.add_argument("-k", dest="select", action="append", help="Только случаи, в имени которых есть подстрока (можно несколько раз)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Файл baseline (JSON)")
+    parser.add_argument("--save", action="store_true", help="Записать результаты как baseline (случаи, не вошедшие в прогон, сохраняются)")
+    parser.add_argument("--require-baseline", action="store_true", help="Без baseline завершаться с ошибкой (код 2) - для CI")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Допустимое замедление относительно baseline (0.25 - на 25%%)")
+    parser.add_argument("--rounds", type=int, default=5, help="Прогонов на случай (берётся лучший)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Минимальная длительность прогона, с")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Корпус ответов для нормализации")
+    args = parser.parse_args()
+
+    bench = Bench(args.corpus)
+    with bench.cleanup:
+        results, skipped = run_cases(bench, args.select, args.rounds, args.min_time)
+
+    baseline = load_baseline(args.baseline)
+    regressions = report(results, skipped, None if args.save else baseline, args.threshold)
+
+    if args.save:
+        merged = dict((baseline or {}).get("results", {}))
+        merged.update(results)
+        save_baseline(args.baseline, merged, args.rounds, args.min_time)
+        print(f"\nBaseline записан: {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"\nBaseline не найден ({args.baseline}) - запишите его с --save")
+        if args.require_baseline:
+            sys.exit(2)
+    elif regressions:
+        print(f"\nРегрессии (медленнее baseline больше чем на {args.threshold * 100:.0f}%): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,165 @@
 import argparse
 import json
+import logging
 import os
 import queue
+import statistics
 import sys
 import threading
 import signal
-import sounddevice
+import time
 import uvicorn
 
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI
-from vosk import Model, SetLogLevel, KaldiRecognizer
+from vosk import Model, SetLogLevel
+
+try:
+    import sounddevice
+except Exception:
+    sounddevice = None
 
 from app.core.core import Core
+from app.core.capture import InputPipeline, WavInput, RECOGNIZERS, LOW_LATENCY_BLOCK_MS
+from app.core.trace import tracer
+
+logger = logging.getLogger(__name__)
 
-# Блокировка микрофона во время TTS/обработки
-mic_blocked = threading.Event()
+# Фразы для выполнения в потоке команд: (вход, фраза, трасса)
+# Занятость ассистента у каждого входа своя (InputPipeline.busy): эхо ответа пропускается только на входе, которому отвечают
+commands_q: "queue.Queue[tuple]" = queue.Queue(maxsize=4)
 # Общий флаг завершения
 stop_event = threading.Event()
-# Очередь PCM-чанков от callback() к основному циклу
-q = queue.Queue()
 
-SENTINEL = None
+# Размер пула потоков распознавания для нескольких входов (не больше числа входов)
+POOL_SIZE = 2
+
+# Режим replay: вывод ответов -> remote_tts ядра
+#   play - локальное озвучивание, synth - синтез в WAV без воспроизведения, text - только текст (без синтеза)
+REPLAY_TTS = {"play": "none", "synth": "saywav", "text": "saytxt"}
 
 """
     Легион в режиме микрофона:
-        1. Чтение звука с микрофона
-        2. Передача распознанного текста в ядро Core
-"""
-def run_mic_mode(device=None, samplerate=None):
-    if samplerate is None:
-        device_info = sounddevice.query_devices(device, 'input')
-        samplerate = int(device_info['default_samplerate'])
+        1. Чтение звука с микрофона (или нескольких: devices; WAV-файлы wavs - виртуальные входы без звуковой карты)
+        2. Шлюз активности голоса: в Vosk уходят только участки речи (use_vad)
+        3. Передача распознанного текста в ядро Core
 
+    У каждого входа свой конвейер (app/core/capture.py): кольцевой буфер, шлюз, распознаватели
+    Модель Vosk и ядро общие, состояние диалога у каждого входа своё (core.session())
+    Один вход распознаётся в основном потоке, несколько - в пуле из pool_size потоков
+
+    Режим низкой задержки (block_ms): маленькие блоки захвата и разбор PartialResult():
+        обращение к ассистенту в частичном результате отмечается сразу
+        с early_commands законченная команда («легион брось монетку») запускается, не дожидаясь конца фразы в Kaldi
+        (только команды без аргументов, объявленные расширениями в ключе манифеста early_commands)
+
+    Команды выполняются в отдельном потоке (command_worker), распознавание не останавливается:
+        пока ассистент отвечает на фразу входа, с этого входа выполняется только прерывание («легион стоп» - core.stop_speech()),
+        фразы других входов встают в очередь
+        blocking=True - прежний режим: микрофон выключается на время выполнения команды (только для одного входа)
+
+    trace_path - трассировать фразы (все, если в ядре trace_sample_rate=0) и при выходе записать трассу Chrome
+"""
+def run_mic_mode(devices=None, samplerate=None, wavs=None, use_vad=True, block_ms=None, early_commands=False, recognizer="open", blocking=False, pool_size=POOL_SIZE, trace_path=None):
     model_path = "./app/models/vosk"
 
     core = Core()
     core.init_with_extensions()
+    enable_trace(core, trace_path)
 
     if not os.path.exists(model_path):
         print(f"[ОШИБКА] Модель не найдена: {model_path}")
         sys.exit(1)
 
     model = Model(model_path)
-    rec = None
-    stream = None
 
-    print("[ИНФО] Легион инициализирован, ожидание голосовых команд...")
+    wav_inputs = [WavInput(path) for path in (wavs or [])]
+    devices = list(devices or [])
+    if not devices and not wav_inputs:
+        devices = [None]
+
+    multi = len(devices) + len(wav_inputs) > 1
+    if blocking and multi:
+        print("[ИНФО] Несколько входов - режим blocking недоступен, команды выполняются в отдельном потоке")
+        blocking = False
+
+    def make_pipeline(rate, name):
+        return InputPipeline(
+            core, model, rate,
+            name=name if multi else None,
+            use_vad=use_vad,
+            block_ms=block_ms,
+            early_commands=early_commands,
+            recognizer=recognizer,
+        )
+
+    pipelines = []
+    streams = []
+    worker = None
 
     try:
-        stream = sounddevice.RawInputStream(samplerate=samplerate, blocksize=8000, device=device, dtype='int16', channels=1, callback=callback)
-        stream.start()
+        for device in devices:
+            rate = samplerate
+            if rate is None:
+                device_info = sounddevice.query_devices(device, 'input')
+                rate = int(device_info['default_samplerate'])
+            pipeline = make_pipeline(rate, f"mic-{device}" if device is not None else "mic")
+            pipelines.append(pipeline)
+            stream = sounddevice.RawInputStream(samplerate=rate, blocksize=pipeline.block_size, device=device, dtype='int16', channels=1, callback=make_callback(pipeline))
+            streams.append(stream)
 
-        rec = KaldiRecognizer(model, samplerate)
-        while not stop_event.is_set():
-            try:
-                data = q.get(timeout=0.5)
-            except queue.Empty:
-                core.update_timers()
-                continue
-
-            if data is SENTINEL:
-                break 
-
-            if rec.AcceptWaveform(data):
-                recognized_data = json.loads(rec.Result())
-                voice_input_str = recognized_data.get("text", "")
-                if voice_input_str:
-                    print(f"[РАСПОЗНАНО] {voice_input_str}")
-                    # Блокируем микрофон на время обработки команды/TTS
-                    block_mic()
-                    try:
-                        core.run_input_str(voice_input_str)
-                    finally:
-                        # Разблокируем даже если внутри было исключение
-                        unblock_mic()
-            core.update_timers()
+        for wav_input in wav_inputs:
+            pipelines.append(make_pipeline(wav_input.samplerate, wav_input.name))
 
-        if rec is not None:
+        for pipeline in pipelines:
+            print(f"[ИНФО] {pipeline.describe()}")
+        print("[ИНФО] Легион инициализирован, ожидание голосовых команд...")
+
+        for stream in streams:
+            stream.start()
+        for wav_input, pipeline in zip(wav_inputs, pipelines[len(devices):]):
+            wav_input.start(pipeline, stop_event)
+
+        if not blocking:
+            worker = threading.Thread(target=command_worker, args=(core,), name="legion-commands", daemon=True)
+            worker.start()
+
+        # Только файлы - работа заканчивается, когда они прочитаны и все команды выполнены
+        def finished() -> bool:
+            return (
+                not streams
+                and all(w.done.is_set() for w in wav_inputs)
+                and not any(p.ready() for p in pipelines)
+                and commands_q.unfinished_tasks == 0
+            )
+
+        if multi:
+            _run_pool(pipelines, pool_size, core, finished)
+        else:
+            _run_single(pipelines[0], core, blocking, finished)
+
+        stop_event.set()
+        if worker is not None:
+            worker.join(timeout=5)
+
+        for pipeline in pipelines:
             try:
-                final_json = json.loads(rec.FinalResult())
-                final_text = final_json.get("text", "")
+                final_text = pipeline.final_text()
                 if final_text:
                     print(f"[ФИНАЛ] {final_text}")
-                    block_mic()
-                    try:
+                    with core.session(pipeline.name):
                         core.run_input_str(final_text)
-                    finally:
-                        unblock_mic()
             except Exception:
                 pass
 
     finally:
-        try:
-            if stream is not None:
+        stop_event.set()
+        for stream in streams:
+            try:
                 stream.stop()
                 stream.close()
-        except Exception:
-            pass
+            except Exception:
+                pass
 
         if hasattr(core, "shutdown"):
             try:
@@ -104,8 +167,272 @@ def run_mic_mode(device=None, samplerate=None):
             except Exception:
                 pass
 
+        for pipeline in pipelines:
+            summary = pipeline.summary()
+            if summary:
+                print(f"[ИНФО] {summary}")
+        export_trace(trace_path)
         print("[ИНФО] Завершение работы")
 
+"""
+    Один вход: распознавание в основном потоке
+"""
+def _run_single(pipeline: InputPipeline, core: Core, blocking: bool, finished):
+    while not stop_event.is_set():
+        data = pipeline.read_block(timeout=0.5)
+        if data is None:
+            if blocking:
+                core.update_timers()
+            if finished():
+                break
+            continue
+
+        phrase = pipeline.process(data)
+        if phrase is not None and not blocking:
+            dispatch(core, pipeline, phrase[0], phrase[1])
+        elif phrase is not None:
+            voice_input_str, early = phrase
+            print(f"[{'ДОСРОЧНО' if early else 'РАСПОЗНАНО'}] {voice_input_str}")
+            # Выключаем приём звука на время обработки команды/TTS
+            pipeline.paused.set()
+            trace = pipeline.start_trace(voice_input_str, early)
+            try:
+                with tracer.utterance(*trace[:2]) if trace else tracer.utterance():
+                    core.run_input_str(voice_input_str)
+            finally:
+                # Звук, накопленный во время обработки, не распознаём
+                pipeline.discard()
+                # Включаем даже если внутри было исключение
+                pipeline.paused.clear()
+        if blocking:
+            core.update_timers()
+
+"""
+    Несколько входов: каждый вход с готовыми блоками отдаётся пулу потоков (не больше одной задачи на вход)
+"""
+def _run_pool(pipelines, pool_size: int, core: Core, finished):
+    def on_phrase(pipeline: InputPipeline, voice_input_str: str, early: bool):
+        dispatch(core, pipeline, voice_input_str, early)
+
+    def run(pipeline: InputPipeline):
+        try:
+            pipeline.drain(on_phrase)
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            pipeline.scheduled = False
+
+    with ThreadPoolExecutor(max_workers=max(1, min(pool_size, len(pipelines))), thread_name_prefix="legion-asr") as pool:
+        while not stop_event.is_set():
+            idle = True
+            for pipeline in pipelines:
+                if not pipeline.scheduled and pipeline.ready():
+                    pipeline.scheduled = True
+                    pool.submit(run, pipeline)
+                    idle = False
+            if idle:
+                if finished() and not any(p.scheduled for p in pipelines):
+                    break
+                time.sleep(0.005)
+
+"""
+    Передаёт распознанную фразу потоку команд
+    Пока ассистент отвечает на фразу этого входа, выполняется только прерывание, остальное (чаще всего эхо его же речи)
+    пропускается; фразы других входов встают в очередь и выполняются после текущей команды
+"""
+def dispatch(core: Core, pipeline: InputPipeline, voice_input_str: str, early: bool = False):
+    label = f"[{pipeline.name}] " if pipeline.name else ""
+    if core.is_stop_command(voice_input_str):
+        print(f"{label}[ПРЕРВАНО] {voice_input_str}")
+        core.stop_speech()
+        # Команды, ждущие очереди, тоже отменяются
+        while True:
+            try:
+                commands_q.get_nowait()
+            except queue.Empty:
+                break
+            commands_q.task_done()
+        return
+
+    if pipeline.busy.is_set():
+        logger.info("%sПропущено во время ответа: %s", label, voice_input_str)
+        return
+
+    print(f"{label}[{'ДОСРОЧНО' if early else 'РАСПОЗНАНО'}] {voice_input_str}")
+    try:
+        commands_q.put_nowait((pipeline, voice_input_str, pipeline.start_trace(voice_input_str, early)))
+    except queue.Full:
+        logger.warning("Очередь команд заполнена, фраза пропущена: %s", voice_input_str)
+
+"""
+    Поток команд: выполняет фразы из commands_q (в сеансе своего входа) и обновляет таймеры
+    Ядро используется только из этого потока (кроме core.stop_speech())
+    Трасса фразы, начатая при распознавании, продолжается здесь (ожидание в очереди - интервал "queue")
+"""
+def command_worker(core: Core):
+    while not stop_event.is_set():
+        try:
+            pipeline, voice_input_str, trace = commands_q.get(timeout=0.5)
+        except queue.Empty:
+            core.update_timers()
+            continue
+
+        pipeline.busy.set()
+        try:
+            trace_id, sampled, queued_ns = trace or (None, None, None)
+            with tracer.utterance(trace_id, sampled), core.session(pipeline.name):
+                if queued_ns is not None:
+                    tracer.record("queue", queued_ns, time.perf_counter_ns())
+                core.run_input_str(voice_input_str)
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            pipeline.busy.clear()
+            commands_q.task_done()
+        core.update_timers()
+
+"""
+    Легион в режиме replay: WAV/PCM-файлы (или stdin - "-") проходят через тот же конвейер, что и микрофон
+    Детерминированный прогон для замеров: файлы по очереди, команды выполняются сразу в том же потоке
+        realtime=False - так быстро, как успевает распознавание, иначе - в темпе реального времени
+        tts - что делать с ответами (REPLAY_TTS): по умолчанию синтез без воспроизведения
+    На каждую фразу - строка JSON в timings_path (None - stdout):
+        asr_ms - обработка блока, на котором закончилась фраза (включая FinalResult Kaldi)
+        resolve_ms - от начала разбора фразы до вызова обработчика команды
+        tts_ms - суммарное время озвучивания (синтез/вывод)
+        command_ms - выполнение фразы в ядре целиком, total_ms - asr + command
+    В конце - сводка (медиана, p95) в stderr
+"""
+def run_replay_mode(inputs, samplerate=None, realtime=False, tts="synth", timings_path=None, use_vad=True, block_ms=None, early_commands=False, recognizer="open", trace_path=None):
+    model_path = "./app/models/vosk"
+
+    core = Core()
+    core.init_with_extensions()
+    enable_trace(core, trace_path)
+
+    if not os.path.exists(model_path):
+        print(f"[ОШИБКА] Модель не найдена: {model_path}")
+        sys.exit(1)
+
+    model = Model(model_path)
+
+    core.remote_tts = REPLAY_TTS[tts]
+
+    out = open(timings_path, "w", encoding="utf-8") if timings_path else sys.stdout
+    records = []
+
+    def emit(source: WavInput, pipeline: InputPipeline, text: str, early: bool, asr_seconds: float):
+        trace = pipeline.start_trace(text, early)
+        with tracer.utterance(*trace[:2]) if trace else tracer.utterance():
+            record = _run_timed(core, text, asr_seconds)
+        record.update({"input": source.name, "audio_s": round(pipeline.position, 3), "early": early})
+        records.append(record)
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    try:
+        for path in inputs:
+            source = WavInput(path, realtime=realtime, samplerate=samplerate)
+            pipeline = InputPipeline(
+                core, model, source.samplerate,
+                name=source.name,
+                use_vad=use_vad,
+                block_ms=block_ms,
+                early_commands=early_commands,
+                recognizer=recognizer,
+            )
+            print(f"[ИНФО] {pipeline.describe()}", file=sys.stderr)
+            source.start(pipeline, stop_event)
+
+            while not stop_event.is_set():
+                data = pipeline.read_block(timeout=0.5)
+                if data is None:
+                    if source.done.is_set() and not pipeline.ready():
+                        break
+                    continue
+                asr_start = time.perf_counter()
+                phrase = pipeline.process(data)
+                if phrase is not None:
+                    emit(source, pipeline, phrase[0], phrase[1], time.perf_counter() - asr_start)
+                core.update_timers()
+
+            asr_start = time.perf_counter()
+            final_text = pipeline.final_text()
+            if final_text and not stop_event.is_set():
+                emit(source, pipeline, final_text, False, time.perf_counter() - asr_start)
+
+            summary = pipeline.summary()
+            if summary:
+                print(f"[ИНФО] {summary}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if hasattr(core, "shutdown"):
+            try:
+                core.shutdown()
+            except Exception:
+                pass
+
+    print(f"[ИНФО] {_timings_summary(records)}", file=sys.stderr)
+    export_trace(trace_path)
+
+"""
+    Трассировка фраз для --trace: если в ядре она выключена, трассируется каждая фраза
+"""
+def enable_trace(core: Core, trace_path):
+    if trace_path and not tracer.enabled:
+        core.trace_sample_rate = 1.0
+        tracer.configure(core.trace_sample_rate, core.trace_buffer_size)
+
+def export_trace(trace_path):
+    if not trace_path:
+        return
+    try:
+        count = tracer.export_chrome(trace_path)
+        print(f"[ИНФО] Трасса: {count} интервалов -> {trace_path} (chrome://tracing, ui.perfetto.dev)", file=sys.stderr)
+    except OSError as e:
+        print(f"[ОШИБКА] Не удалось записать трассу {trace_path}: {e}", file=sys.stderr)
+
+"""
+    Выполняет фразу в ядре с замерами (core.phrase_timings)
+"""
+def _run_timed(core: Core, text: str, asr_seconds: float) -> dict:
+    timings = core.phrase_timings = {}
+    start = time.perf_counter()
+    found = False
+    try:
+        found = bool(core.run_input_str(text))
+    except Exception as e:
+        logger.exception(e)
+    finally:
+        end = time.perf_counter()
+        core.phrase_timings = None
+
+    resolved = timings.get("resolved")
+    return {
+        "text": text,
+        "found": found,
+        "asr_ms": round(asr_seconds * 1000, 2),
+        "resolve_ms": round((resolved - start) * 1000, 2) if resolved is not None else None,
+        "tts_ms": round(timings.get("tts", 0.0) * 1000, 2),
+        "command_ms": round((end - start) * 1000, 2),
+        "total_ms": round((asr_seconds + end - start) * 1000, 2),
+    }
+
+def _timings_summary(records) -> str:
+    if not records:
+        return "Фраз не распознано"
+
+    def stat(key):
+        values = sorted(r[key] for r in records if r[key] is not None)
+        if not values:
+            return "-"
+        p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+        return f"{statistics.median(values):.1f}/{p95:.1f}"
+
+    keys = ("asr_ms", "resolve_ms", "tts_ms", "total_ms")
+    return f"Фраз: {len(records)}, медиана/p95 мс: " + ", ".join(f"{key} {stat(key)}" for key in keys)
+
 """
     Легион в API-режиме (HTTP + WebSocket)
 """
@@ -120,26 +447,10 @@ def run_api_mode():
 def handle_signal(signum, frame):
     print("\n[ИНФО] Выключаюсь, чуть подождите...", flush=True)
     stop_event.set()
-    try:
-        q.put_nowait(SENTINEL)
-    except queue.Full:
-        pass
 
 signal.signal(signal.SIGINT, handle_signal)
 signal.signal(signal.SIGTERM, handle_signal)
 
-"""
-    Блокировка приёма звука с микрофона
-"""
-def block_mic():
-    mic_blocked.set()
-
-"""
-    Разблокировка приёма звука с микрофона
-"""
-def unblock_mic():
-    mic_blocked.clear()
-
 """
     Преобразует строку в int, если это возможно
 """
@@ -150,44 +461,69 @@ def int_or_str(text):
         return text
 
 """
-    Колбэк получает аудио и кладёт его в очередь
+    Колбэк входа: получает аудио и копирует его в кольцевой буфер конвейера (без выделения памяти и блокировок)
+    Переполнение учитывается в ring.overruns
 """
-def callback(indata, frames, time, status):
-    if status:
-        print(f"[АУДИО] Статус устройства: {status}", file=sys.stderr)
-    # Если микрофон НЕ заблокирован - складываем данные
-    if stop_event.is_set():
-        return
-
-    if not mic_blocked.is_set():
-        try:
-            q.put_nowait(bytes(indata))
-        except queue.Full:
-            pass
-    else:
-        while not q.empty():
-            try:
-                q.get_nowait()
-            except queue.Empty:
-                break
+def make_callback(pipeline: InputPipeline):
+    def callback(indata, frames, time, status):
+        if status:
+            print(f"[АУДИО] {pipeline.label}: статус устройства: {status}", file=sys.stderr)
+        if stop_event.is_set():
+            return
+        pipeline.write(indata)
+    return callback
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Легион")
-    parser.add_argument('--mode', choices=['mic', 'api'], required=True, help="Режим работы: mic - с микрофона, api - HTTP/WS API")
-    parser.add_argument('-d', '--device', type=int_or_str, help='ID или название устройства микрофона')
+    parser.add_argument('--mode', choices=['mic', 'api', 'replay'], required=True, help="Режим работы: mic - с микрофона, api - HTTP/WS API, replay - прогон файлов с замерами")
+    parser.add_argument('-d', '--device', type=int_or_str, action='append', help='ID или название устройства микрофона (можно несколько раз - несколько комнат)')
+    parser.add_argument('--wav', action='append', help="WAV-файл как виртуальный вход (можно несколько раз; без звуковой карты)")
+    parser.add_argument('-i', '--input', action='append', help="replay: WAV или сырой PCM s16le моно (частота -r, по умолчанию 16000), '-' - stdin; можно несколько раз")
+    parser.add_argument('--pace', choices=['fast', 'realtime'], default='fast', help="replay: темп подачи звука")
+    parser.add_argument('--tts', choices=list(REPLAY_TTS), default='synth', help="replay: play - озвучивать, synth - синтез в WAV без воспроизведения, text - только текст")
+    parser.add_argument('--timings', help="replay: файл для замеров по фразам (JSON Lines, по умолчанию stdout)")
+    parser.add_argument('--trace', help="mic/replay: трассировать фразы и при выходе записать трассу Chrome (JSON) в файл")
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE, help="Потоков распознавания для нескольких входов")
     parser.add_argument('-r', '--samplerate', type=int, help='Частота дискретизации (например, 16000, 44100, 48000)')
+    parser.add_argument('--block-ms', type=int, nargs='?', const=LOW_LATENCY_BLOCK_MS, default=None, help=f"Режим низкой задержки: блок захвата в мс (20-50, по умолчанию {LOW_LATENCY_BLOCK_MS})")
+    parser.add_argument('--early-commands', action='store_true', help="В режиме низкой задержки запускать законченную команду по частичному результату")
+    parser.add_argument('--recognizer', choices=RECOGNIZERS, default="open", help="Распознаватель: open - открытый словарь, grammar - только команды (аргументы вне грамматики теряются), dual - команды + открытый словарь для произвольного текста")
+    parser.add_argument('--blocking', action='store_true', help="Выключать микрофон на время выполнения команды (без прерывания ответа)")
+    parser.add_argument('--vad', action=argparse.BooleanOptionalAction, default=True, help="Шлюз активности голоса перед Vosk (--no-vad - распознавать весь звук)")
     args = parser.parse_args()
 
     SetLogLevel(-1)
 
     try:
         if args.mode == 'mic':
-            run_mic_mode(device=args.device, samplerate=args.samplerate)
+            run_mic_mode(
+                devices=args.device,
+                samplerate=args.samplerate,
+                wavs=args.wav,
+                use_vad=args.vad,
+                block_ms=args.block_ms,
+                early_commands=args.early_commands,
+                recognizer=args.recognizer,
+                blocking=args.blocking,
+                pool_size=args.pool_size,
+                trace_path=args.trace,
+            )
         elif args.mode == 'api':
             run_api_mode()
+        elif args.mode == 'replay':
+            if not args.input:
+                parser.error("--mode replay: нужен хотя бы один --input")
+            run_replay_mode(
+                inputs=args.input,
+                samplerate=args.samplerate,
+                realtime=args.pace == 'realtime',
+                tts=args.tts,
+                timings_path=args.timings,
+                use_vad=args.vad,
+                block_ms=args.block_ms,
+                early_commands=args.early_commands,
+                recognizer=args.recognizer,
+                trace_path=args.trace,
+            )
     finally:
         stop_event.set()
-        try:
-            q.put_nowait(SENTINEL)
-        except queue.Full:
-            pass
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.extensions.ollama_llama.client import OllamaClient
+
+"""
+    OllamaClient против локальной заглушки Ollama (http.server): /api/generate отдаёт NDJSON
+"""
+
+MODEL = "llama3"
+CONTEXT = [1, 2, 3]
+
+class FakeOllama(BaseHTTPRequestHandler):
+    # HTTP/1.1 - соединение остаётся открытым между запросами (keep-alive)
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, self.client_address, payload))
+
+        if payload.get("stream"):
+            lines = [
+                {"model": payload["model"], "response": "Привет", "done": False},
+                {"model": payload["model"], "response": ", мир", "done": False},
+                {"model": payload["model"], "response": "", "done": True, "context": CONTEXT},
+            ]
+        else:
+            lines = [{"model": payload["model"], "response": "", "done": True}]
+        body = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+@pytest.fixture
+def client(server):
+    client = OllamaClient(f"http://127.0.0.1:{server.server_address[1]}/", keep_alive="10m", context_ttl=0.5)
+    try:
+        yield client
+    finally:
+        client.close()
+
+def test_generate_streams_tokens_and_sends_keep_alive(server, client):
+    tokens = list(client.generate({"model": MODEL, "prompt": "привет"}))
+
+    assert tokens == ["Привет", ", мир"]
+    path, _, payload = server.requests[0]
+    assert path == "/api/generate"
+    assert payload["keep_alive"] == "10m"
+    assert payload["stream"] is True
+
+def test_context_reused_within_ttl(server, client):
+    list(client.generate({"model": MODEL, "prompt": "первый"}, use_context=True))
+    assert client.get_context(MODEL) == CONTEXT
+
+    list(client.generate({"model": MODEL, "prompt": "уточнение"}, use_context=True))
+    assert "context" not in server.requests[0][2]
+    assert server.requests[1][2]["context"] == CONTEXT
+
+    # Другая модель контекст не получает
+    list(client.generate({"model": "other", "prompt": "вопрос"}, use_context=True))
+    assert "context" not in server.requests[2][2]
+
+def test_context_expires_after_ttl(server, client):
+    list(client.generate({"model": MODEL, "prompt": "первый"}, use_context=True))
+    time.sleep(client.context_ttl + 0.1)
+
+    list(client.generate({"model": MODEL, "prompt": "второй"}, use_context=True))
+    assert "context" not in server.requests[1][2]
+
+def test_session_reuses_connection(server, client):
+    for prompt in ("раз", "два", "три"):
+        list(client.generate({"model": MODEL, "prompt": prompt}))
+
+    # Один и тот же клиентский порт - одно TCP-соединение из пула сессии
+    assert len({address for _, address, _ in server.requests}) == 1
+
+def test_warm_up_hits_server(server, client):
+    assert client.warm_up(MODEL) is True
+
+    path, _, payload = server.requests[0]
+    assert path == "/api/generate"
+    assert payload == {"model": MODEL, "keep_alive": "10m", "stream": False}